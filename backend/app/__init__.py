@@ -1,65 +1,159 @@
-from flask import Flask, send_from_directory
+import click
+from flask import Flask, Request, current_app
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_cors import CORS
+from sqlalchemy import event
 from config import Config
 
 db = SQLAlchemy()
 migrate = Migrate()
 
+class UpkeepRequest(Request):
+    @property
+    def max_content_length(self):
+        # Backup imports may be far larger than a regular upload
+        if current_app and self.endpoint == 'backup.import_data':
+            return current_app.config['MAX_BACKUP_SIZE']
+        return super().max_content_length
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Run ``PRAGMA name=value`` for each of ``pragmas`` on every new connection"""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+def begin_write():
+    """Start the session's transaction holding SQLite's write lock, unless it already writes.
+
+    Anything read afterwards stays true until the commit, even with other
+    workers writing to the same database file.
+    """
+    connection = db.session.connection()
+    if connection.dialect.name == 'sqlite' and not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
 def create_app(config_class=Config):
     app = Flask(__name__)
+    app.request_class = UpkeepRequest
     app.config.from_object(config_class)
+    app.config['USE_X_SENDFILE'] = app.config['UPLOAD_ACCEL'] == 'sendfile'
+
+    from app.serialization import init_json
+    init_json(app)
 
     db.init_app(app)
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine, app.config['SQLITE_PRAGMAS'])
+        if app.config['METRICS_ENABLED']:
+            from app.metrics import init_metrics
+            init_metrics(app, db.engine)
     migrate.init_app(app, db)
     CORS(app)
 
     # Register blueprints
-    from app.routes import assets, maintenance_items, maintenance_logs, general_maintenance, backup, settings
+    from app.routes import assets, maintenance_items, maintenance_logs, general_maintenance, backup, settings, dashboard, attachments, costs, forecasts, search, telemetry
     app.register_blueprint(assets.bp)
     app.register_blueprint(maintenance_items.bp)
     app.register_blueprint(maintenance_logs.bp)
     app.register_blueprint(general_maintenance.bp)
     app.register_blueprint(backup.bp)
     app.register_blueprint(settings.bp)
+    app.register_blueprint(dashboard.bp)
+    app.register_blueprint(attachments.bp)
+    app.register_blueprint(costs.bp)
+    app.register_blueprint(forecasts.bp)
+    app.register_blueprint(search.bp)
+    app.register_blueprint(telemetry.bp)
 
-    # Set up reminder scheduler
-    from apscheduler.schedulers.background import BackgroundScheduler
-    from app.services.reminders import check_and_send_reminders
+    from app.services.telemetry import init_telemetry
+    init_telemetry(app)
 
     import os
-    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true' or not app.debug:
-        scheduler = BackgroundScheduler()
-        # Run once shortly after startup
-        from datetime import datetime, timedelta
-        scheduler.add_job(
-            func=check_and_send_reminders,
-            args=[app],
-            trigger='date',
-            run_date=datetime.now() + timedelta(seconds=30),
-            id='reminder_check_startup',
-        )
-        # Then daily at 8 AM
-        scheduler.add_job(
-            func=check_and_send_reminders,
-            args=[app],
-            trigger='cron',
-            hour=8,
-            minute=0,
-            id='reminder_check_daily',
-            replace_existing=True
-        )
-        scheduler.start()
-
     # Create upload and instance folders if they don't exist
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     os.makedirs(app.config['INSTANCE_FOLDER'], exist_ok=True)
 
+    # Background jobs; with several processes only the elected leader runs them
+    if (os.environ.get('WERKZEUG_RUN_MAIN') == 'true' or not app.debug) \
+            and not app.testing and app.config['SCHEDULER_ENABLED']:
+        from app.scheduler import start_scheduler
+        start_scheduler(app)
+
     # Route to serve uploaded files
     @app.route('/uploads/<filename>')
     def uploaded_file(filename):
-        return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+        from app.services.storage import send_upload
+        return send_upload(filename)
+
+    @app.cli.command('rebuild-next-due')
+    def rebuild_next_due():
+        """Recompute next-due values for every maintenance item."""
+        from app.services.status import refresh_next_due
+        count = refresh_next_due()
+        db.session.commit()
+        print(f'Rebuilt next-due values for {count} maintenance item(s)')
+
+    @app.cli.command('rebuild-cost-rollups')
+    def rebuild_cost_rollups():
+        """Recompute the cost rollup tables from every log and general maintenance record."""
+        from app.services.costs import rebuild_cost_rollups
+        count = rebuild_cost_rollups()
+        db.session.commit()
+        print(f'Rebuilt {count} cost rollup row(s)')
+
+    @app.cli.command('rebuild-usage-history')
+    def rebuild_usage_history():
+        """Re-derive usage readings from logs and general maintenance and clear cached forecasts."""
+        from app.services.usage import rebuild_usage_history
+        count = rebuild_usage_history()
+        db.session.commit()
+        print(f'Usage history now holds {count} reading(s)')
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index():
+        """Re-index every record for full-text search."""
+        from app.services.search import rebuild_search_index
+        count = rebuild_search_index()
+        db.session.commit()
+        print(f'Search index now holds {count} entries')
+
+    @app.cli.command('generate-fleet')
+    @click.option('--assets', default=100, show_default=True, help='Number of assets')
+    @click.option('--items', default=1000, show_default=True, help='Total maintenance items')
+    @click.option('--logs', default=20000, show_default=True, help='Total maintenance logs')
+    @click.option('--attachment-ratio', default=0.2, show_default=True, help='Share of logs with attachment metadata')
+    @click.option('--seed', default=42, show_default=True, help='Random seed; the same seed gives the same fleet')
+    @click.option('--chunk-size', default=5000, show_default=True, help='Rows per committed insert')
+    def generate_fleet(assets, items, logs, attachment_ratio, seed, chunk_size):
+        """Add a synthetic fleet for load testing and benchmarks."""
+        from app.services.fleet import FleetGenerator
+        generator = FleetGenerator(seed=seed, chunk_size=chunk_size, attachment_ratio=attachment_ratio,
+                                   progress=lambda counts: click.echo(f"  {counts['maintenance_logs']} logs", err=True))
+        counts = generator.generate(assets, items, logs)
+        click.echo(', '.join(f'{count} {table}' for table, count in counts.items()))
+
+    @app.cli.command('verify-uploads')
+    def verify_uploads():
+        """Re-hash content-addressed uploads and report missing or corrupt blobs."""
+        from app.models import Attachment
+        from app.services.storage import verify_blob
+        problems = 0
+        for digest, path in db.session.query(Attachment.content_hash, Attachment.file_path) \
+                .filter(Attachment.content_hash.isnot(None)).distinct():
+            error = verify_blob(path, digest)
+            if error:
+                problems += 1
+                print(f'{path}: {error}')
+        print(f'{problems} problem(s) found')
 
     return app
 
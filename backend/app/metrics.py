@@ -0,0 +1,317 @@
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from itertools import chain
+from flask import current_app, request
+from sqlalchemy import event
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100, 250)
+SIZE_BUCKETS = (256, 1024, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+JOB_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300)
+
+# Per-thread state of the request being served; gthread workers and the dev
+# server give each in-flight request its own thread, including while streaming
+_local = threading.local()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in chain(zip(names, values), extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def inc(self, labels=(), amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def snapshot(self):
+        return [[list(labels), value] for labels, value in self.values.items()]
+
+    def merge(self, snapshot):
+        for labels, value in snapshot:
+            self.inc(tuple(labels), value)
+
+    def render(self):
+        for labels, value in sorted(self.values.items()):
+            yield f'{self.name}{_format_labels(self.labelnames, labels)} {_format_number(value)}'
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.values = {}  # labels -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, labels, value):
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def snapshot(self):
+        return [[list(labels), list(series)] for labels, series in self.values.items()]
+
+    def merge(self, snapshot):
+        for labels, other in snapshot:
+            series = self.values.setdefault(tuple(labels), [0] * (len(self.buckets) + 2))
+            for n, value in enumerate(other):
+                series[n] += value
+
+    def render(self):
+        for labels, series in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                le = (('le', _format_number(bound)),)
+                yield f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_number(series[-1])}'
+            yield f'{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}'
+
+
+class Metrics:
+    """The app's metric families, updated under one lock.
+
+    With ``directory`` set (several server processes), each process writes
+    its values there as ``<pid>.json`` every ``flush_seconds`` and a scrape
+    adds up every process's file, so ``/metrics`` covers all workers no
+    matter which one answers it.
+    """
+
+    def __init__(self, directory=None, flush_seconds=5):
+        self.lock = threading.Lock()
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self.flusher = None
+        self.requests = Counter('upkeep_http_requests_total', 'HTTP requests handled',
+                                ('method', 'endpoint', 'status'))
+        self.latency = Histogram('upkeep_http_request_duration_seconds',
+                                 'Time from request start to the last response byte', ('method', 'endpoint'))
+        self.response_size = Histogram('upkeep_http_response_size_bytes', 'Response body size',
+                                       ('method', 'endpoint'), SIZE_BUCKETS)
+        self.request_queries = Histogram('upkeep_http_request_db_queries', 'SQL statements executed per request',
+                                         ('method', 'endpoint'), QUERY_BUCKETS)
+        self.request_db_time = Histogram('upkeep_http_request_db_seconds', 'Time spent in SQL per request',
+                                         ('method', 'endpoint'))
+        self.queries = Counter('upkeep_db_queries_total', 'SQL statements executed, including background jobs')
+        self.db_time = Counter('upkeep_db_query_seconds_total', 'Time spent in SQL, including background jobs')
+        self.job_runs = Counter('upkeep_job_runs_total', 'Background job runs by outcome', ('job', 'outcome'))
+        self.job_latency = Histogram('upkeep_job_duration_seconds', 'Background job duration', ('job',), JOB_BUCKETS)
+        self.reminder_items = Counter('upkeep_reminder_items_total', 'Maintenance items included in queued reminder emails')
+
+    @property
+    def families(self):
+        return [value for value in vars(self).values() if isinstance(value, (Counter, Histogram))]
+
+    def record_request(self, stats, status, size):
+        labels = (stats.method, stats.endpoint)
+        with self.lock:
+            self.requests.inc((stats.method, stats.endpoint, str(status)))
+            self.latency.observe(labels, time.perf_counter() - stats.started)
+            if size is not None:
+                self.response_size.observe(labels, size)
+            self.request_queries.observe(labels, stats.queries)
+            self.request_db_time.observe(labels, stats.db_time)
+        self.maybe_flush()
+
+    def record_query(self, duration):
+        stats = getattr(_local, 'request', None)
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += duration
+        with self.lock:
+            self.queries.inc()
+            self.db_time.inc(amount=duration)
+
+    def record_job(self, job, outcome, duration):
+        with self.lock:
+            self.job_runs.inc((job, outcome))
+            self.job_latency.observe((job,), duration)
+        self.maybe_flush()
+
+    def _path(self):
+        return os.path.join(self.directory, f'{os.getpid()}.json')
+
+    def maybe_flush(self):
+        # Started on first use, so it runs in server workers rather than a parent that forks them
+        if self.directory and self.flusher is None:
+            with self.lock:
+                if self.flusher is None:
+                    self.flusher = threading.Thread(target=self._flush_periodically, name='metrics-flush',
+                                                    daemon=True)
+                    self.flusher.start()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except OSError as e:
+                print(f'Failed to write metrics: {e}')
+
+    def flush(self):
+        """Write this process's values for other processes' scrapes"""
+        with self.lock:
+            data = {family.name: family.snapshot() for family in self.families}
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.metrics-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(temp_path, self._path())
+
+    def collect(self):
+        """Families to expose: this process's, or every process's when sharing a directory"""
+        if not self.directory:
+            return self.families
+
+        self.flush()
+        combined = Metrics()
+        by_name = {family.name: family for family in combined.families}
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue  # being replaced or written by a dying process
+            for name, snapshot in data.items():
+                if name in by_name:
+                    by_name[name].merge(snapshot)
+        return combined.families
+
+    def render(self):
+        lines = []
+        for family in self.collect():
+            lines.append(f'# HELP {family.name} {family.documentation}')
+            lines.append(f'# TYPE {family.name} {family.kind}')
+            lines.extend(family.render())
+        return '\n'.join(lines) + '\n'
+
+
+class RequestStats:
+    __slots__ = ('method', 'endpoint', 'started', 'queries', 'db_time')
+
+    def __init__(self, method):
+        self.method = method
+        self.endpoint = 'unmatched'
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+
+
+def _count_bytes(iterable, counter):
+    try:
+        for chunk in iterable:
+            counter[0] += len(chunk)
+            yield chunk
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
+
+
+def clear_snapshots(directory):
+    """Forget values left by processes of an earlier server run"""
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        os.remove(path)
+
+
+def get_metrics(app=None):
+    app = app or current_app
+    return app.extensions.get('metrics')
+
+
+@contextmanager
+def track_job(job):
+    """Time a background job; set ``outcome`` on the yielded dict to label the run"""
+    run = {'outcome': 'ok'}
+    started = time.perf_counter()
+    try:
+        yield run
+    except Exception:
+        run['outcome'] = 'error'
+        raise
+    finally:
+        metrics = get_metrics()
+        if metrics is not None:
+            metrics.record_job(job, run['outcome'], time.perf_counter() - started)
+
+
+def init_metrics(app, engine):
+    """Instrument requests and SQL for ``app`` and serve ``/metrics``"""
+    metrics = Metrics(app.config['METRICS_DIR'], app.config['METRICS_FLUSH_SECONDS'])
+    app.extensions['metrics'] = metrics
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info['metrics_query_start'] = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def end_query(conn, cursor, statement, parameters, context, executemany):
+        metrics.record_query(time.perf_counter() - conn.info['metrics_query_start'])
+
+    @app.before_request
+    def start_request():
+        stats = _local.request = RequestStats(request.method)
+        if request.endpoint:
+            stats.endpoint = request.endpoint
+
+    @app.after_request
+    def end_request(response):
+        stats = getattr(_local, 'request', None)
+        if stats is None:
+            return response
+
+        status = response.status_code
+
+        # Closures must not hold the response: a reference cycle would delay
+        # closing a streamed body (and its request context) until garbage collection
+        def finish(size):
+            _local.request = None
+            metrics.record_request(stats, status, size)
+
+        if response.direct_passthrough:
+            # File handed straight to the server; close hooks are not run for these
+            finish(response.content_length)
+        elif response.is_streamed and response.content_length is None:
+            # Exports stream for a long time: measure until the last chunk is sent
+            sent = [0]
+            response.response = _count_bytes(response.response, sent)
+            response.call_on_close(lambda: finish(sent[0]))
+        else:
+            size = response.content_length
+            response.call_on_close(lambda: finish(size))
+        return response
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        return app.response_class(metrics.render(), content_type=CONTENT_TYPE)
+
+    return metrics
@@ -4,5 +4,10 @@ from app.models.maintenance_log import MaintenanceLog
 from app.models.attachment import Attachment
 from app.models.general_maintenance import GeneralMaintenance
 from app.models.settings import Settings
+from app.models.outbox import OutboxMessage
+from app.models.collection_version import CollectionVersion
+from app.models.cost_rollup import AssetMonthlyCost, ItemYearlyCost
+from app.models.usage_reading import UsageReading, UsageForecast
+from app.models import search_index  # FTS5 table and triggers, created alongside the tables
 
-__all__ = ['Asset', 'MaintenanceItem', 'MaintenanceLog', 'Attachment', 'GeneralMaintenance', 'Settings']
+__all__ = ['Asset', 'MaintenanceItem', 'MaintenanceLog', 'Attachment', 'GeneralMaintenance', 'Settings', 'OutboxMessage', 'CollectionVersion', 'AssetMonthlyCost', 'ItemYearlyCost', 'UsageReading', 'UsageForecast']
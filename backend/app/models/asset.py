@@ -1,4 +1,5 @@
 from app import db
+from app.serialization import Serializer, iso
 from datetime import datetime
 
 class Asset(db.Model):
@@ -17,19 +18,22 @@ class Asset(db.Model):
     # Relationships
     maintenance_items = db.relationship('MaintenanceItem', backref='asset', lazy=True, cascade='all, delete-orphan')
     general_maintenance = db.relationship('GeneralMaintenance', backref='asset', lazy=True, cascade='all, delete-orphan')
+    usage_readings = db.relationship('UsageReading', backref='asset', lazy=True, cascade='all, delete-orphan')
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'description': self.description,
-            'category': self.category,
-            'location': self.location,
-            'usage_metric': self.usage_metric,
-            'current_usage': self.current_usage,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+    serializer = Serializer({
+        'id': 'id',
+        'name': 'name',
+        'description': 'description',
+        'category': 'category',
+        'location': 'location',
+        'usage_metric': 'usage_metric',
+        'current_usage': 'current_usage',
+        'created_at': ('created_at', iso),
+        'updated_at': ('updated_at', iso),
+    })
+
+    def to_dict(self, fields=None):
+        return self.serializer.dump(self, fields)
 
     def __repr__(self):
         return f'<Asset {self.name}>'
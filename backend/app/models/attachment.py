@@ -1,4 +1,6 @@
 from app import db
+from app.serialization import Serializer, iso
+from app.services.thumbnails import RENDITIONS, can_render
 from datetime import datetime
 
 class Attachment(db.Model):
@@ -9,24 +11,34 @@ class Attachment(db.Model):
     file_path = db.Column(db.String(255), nullable=False)  # Stored path on server
     file_type = db.Column(db.String(50))  # MIME type (image/jpeg, application/pdf, etc.)
     file_size = db.Column(db.Integer)  # Size in bytes
+    content_hash = db.Column(db.String(64), index=True)  # SHA-256 of the stored blob; shared by duplicate uploads
 
     # Polymorphic association - can belong to different types of records
-    maintenance_log_id = db.Column(db.Integer, db.ForeignKey('maintenance_logs.id'))
-    general_maintenance_id = db.Column(db.Integer, db.ForeignKey('general_maintenance.id'))
+    maintenance_log_id = db.Column(db.Integer, db.ForeignKey('maintenance_logs.id'), index=True)
+    general_maintenance_id = db.Column(db.Integer, db.ForeignKey('general_maintenance.id'), index=True)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'filename': self.filename,
-            'file_path': self.file_path,
-            'file_type': self.file_type,
-            'file_size': self.file_size,
-            'maintenance_log_id': self.maintenance_log_id,
-            'general_maintenance_id': self.general_maintenance_id,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+    serializer = Serializer({
+        'id': 'id',
+        'filename': 'filename',
+        'file_path': 'file_path',
+        'file_type': 'file_type',
+        'file_size': 'file_size',
+        'content_hash': 'content_hash',
+        'renditions': lambda attachment: attachment.rendition_urls(),
+        'maintenance_log_id': 'maintenance_log_id',
+        'general_maintenance_id': 'general_maintenance_id',
+        'created_at': ('created_at', iso),
+    })
+
+    def to_dict(self, fields=None):
+        return self.serializer.dump(self, fields)
+
+    def rendition_urls(self):
+        if not can_render(self.file_path):
+            return {}
+        return {size: f'/api/attachments/{self.id}/renditions/{size}' for size in RENDITIONS}
 
     def __repr__(self):
         return f'<Attachment {self.id} {self.filename}>'
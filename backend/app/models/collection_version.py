@@ -0,0 +1,13 @@
+from app import db
+from datetime import datetime
+
+class CollectionVersion(db.Model):
+    """Write counter per table, used to answer conditional GETs without loading rows"""
+    __tablename__ = 'collection_versions'
+
+    name = db.Column(db.String(50), primary_key=True)  # Table name
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<CollectionVersion {self.name}={self.version}>'
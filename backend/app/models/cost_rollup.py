@@ -0,0 +1,41 @@
+from app import db
+
+
+class AssetMonthlyCost(db.Model):
+    """Cost totals per asset and calendar month, kept current by app.services.costs.
+
+    No foreign keys: rows are removed after the records they summarise, in
+    the same transaction.
+    """
+    __tablename__ = 'cost_rollup_asset_months'
+
+    asset_id = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)  # YYYY-MM
+    scheduled_cost = db.Column(db.Numeric(12, 2), nullable=False, default=0)  # Maintenance logs
+    general_cost = db.Column(db.Numeric(12, 2), nullable=False, default=0)  # General maintenance
+    entries = db.Column(db.Integer, nullable=False, default=0)  # Records with a cost
+
+    __table_args__ = (
+        db.Index('ix_cost_rollup_asset_months_month', month),
+    )
+
+    def __repr__(self):
+        return f'<AssetMonthlyCost {self.asset_id} {self.month}>'
+
+
+class ItemYearlyCost(db.Model):
+    """Maintenance log cost totals per item and calendar year"""
+    __tablename__ = 'cost_rollup_item_years'
+
+    maintenance_item_id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    asset_id = db.Column(db.Integer, nullable=False, index=True)
+    cost = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    entries = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_cost_rollup_item_years_year', year),
+    )
+
+    def __repr__(self):
+        return f'<ItemYearlyCost {self.maintenance_item_id} {self.year}>'
@@ -1,4 +1,5 @@
 from app import db
+from app.serialization import Serializer, iso, money
 from datetime import datetime
 
 class GeneralMaintenance(db.Model):
@@ -14,22 +15,31 @@ class GeneralMaintenance(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # One asset's records, newest first
+        db.Index('ix_general_maintenance_asset_date', asset_id, date_performed.desc(), id.desc()),
+        # Unfiltered records, newest first
+        db.Index('ix_general_maintenance_date', date_performed.desc(), id.desc()),
+    )
+
     # Relationship to attachments
     attachments = db.relationship('Attachment', backref='general_maintenance', lazy=True, cascade='all, delete-orphan')
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'asset_id': self.asset_id,
-            'description': self.description,
-            'date_performed': self.date_performed.isoformat() if self.date_performed else None,
-            'usage_reading': self.usage_reading,
-            'cost': float(self.cost) if self.cost else None,
-            'notes': self.notes,
-            'attachments': [att.to_dict() for att in self.attachments] if self.attachments else [],
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+    serializer = Serializer({
+        'id': 'id',
+        'asset_id': 'asset_id',
+        'description': 'description',
+        'date_performed': ('date_performed', iso),
+        'usage_reading': 'usage_reading',
+        'cost': ('cost', money),
+        'notes': 'notes',
+        'attachments': lambda record: [att.to_dict() for att in record.attachments],
+        'created_at': ('created_at', iso),
+        'updated_at': ('updated_at', iso),
+    })
+
+    def to_dict(self, fields=None):
+        return self.serializer.dump(self, fields)
 
     def __repr__(self):
         return f'<GeneralMaintenance {self.id} {self.description}>'
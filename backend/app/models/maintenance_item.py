@@ -1,4 +1,5 @@
 from app import db
+from app.serialization import Serializer, iso
 from datetime import datetime
 
 class MaintenanceItem(db.Model):
@@ -13,26 +14,38 @@ class MaintenanceItem(db.Model):
     notes = db.Column(db.Text)
     reminders_enabled = db.Column(db.Boolean, default=False)
     last_reminder_sent = db.Column(db.DateTime, nullable=True)
+    # Precomputed from the latest log; see app.services.status.refresh_next_due
+    next_due_date = db.Column(db.Date, nullable=True, index=True)  # time-based items
+    next_due_usage = db.Column(db.Integer, nullable=True, index=True)  # usage-based items
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # An asset's items; usage-due checks compare against that asset's current usage
+        db.Index('ix_maintenance_items_asset_next_usage', asset_id, next_due_usage),
+    )
+
     # Relationships
     maintenance_logs = db.relationship('MaintenanceLog', backref='maintenance_item', lazy=True, cascade='all, delete-orphan')
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'asset_id': self.asset_id,
-            'name': self.name,
-            'maintenance_type': self.maintenance_type,
-            'frequency_value': self.frequency_value,
-            'frequency_unit': self.frequency_unit,
-            'notes': self.notes,
-            'reminders_enabled': self.reminders_enabled,
-            'last_reminder_sent': self.last_reminder_sent.isoformat() if self.last_reminder_sent else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+    serializer = Serializer({
+        'id': 'id',
+        'asset_id': 'asset_id',
+        'name': 'name',
+        'maintenance_type': 'maintenance_type',
+        'frequency_value': 'frequency_value',
+        'frequency_unit': 'frequency_unit',
+        'notes': 'notes',
+        'reminders_enabled': 'reminders_enabled',
+        'last_reminder_sent': ('last_reminder_sent', iso),
+        'next_due_date': ('next_due_date', iso),
+        'next_due_usage': 'next_due_usage',
+        'created_at': ('created_at', iso),
+        'updated_at': ('updated_at', iso),
+    })
+
+    def to_dict(self, fields=None):
+        return self.serializer.dump(self, fields)
 
     def __repr__(self):
         return f'<MaintenanceItem {self.name} for Asset {self.asset_id}>'
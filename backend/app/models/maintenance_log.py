@@ -1,4 +1,5 @@
 from app import db
+from app.serialization import Serializer, iso, money
 from datetime import datetime
 
 class MaintenanceLog(db.Model):
@@ -10,24 +11,33 @@ class MaintenanceLog(db.Model):
     usage_reading = db.Column(db.Integer)  # Optional usage value at time of maintenance
     notes = db.Column(db.Text)
     cost = db.Column(db.Numeric(10, 2))
-    receipt_photo = db.Column(db.String(255))  # Legacy field
+    receipt_photo = db.Column(db.String(255), index=True)  # Legacy field; indexed for upload reference counts
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # History of one item, newest first; also serves the latest-log-per-item window
+        db.Index('ix_maintenance_logs_item_date', maintenance_item_id, date_performed.desc(), id.desc()),
+        # Unfiltered history, newest first
+        db.Index('ix_maintenance_logs_date', date_performed.desc(), id.desc()),
+    )
+
     # Relationship to attachments
     attachments = db.relationship('Attachment', backref='maintenance_log', lazy=True, cascade='all, delete-orphan')
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'maintenance_item_id': self.maintenance_item_id,
-            'date_performed': self.date_performed.isoformat() if self.date_performed else None,
-            'usage_reading': self.usage_reading,
-            'notes': self.notes,
-            'cost': float(self.cost) if self.cost else None,
-            'receipt_photo': self.receipt_photo,
-            'attachments': [att.to_dict() for att in self.attachments] if self.attachments else [],
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+    serializer = Serializer({
+        'id': 'id',
+        'maintenance_item_id': 'maintenance_item_id',
+        'date_performed': ('date_performed', iso),
+        'usage_reading': 'usage_reading',
+        'notes': 'notes',
+        'cost': ('cost', money),
+        'receipt_photo': 'receipt_photo',
+        'attachments': lambda log: [att.to_dict() for att in log.attachments],
+        'created_at': ('created_at', iso),
+    })
+
+    def to_dict(self, fields=None):
+        return self.serializer.dump(self, fields)
 
     def __repr__(self):
         return f'<MaintenanceLog {self.id} for Item {self.maintenance_item_id}>'
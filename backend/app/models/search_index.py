@@ -0,0 +1,72 @@
+from sqlalchemy import DDL, event
+from app import db
+
+SEARCH_TABLE = 'search_index'
+
+# Index rowids are ``record_id * ROWID_STRIDE + code``, so a record's entry is
+# found (and replaced) through the rowid b-tree rather than a scan
+ROWID_STRIDE = 8
+
+# kind: (code, table, title, body, asset_id, columns whose updates re-index the record)
+SEARCH_SOURCES = {
+    'asset': (1, 'assets', 'NEW.name', 'NEW.description', 'NEW.id', ('name', 'description')),
+    'maintenance_item': (2, 'maintenance_items', 'NEW.name', 'NEW.notes', 'NEW.asset_id',
+                         ('name', 'notes', 'asset_id')),
+    'maintenance_log': (3, 'maintenance_logs', 'NULL', 'NEW.notes',
+                        '(SELECT asset_id FROM maintenance_items WHERE id = NEW.maintenance_item_id)',
+                        ('notes', 'maintenance_item_id')),
+    'general_maintenance': (4, 'general_maintenance', 'NEW.description', 'NEW.notes', 'NEW.asset_id',
+                            ('description', 'notes', 'asset_id')),
+    'attachment': (5, 'attachments', 'NEW.filename', 'NULL',
+                   'COALESCE((SELECT maintenance_items.asset_id FROM maintenance_logs'
+                   ' JOIN maintenance_items ON maintenance_items.id = maintenance_logs.maintenance_item_id'
+                   ' WHERE maintenance_logs.id = NEW.maintenance_log_id),'
+                   ' (SELECT asset_id FROM general_maintenance WHERE id = NEW.general_maintenance_id))',
+                   ('filename', 'maintenance_log_id', 'general_maintenance_id')),
+}
+
+SEARCH_KINDS = {code: kind for kind, (code, *_) in SEARCH_SOURCES.items()}
+
+
+def index_statement(kind, from_table=False):
+    """``INSERT ... SELECT`` adding the entry for the trigger's NEW row, or every row with ``from_table``.
+
+    Records without any text get no entry.
+    """
+    code, table, title, body, asset_id, _ = SEARCH_SOURCES[kind]
+    new = table if from_table else 'NEW'
+    title, body, asset_id = (expression.replace('NEW.', f'{new}.') for expression in (title, body, asset_id))
+    return (
+        f'INSERT INTO {SEARCH_TABLE} (rowid, title, body, asset_id) '
+        f'SELECT {new}.id * {ROWID_STRIDE} + {code}, {title}, {body}, {asset_id} '
+        + (f'FROM {table} ' if from_table else '')
+        + f"WHERE COALESCE({title}, '') != '' OR COALESCE({body}, '') != ''"
+    )
+
+
+def _unindex(kind):
+    code = SEARCH_SOURCES[kind][0]
+    return f'DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.id * {ROWID_STRIDE} + {code}'
+
+
+def _create_statements():
+    # Triggers rather than session events: bulk inserts and Query.delete() are covered too.
+    # No stemmer: it would stem a half-typed word differently from the whole one
+    yield (f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5('
+           "title, body, asset_id UNINDEXED, tokenize='unicode61 remove_diacritics 2', prefix='2 3')")
+    # Names and descriptions outweigh notes when ranking
+    yield f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rank) VALUES ('rank', 'bm25(4.0, 1.0)')"
+    for kind, (_, table, _, _, _, columns) in SEARCH_SOURCES.items():
+        yield (f'CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_{table}_insert AFTER INSERT ON {table} '
+               f'BEGIN {index_statement(kind)}; END')
+        yield (f'CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_{table}_update AFTER UPDATE OF {", ".join(columns)} '
+               f'ON {table} BEGIN {_unindex(kind)}; {index_statement(kind)}; END')
+        yield (f'CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_{table}_delete AFTER DELETE ON {table} '
+               f'BEGIN {_unindex(kind)}; END')
+
+
+# Created with the tables (create_all), and only on SQLite, where FTS5 lives
+for statement in _create_statements():
+    event.listen(db.metadata, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(db.metadata, 'before_drop',
+             DDL(f'DROP TABLE IF EXISTS {SEARCH_TABLE}').execute_if(dialect='sqlite'))
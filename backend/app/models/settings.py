@@ -1,26 +1,80 @@
+from flask import current_app, g, has_app_context
+from sqlalchemy import update
 from app import db
+import threading
 
 class Settings(db.Model):
     __tablename__ = 'settings'
 
+    # Bumped on every write so other worker processes know to reload
+    VERSION_KEY = '_version'
+
     id = db.Column(db.Integer, primary_key=True)
     key = db.Column(db.String(100), unique=True, nullable=False)
     value = db.Column(db.Text)
 
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _cache():
+        return current_app.extensions.setdefault('settings_cache', {'version': None, 'values': None})
+
+    @staticmethod
+    def all():
+        """All settings as a dict, loaded once per process.
+
+        The stored version is checked at most once per app context (i.e.
+        once per request or scheduler job), and all rows are reloaded in a
+        single query only when another process has written since.
+        """
+        cache = Settings._cache()
+        if cache['values'] is not None and g.get('settings_checked'):
+            return cache['values']
+
+        version = db.session.query(Settings.value).filter_by(key=Settings.VERSION_KEY).scalar()
+        with Settings._lock:
+            if cache['values'] is None or cache['version'] != version:
+                rows = db.session.query(Settings.key, Settings.value).all()
+                cache['values'] = {key: value for key, value in rows if key != Settings.VERSION_KEY}
+                cache['version'] = version
+        if has_app_context():
+            g.settings_checked = True
+        return cache['values']
+
     @staticmethod
     def get(key, default=None):
-        setting = Settings.query.filter_by(key=key).first()
-        return setting.value if setting else default
+        return Settings.all().get(key, default)
 
     @staticmethod
     def set(key, value):
-        setting = Settings.query.filter_by(key=key).first()
-        if setting:
-            setting.value = value
+        Settings.update({key: value})
+
+    @staticmethod
+    def update(values):
+        """Write several settings atomically in one transaction"""
+        existing = {s.key: s for s in Settings.query.filter(Settings.key.in_(list(values) + [Settings.VERSION_KEY]))}
+        for key, value in values.items():
+            if key in existing:
+                existing[key].value = value
+            else:
+                db.session.add(Settings(key=key, value=value))
+
+        if Settings.VERSION_KEY in existing:
+            # Increment in SQL so concurrent writers in other processes never reuse a version
+            db.session.execute(
+                update(Settings)
+                .where(Settings.key == Settings.VERSION_KEY)
+                .values(value=db.cast(db.cast(Settings.value, db.Integer) + 1, db.Text))
+                .execution_options(synchronize_session=False)
+            )
         else:
-            setting = Settings(key=key, value=value)
-            db.session.add(setting)
+            db.session.add(Settings(key=Settings.VERSION_KEY, value='1'))
         db.session.commit()
 
+        # Write-through: the next read reloads once and picks up the new version
+        with Settings._lock:
+            Settings._cache()['values'] = None
+        g.pop('settings_checked', None)
+
     def __repr__(self):
         return f'<Settings {self.key}={self.value}>'
@@ -0,0 +1,62 @@
+from app import db
+from datetime import datetime
+
+class UsageReading(db.Model):
+    """One observed usage value of an asset, the input to usage-rate forecasts.
+
+    Kept current by app.services.usage from asset usage updates and from the
+    ``usage_reading`` of logs and general maintenance (``source``/``source_id``).
+    """
+    __tablename__ = 'usage_readings'
+
+    SOURCES = ('asset', 'maintenance_log', 'general_maintenance')
+
+    id = db.Column(db.Integer, primary_key=True)
+    asset_id = db.Column(db.Integer, db.ForeignKey('assets.id'), nullable=False)
+    reading = db.Column(db.Integer, nullable=False)
+    recorded_on = db.Column(db.Date, nullable=False)
+    source = db.Column(db.String(20), nullable=False)
+    source_id = db.Column(db.Integer)  # Log or general maintenance id
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_usage_readings_asset_date', asset_id, recorded_on),
+        db.Index('ix_usage_readings_source', source, source_id),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'asset_id': self.asset_id,
+            'reading': self.reading,
+            'recorded_on': self.recorded_on.isoformat() if self.recorded_on else None,
+            'source': self.source,
+            'source_id': self.source_id
+        }
+
+    def __repr__(self):
+        return f'<UsageReading {self.asset_id}={self.reading} on {self.recorded_on}>'
+
+
+class UsageForecast(db.Model):
+    """Cached usage-rate fit per asset; removed whenever the asset's readings change"""
+    __tablename__ = 'usage_forecasts'
+
+    asset_id = db.Column(db.Integer, primary_key=True)
+    rate_per_day = db.Column(db.Float)  # None when there is too little history to fit
+    readings = db.Column(db.Integer, nullable=False, default=0)  # Readings used in the fit
+    last_reading = db.Column(db.Integer)
+    last_reading_on = db.Column(db.Date)
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'asset_id': self.asset_id,
+            'rate_per_day': round(self.rate_per_day, 3) if self.rate_per_day is not None else None,
+            'readings': self.readings,
+            'last_reading': self.last_reading,
+            'last_reading_on': self.last_reading_on.isoformat() if self.last_reading_on else None,
+        }
+
+    def __repr__(self):
+        return f'<UsageForecast {self.asset_id} {self.rate_per_day}/day>'
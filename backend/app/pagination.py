@@ -0,0 +1,66 @@
+import base64
+from datetime import date
+from flask import current_app
+from sqlalchemy import or_, and_
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(date_value, id_value):
+    raw = f'{date_value.isoformat()}|{id_value}'
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        date_part, id_part = base64.urlsafe_b64decode(padded).decode('utf-8').split('|')
+        return date.fromisoformat(date_part[:10]), int(id_part)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+
+
+def keyset_paginate(query, date_column, id_column, cursor=None, limit=None):
+    """Page through ``query`` ordered by (date_column desc, id_column desc).
+
+    Returns ``(rows, next_cursor)``; ``next_cursor`` is None on the last page.
+    Raises InvalidCursor if ``cursor`` cannot be decoded.
+    """
+    if not limit or limit < 1:
+        limit = current_app.config['DEFAULT_PAGE_SIZE']
+    limit = min(limit, current_app.config['MAX_PAGE_SIZE'])
+
+    if cursor:
+        after_date, after_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            date_column < after_date,
+            and_(date_column == after_date, id_column < after_id)
+        ))
+
+    rows = query.order_by(date_column.desc(), id_column.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, date_column.key), getattr(last, id_column.key))
+
+    return rows, next_cursor
+
+
+def encode_offset_cursor(offset):
+    return base64.urlsafe_b64encode(f'offset|{offset}'.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_offset_cursor(token):
+    """Offset stored in a cursor from encode_offset_cursor, for result orders without a stable key"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        label, offset = base64.urlsafe_b64decode(padded).decode('utf-8').split('|')
+        if label != 'offset' or int(offset) < 0:
+            raise ValueError(token)
+        return int(offset)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
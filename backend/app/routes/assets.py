@@ -1,18 +1,33 @@
 from flask import Blueprint, request, jsonify
+from sqlalchemy import select
 from app import db
-from app.models import Asset
+from app.models import Asset, GeneralMaintenance, MaintenanceItem, MaintenanceLog
+from app.serialization import InvalidFields, project, requested_fields
+from app.services.status import refresh_next_due
+from app.services.storage import record_uploads, release_upload
+from app.versioning import conditional
 
 bp = Blueprint('assets', __name__, url_prefix='/api/assets')
 
 @bp.route('', methods=['GET'])
+@conditional('assets')
 def get_assets():
-    assets = Asset.query.all()
-    return jsonify([a.to_dict() for a in assets])
+    try:
+        fields = requested_fields(Asset.serializer)
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
+    assets = project(Asset.query, Asset, fields).all()
+    return jsonify(Asset.serializer.dump_many(assets, fields))
 
 @bp.route('/<int:asset_id>', methods=['GET'])
+@conditional('assets')
 def get_asset(asset_id):
-    asset = Asset.query.get_or_404(asset_id)
-    return jsonify(asset.to_dict())
+    try:
+        fields = requested_fields(Asset.serializer)
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
+    asset = project(Asset.query, Asset, fields).get_or_404(asset_id)
+    return jsonify(asset.to_dict(fields))
 
 @bp.route('', methods=['POST'])
 def create_asset():
@@ -44,6 +59,10 @@ def update_asset(asset_id):
     asset.usage_metric = data.get('usage_metric', asset.usage_metric)
     asset.current_usage = data.get('current_usage', asset.current_usage)
 
+    # Usage items fall back to time-based scheduling when the asset has no metric
+    if 'usage_metric' in data:
+        refresh_next_due(MaintenanceItem.query.filter_by(asset_id=asset.id))
+
     db.session.commit()
 
     return jsonify(asset.to_dict())
@@ -51,7 +70,15 @@ def update_asset(asset_id):
 @bp.route('/<int:asset_id>', methods=['DELETE'])
 def delete_asset(asset_id):
     asset = Asset.query.get_or_404(asset_id)
+    # Records and their attachments go with the asset; their files are released afterwards
+    released = record_uploads(
+        log_ids=select(MaintenanceLog.id).join(MaintenanceItem).where(MaintenanceItem.asset_id == asset_id),
+        general_ids=select(GeneralMaintenance.id).where(GeneralMaintenance.asset_id == asset_id),
+    )
     db.session.delete(asset)
     db.session.commit()
 
+    for path in released:
+        release_upload(path)
+
     return '', 204
@@ -0,0 +1,30 @@
+import os
+from flask import Blueprint, current_app, jsonify
+from app.models import Attachment
+from app.services.storage import send_stored_file
+from app.services.thumbnails import RENDITIONS, RENDITION_MIMETYPE, can_render, ensure_rendition
+
+# Rendition settings may change between releases, so renditions are revalidated daily
+RENDITION_MAX_AGE = 24 * 60 * 60
+
+bp = Blueprint('attachments', __name__, url_prefix='/api/attachments')
+
+@bp.route('/<int:id>/renditions/<size>', methods=['GET'])
+def get_rendition(id, size):
+    """Serve a downscaled image of an attachment, generating it on first request"""
+    attachment = Attachment.query.get_or_404(id)
+    if size not in RENDITIONS:
+        return jsonify({'error': f"Unknown rendition '{size}'. Use one of: {', '.join(RENDITIONS)}"}), 404
+    if not can_render(attachment.file_path):
+        return jsonify({'error': 'No preview available for this file type'}), 404
+
+    try:
+        path = ensure_rendition(attachment, size)
+    except FileNotFoundError:
+        return jsonify({'error': 'Attachment file is missing'}), 404
+    except Exception as e:
+        return jsonify({'error': f'Could not render preview: {str(e)}'}), 422
+
+    relative_path = os.path.relpath(path, current_app.config['UPLOAD_FOLDER'])
+    etag = os.path.splitext(os.path.basename(path))[0]
+    return send_stored_file(relative_path, etag=etag, max_age=RENDITION_MAX_AGE, mimetype=RENDITION_MIMETYPE)
@@ -1,171 +1,161 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from sqlalchemy import or_
 from app import db
-from app.models import Asset, MaintenanceItem, MaintenanceLog, GeneralMaintenance, Attachment
+from app.models import Asset, MaintenanceItem, MaintenanceLog, GeneralMaintenance, Attachment, UsageReading
+from app.services.costs import rebuild_cost_rollups
+from app.services.status import refresh_next_due
+from app.services.usage import rebuild_usage_history
+from app.services.backup import (
+    iter_export_json, iter_export_ndjson, buffered, gzipped,
+    iter_json_assets, iter_ndjson_records, import_ndjson, BulkImporter,
+    iter_export_archive, iter_archive_records, RestoredFiles
+)
 from datetime import datetime
+import gzip
+import itertools
 import json
-import io
+import tarfile
 
 bp = Blueprint('backup', __name__, url_prefix='/api/backup')
 
 @bp.route('/export', methods=['GET'])
 def export_data():
-    """Export all data as JSON"""
-    try:
-        assets = Asset.query.all()
-
-        export_data = {
-            'export_date': datetime.utcnow().isoformat(),
-            'version': '2.0',
-            'assets': []
-        }
-
-        for asset in assets:
-            asset_data = asset.to_dict()
-
-            # Get maintenance items for this asset
-            maintenance_items = MaintenanceItem.query.filter_by(asset_id=asset.id).all()
-            asset_data['maintenance_items'] = []
-
-            for item in maintenance_items:
-                item_data = item.to_dict()
-
-                # Get logs for this maintenance item
-                logs = MaintenanceLog.query.filter_by(maintenance_item_id=item.id).all()
-                item_data['logs'] = []
-
-                for log in logs:
-                    log_data = log.to_dict()
-                    log_data['attachments'] = [att.to_dict() for att in log.attachments]
-                    item_data['logs'].append(log_data)
-
-                asset_data['maintenance_items'].append(item_data)
-
-            # Get general maintenance for this asset
-            general_maintenance = GeneralMaintenance.query.filter_by(asset_id=asset.id).all()
-            asset_data['general_maintenance'] = []
-
-            for gm in general_maintenance:
-                gm_data = gm.to_dict()
-                gm_data['attachments'] = [att.to_dict() for att in gm.attachments]
-                asset_data['general_maintenance'].append(gm_data)
-
-            export_data['assets'].append(asset_data)
-
-        json_str = json.dumps(export_data, indent=2)
-        json_bytes = io.BytesIO(json_str.encode('utf-8'))
-
-        filename = f"upkeep_backup_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.json"
-
-        return send_file(
-            json_bytes,
-            mimetype='application/json',
-            as_attachment=True,
-            download_name=filename
-        )
-
-    except Exception as e:
-        return jsonify({'error': f'Failed to export data: {str(e)}'}), 500
+    """Stream all data as JSON, NDJSON or a tar archive with uploads, optionally gzipped"""
+    export_format = request.args.get('format', 'json')
+    if export_format not in ('json', 'ndjson', 'archive'):
+        return jsonify({'error': 'Format must be json, ndjson or archive'}), 400
+    compress = request.args.get('compress') == 'gzip'
+
+    if export_format == 'archive':
+        body = iter_export_archive(current_app.config['UPLOAD_FOLDER'])
+        extension = 'tar'
+        mimetype = 'application/x-tar'
+    else:
+        pieces = iter_export_ndjson() if export_format == 'ndjson' else iter_export_json()
+        body = buffered(pieces)
+        extension = export_format
+        mimetype = 'application/x-ndjson' if export_format == 'ndjson' else 'application/json'
+    if compress:
+        body = gzipped(body)
+        extension += '.gz'
+        mimetype = 'application/gzip'
+
+    filename = f"upkeep_backup_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
 
 @bp.route('/import', methods=['POST'])
 def import_data():
-    """Import data from JSON backup file"""
+    """Import data from a JSON, NDJSON or tar archive backup file, optionally gzipped"""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+
+    file = request.files['file']
+
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+
+    name = file.filename[:-3] if file.filename.endswith('.gz') else file.filename
+    if name.endswith('.tgz'):
+        name = name[:-4] + '.tar'
+    if not name.endswith(('.json', '.ndjson', '.tar')):
+        return jsonify({'error': 'File must be a JSON file or backup archive'}), 400
+
+    if name.endswith('.tar'):
+        # tarfile detects compression itself
+        with RestoredFiles(current_app.config['UPLOAD_FOLDER'], current_app.config['ARCHIVE_RESTORE_WORKERS']) as files:
+            response, status = _import_records(iter_archive_records(file.stream, files), files=files)
+            if status != 200:
+                files.discard()
+            return response, status
+
+    stream = gzip.GzipFile(fileobj=file.stream) if file.filename.endswith('.gz') else file.stream
+    if name.endswith('.ndjson'):
+        return _import_records(iter_ndjson_records(stream))
+    return _import_records(iter_json_assets(stream), nested=True)
+
+def _import_records(records, nested=False, files=None):
+    """Bulk import parsed backup records, honouring the mode and chunk_size form fields"""
+    chunk_size = max(1, request.form.get('chunk_size', current_app.config['BACKUP_IMPORT_CHUNK_SIZE'], type=int))
+    mode = request.form.get('mode', 'merge')
+
+    def log_progress(chunks, counts):
+        current_app.logger.info('Backup import: committed chunk %d (%s)', chunks, counts)
+
+    importer = None
     try:
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
-
-        file = request.files['file']
-
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
-
-        if not file.filename.endswith('.json'):
-            return jsonify({'error': 'File must be a JSON file'}), 400
-
-        try:
-            data = json.load(file)
-        except json.JSONDecodeError:
-            return jsonify({'error': 'Invalid JSON file'}), 400
-
-        # Support both old 'vehicles' and new 'assets' format
-        assets_data = data.get('assets') or data.get('vehicles')
-        if not assets_data:
-            return jsonify({'error': 'Invalid backup file format'}), 400
-
-        mode = request.form.get('mode', 'merge')
+        if nested:
+            first = next(records, None)
+            if first is None:
+                return jsonify({'error': 'Invalid backup file format'}), 400
+            records = itertools.chain([first], records)
+        else:
+            header = next(records, None)
+            if not header or header.get('type') != 'header':
+                return jsonify({'error': 'Invalid backup file format'}), 400
 
         if mode == 'replace':
             Attachment.query.delete()
             MaintenanceLog.query.delete()
             GeneralMaintenance.query.delete()
             MaintenanceItem.query.delete()
+            UsageReading.query.delete()
             Asset.query.delete()
             db.session.commit()
 
-        imported_counts = {
-            'assets': 0,
-            'maintenance_items': 0,
-            'maintenance_logs': 0,
-            'general_maintenance': 0
+        importer = BulkImporter(chunk_size, progress=log_progress)
+        if nested:
+            for asset_data in records:
+                importer.add_nested_asset(asset_data)
+        else:
+            import_ndjson(records, importer, files=files)
+        if files is not None:
+            files.wait()
+        importer.flush()
+        _refresh_derived(importer)
+
+        result = {
+            'message': 'Data imported successfully',
+            'counts': importer.counts,
+            'chunks': importer.chunks
         }
+        if files is None:
+            result['note'] = 'Attachment files were not restored. Use an archive backup to include them.'
+        else:
+            result['files_restored'] = len(files)
+        return jsonify(result), 200
 
-        for asset_data in assets_data:
-            asset = Asset(
-                name=asset_data.get('name') or f"{asset_data.get('year', '')} {asset_data.get('make', '')} {asset_data.get('model', '')}".strip(),
-                description=asset_data.get('description'),
-                category=asset_data.get('category'),
-                location=asset_data.get('location'),
-                usage_metric=asset_data.get('usage_metric'),
-                current_usage=asset_data.get('current_usage', asset_data.get('current_mileage', 0))
-            )
-            db.session.add(asset)
-            db.session.flush()
-            imported_counts['assets'] += 1
-
-            for item_data in asset_data.get('maintenance_items', []):
-                item = MaintenanceItem(
-                    asset_id=asset.id,
-                    name=item_data['name'],
-                    maintenance_type=item_data.get('maintenance_type', 'time'),
-                    frequency_value=item_data['frequency_value'],
-                    frequency_unit=item_data.get('frequency_unit'),
-                    notes=item_data.get('notes')
-                )
-                db.session.add(item)
-                db.session.flush()
-                imported_counts['maintenance_items'] += 1
-
-                for log_data in item_data.get('logs', []):
-                    log = MaintenanceLog(
-                        maintenance_item_id=item.id,
-                        date_performed=datetime.fromisoformat(log_data['date_performed']),
-                        usage_reading=log_data.get('usage_reading', log_data.get('mileage')),
-                        cost=log_data.get('cost'),
-                        notes=log_data.get('notes')
-                    )
-                    db.session.add(log)
-                    db.session.flush()
-                    imported_counts['maintenance_logs'] += 1
-
-            for gm_data in asset_data.get('general_maintenance', []):
-                gm = GeneralMaintenance(
-                    asset_id=asset.id,
-                    description=gm_data['description'],
-                    date_performed=datetime.fromisoformat(gm_data['date_performed']),
-                    usage_reading=gm_data.get('usage_reading', gm_data.get('mileage')),
-                    cost=gm_data.get('cost'),
-                    notes=gm_data.get('notes')
-                )
-                db.session.add(gm)
-                imported_counts['general_maintenance'] += 1
-
-        db.session.commit()
-
+    except (ValueError, KeyError, OSError, tarfile.TarError) as e:
+        db.session.rollback()
+        _refresh_derived(importer)
+        if importer is None:
+            message = 'Invalid JSON file' if isinstance(e, json.JSONDecodeError) else 'Invalid backup file format'
+            return jsonify({'error': message}), 400
         return jsonify({
-            'message': 'Data imported successfully',
-            'counts': imported_counts,
-            'note': 'Attachment files were not restored - only metadata. Please re-upload attachments if needed.'
-        }), 200
-
+            'error': f'Failed to import data: {str(e)}',
+            'counts': importer.counts,
+            'chunks': importer.chunks
+        }), 400
     except Exception as e:
         db.session.rollback()
+        _refresh_derived(importer)
         return jsonify({'error': f'Failed to import data: {str(e)}'}), 500
+
+def _refresh_derived(importer):
+    """Bring next-due values, cost rollups and usage history up to date with the committed chunks.
+
+    Chunks are bulk inserted without the ORM hooks that maintain these, so
+    this runs after a failed import as well as a successful one.
+    """
+    if importer is None or not importer.chunks:
+        return
+    if importer.item_ranges:
+        refresh_next_due(MaintenanceItem.query.filter(
+            or_(*(MaintenanceItem.id.between(first, last) for first, last in importer.item_ranges))))
+    rebuild_cost_rollups()
+    rebuild_usage_history()
+    db.session.commit()
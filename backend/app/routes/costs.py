@@ -0,0 +1,34 @@
+from datetime import date
+from flask import Blueprint, request, jsonify
+from app.services.costs import GROUPINGS, cost_totals, year_over_year
+from app.versioning import conditional
+
+bp = Blueprint('costs', __name__, url_prefix='/api/costs')
+
+COST_TABLES = ('assets', 'maintenance_items', 'maintenance_logs', 'general_maintenance')
+
+
+def _filters():
+    return {
+        'asset_id': request.args.get('asset_id', type=int),
+        'category': request.args.get('category') or None,
+    }
+
+
+@bp.route('', methods=['GET'])
+@conditional(*COST_TABLES)
+def get_costs():
+    """Cost totals grouped by asset, category, item or month, optionally for one year"""
+    group_by = request.args.get('group_by', 'month')
+    if group_by not in GROUPINGS:
+        return jsonify({'error': f'group_by must be one of {", ".join(GROUPINGS)}'}), 400
+
+    year = request.args.get('year', type=int)
+    return jsonify(cost_totals(group_by, year=year, **_filters()))
+
+
+@bp.route('/year-over-year', methods=['GET'])
+@conditional(*COST_TABLES)
+def get_year_over_year():
+    year = request.args.get('year', date.today().year, type=int)
+    return jsonify(year_over_year(year, **_filters()))
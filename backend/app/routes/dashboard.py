@@ -0,0 +1,67 @@
+from flask import Blueprint, request, jsonify
+from app.models import Asset
+from app.services.status import evaluate_items
+from app.services.usage import project_due_dates
+
+bp = Blueprint('dashboard', __name__, url_prefix='/api/dashboard')
+
+DEFAULT_URGENT_LIMIT = 3
+
+def asset_health(statuses):
+    if not statuses:
+        return {'score': 100, 'status': 'good', 'items_due': 0, 'items_overdue': 0}
+
+    items_overdue = sum(1 for s in statuses if s['status'] == 'overdue')
+    items_due = items_overdue + sum(1 for s in statuses if s['status'] == 'due-soon')
+    avg_percentage = sum(s['percentage_remaining'] for s in statuses) / len(statuses)
+
+    overall = 'good'
+    if items_overdue > 0:
+        overall = 'overdue'
+    elif items_due > 0 or avg_percentage < 50:
+        overall = 'due-soon'
+
+    return {
+        'score': round(avg_percentage),
+        'status': overall,
+        'items_due': items_due,
+        'items_overdue': items_overdue
+    }
+
+def urgency_key(entry):
+    # Items that have never been performed sort after everything that has a schedule
+    return (entry['status'] == 'never', entry['percentage_remaining'])
+
+@bp.route('', methods=['GET'])
+def get_dashboard():
+    """Summarise every asset's maintenance health in a fixed number of queries"""
+    limit = request.args.get('limit', DEFAULT_URGENT_LIMIT, type=int)
+
+    assets = Asset.query.order_by(Asset.id).all()
+
+    results = evaluate_items()
+    projected = project_due_dates(result['item'] for result in results)
+
+    entries_by_asset = {}
+    for result in results:
+        item = result['item']
+        entries_by_asset.setdefault(item.asset_id, []).append({
+            'id': item.id,
+            'name': item.name,
+            'maintenance_type': item.maintenance_type,
+            'status': result['status'],
+            'percentage_remaining': result['percentage_remaining'],
+            'projected_due_date': projected[item.id].isoformat() if item.id in projected else None
+        })
+
+    summary = []
+    for asset in assets:
+        entries = entries_by_asset.get(asset.id, [])
+
+        asset_data = asset.to_dict()
+        asset_data['items_tracked'] = len(entries)
+        asset_data['health'] = asset_health(entries)
+        asset_data['top_urgent_items'] = sorted(entries, key=urgency_key)[:max(0, limit)]
+        summary.append(asset_data)
+
+    return jsonify(summary)
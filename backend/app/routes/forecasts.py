@@ -0,0 +1,12 @@
+from flask import Blueprint, request, jsonify
+from app.services.usage import usage_forecasts
+from app.versioning import conditional
+
+bp = Blueprint('forecasts', __name__, url_prefix='/api/forecasts')
+
+@bp.route('', methods=['GET'])
+@conditional('assets', 'maintenance_items', 'maintenance_logs', 'general_maintenance')
+def get_forecasts():
+    """Usage rate per asset and projected due date per usage-based item"""
+    result = usage_forecasts(request.args.get('asset_id', type=int))
+    return jsonify(result)
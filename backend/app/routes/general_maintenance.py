@@ -1,14 +1,19 @@
 from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy.orm import selectinload
 from app import db
 from app.models import GeneralMaintenance, Asset, Attachment
+from app.pagination import keyset_paginate, InvalidCursor
+from app.serialization import InvalidFields, project, requested_fields
+from app.services.batch import handle_batch
+from app.services.storage import save_upload, release_upload
+from app.services.thumbnails import schedule_renditions
+from app.versioning import conditional
 from datetime import datetime
 from werkzeug.utils import secure_filename
 import os
 
 bp = Blueprint('general_maintenance', __name__, url_prefix='/api/general-maintenance')
 
-UPLOAD_FOLDER = 'uploads'
-
 def allowed_file(filename, app):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
@@ -20,22 +25,46 @@ def validate_file_size(file, app):
     return size <= app.config['MAX_ATTACHMENT_SIZE']
 
 @bp.route('', methods=['GET'])
+@conditional('general_maintenance', 'attachments')
 def get_all():
     """Get all general maintenance records, optionally filtered by asset_id"""
     asset_id = request.args.get('asset_id', type=int)
-
+    try:
+        fields = requested_fields(GeneralMaintenance.serializer)
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Pagination reads the date of the last row
+    query = project(GeneralMaintenance.query, GeneralMaintenance, fields, GeneralMaintenance.date_performed)
+    if fields is None or 'attachments' in fields:
+        query = query.options(selectinload(GeneralMaintenance.attachments))
     if asset_id:
-        records = GeneralMaintenance.query.filter_by(asset_id=asset_id).order_by(GeneralMaintenance.date_performed.desc()).all()
-    else:
-        records = GeneralMaintenance.query.order_by(GeneralMaintenance.date_performed.desc()).all()
+        query = query.filter_by(asset_id=asset_id)
 
-    return jsonify([record.to_dict() for record in records]), 200
+    # Unpaginated requests keep returning the full list
+    if 'cursor' not in request.args and 'limit' not in request.args:
+        records = query.order_by(GeneralMaintenance.date_performed.desc(), GeneralMaintenance.id.desc()).all()
+        return jsonify(GeneralMaintenance.serializer.dump_many(records, fields)), 200
+
+    try:
+        records, next_cursor = keyset_paginate(query, GeneralMaintenance.date_performed, GeneralMaintenance.id,
+                                               cursor=request.args.get('cursor'),
+                                               limit=request.args.get('limit', type=int))
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({'items': GeneralMaintenance.serializer.dump_many(records, fields), 'next_cursor': next_cursor}), 200
 
 @bp.route('/<int:id>', methods=['GET'])
+@conditional('general_maintenance', 'attachments')
 def get_one(id):
     """Get a specific general maintenance record"""
-    record = GeneralMaintenance.query.get_or_404(id)
-    return jsonify(record.to_dict()), 200
+    try:
+        fields = requested_fields(GeneralMaintenance.serializer)
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
+    record = project(GeneralMaintenance.query, GeneralMaintenance, fields).get_or_404(id)
+    return jsonify(record.to_dict(fields)), 200
 
 @bp.route('', methods=['POST'])
 def create():
@@ -69,25 +98,24 @@ def create():
     if len(files) > current_app.config['MAX_ATTACHMENTS_PER_LOG']:
         return jsonify({'error': f"Maximum {current_app.config['MAX_ATTACHMENTS_PER_LOG']} attachments allowed"}), 400
 
+    added = []
     for file in files:
         if file and file.filename and allowed_file(file.filename, current_app):
             if not validate_file_size(file, current_app):
                 return jsonify({'error': f"File {file.filename} exceeds maximum size of {current_app.config['MAX_ATTACHMENT_SIZE'] / (1024*1024)}MB"}), 400
 
-            filename = secure_filename(file.filename)
-            timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-            unique_filename = f"{timestamp}_{filename}"
-            filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
-            file.save(filepath)
+            stored = save_upload(file)
 
             attachment = Attachment(
-                filename=filename,
-                file_path=filepath,
+                filename=secure_filename(file.filename),
+                file_path=stored.path,
                 file_type=file.content_type,
-                file_size=os.path.getsize(filepath),
+                file_size=stored.size,
+                content_hash=stored.digest,
                 general_maintenance_id=record.id
             )
             db.session.add(attachment)
+            added.append(attachment)
         elif file and file.filename:
             return jsonify({'error': f"File type not allowed for {file.filename}"}), 400
 
@@ -96,9 +124,20 @@ def create():
         asset.current_usage = record.usage_reading
 
     db.session.commit()
+    schedule_renditions(added)
 
     return jsonify(record.to_dict()), 201
 
+@bp.route('/batch', methods=['POST'])
+def create_batch_general_maintenance():
+    """Create many general maintenance records from ``{"entries": [...]}`` in one transaction.
+
+    All-or-nothing unless ``"atomic": false``, which writes the valid entries
+    and answers 207 when some were rejected.
+    """
+    body, status = handle_batch(GeneralMaintenance, request.get_json(silent=True))
+    return jsonify(body), status
+
 @bp.route('/<int:id>', methods=['PUT'])
 def update(id):
     """Update a general maintenance record"""
@@ -126,29 +165,29 @@ def update(id):
     if total_attachments > current_app.config['MAX_ATTACHMENTS_PER_LOG']:
         return jsonify({'error': f"Maximum {current_app.config['MAX_ATTACHMENTS_PER_LOG']} attachments allowed"}), 400
 
+    added = []
     for file in files:
         if file and file.filename and allowed_file(file.filename, current_app):
             if not validate_file_size(file, current_app):
                 return jsonify({'error': f"File {file.filename} exceeds maximum size of {current_app.config['MAX_ATTACHMENT_SIZE'] / (1024*1024)}MB"}), 400
 
-            filename = secure_filename(file.filename)
-            timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-            unique_filename = f"{timestamp}_{filename}"
-            filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
-            file.save(filepath)
+            stored = save_upload(file)
 
             attachment = Attachment(
-                filename=filename,
-                file_path=filepath,
+                filename=secure_filename(file.filename),
+                file_path=stored.path,
                 file_type=file.content_type,
-                file_size=os.path.getsize(filepath),
+                file_size=stored.size,
+                content_hash=stored.digest,
                 general_maintenance_id=record.id
             )
             db.session.add(attachment)
+            added.append(attachment)
         elif file and file.filename:
             return jsonify({'error': f"File type not allowed for {file.filename}"}), 400
 
     db.session.commit()
+    schedule_renditions(added)
 
     return jsonify(record.to_dict()), 200
 
@@ -156,25 +195,24 @@ def update(id):
 def delete(id):
     """Delete a general maintenance record"""
     record = GeneralMaintenance.query.get_or_404(id)
-
-    for attachment in record.attachments:
-        if os.path.exists(attachment.file_path):
-            os.remove(attachment.file_path)
+    released = [attachment.file_path for attachment in record.attachments]
 
     db.session.delete(record)
     db.session.commit()
 
+    for path in released:
+        release_upload(path)
+
     return '', 204
 
 @bp.route('/attachments/<int:id>', methods=['DELETE'])
 def delete_attachment(id):
     """Delete a specific attachment"""
     attachment = Attachment.query.get_or_404(id)
-
-    if os.path.exists(attachment.file_path):
-        os.remove(attachment.file_path)
+    path = attachment.file_path
 
     db.session.delete(attachment)
     db.session.commit()
+    release_upload(path)
 
     return '', 204
@@ -1,22 +1,50 @@
 from flask import Blueprint, request, jsonify
+from sqlalchemy import select
 from app import db
-from app.models import MaintenanceItem, Asset
+from app.models import MaintenanceItem, MaintenanceLog, Asset
+from app.serialization import InvalidFields, project, requested_fields
+from app.services.status import refresh_next_due, due_items_query
+from app.services.storage import record_uploads, release_upload
+from app.versioning import conditional
+from datetime import datetime
 
 bp = Blueprint('maintenance_items', __name__, url_prefix='/api/maintenance-items')
 
 @bp.route('', methods=['GET'])
+# due_within compares against each asset's current usage, so asset writes change this list too
+@conditional('maintenance_items', 'assets')
 def get_maintenance_items():
     asset_id = request.args.get('asset_id', type=int)
-    if asset_id:
-        items = MaintenanceItem.query.filter_by(asset_id=asset_id).all()
+    due_before = request.args.get('due_before')
+    due_within = request.args.get('due_within', type=int)
+    try:
+        fields = requested_fields(MaintenanceItem.serializer)
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
+
+    if due_before or due_within is not None:
+        # Range query over the precomputed next-due columns
+        query = due_items_query(
+            due_before=datetime.fromisoformat(due_before).date() if due_before else None,
+            due_within=due_within
+        )
     else:
-        items = MaintenanceItem.query.all()
-    return jsonify([item.to_dict() for item in items])
+        query = MaintenanceItem.query
+
+    if asset_id:
+        query = query.filter(MaintenanceItem.asset_id == asset_id)
+    items = project(query, MaintenanceItem, fields).all()
+    return jsonify(MaintenanceItem.serializer.dump_many(items, fields))
 
 @bp.route('/<int:item_id>', methods=['GET'])
+@conditional('maintenance_items')
 def get_maintenance_item(item_id):
-    item = MaintenanceItem.query.get_or_404(item_id)
-    return jsonify(item.to_dict())
+    try:
+        fields = requested_fields(MaintenanceItem.serializer)
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
+    item = project(MaintenanceItem.query, MaintenanceItem, fields).get_or_404(item_id)
+    return jsonify(item.to_dict(fields))
 
 @bp.route('', methods=['POST'])
 def create_maintenance_item():
@@ -53,6 +81,7 @@ def update_maintenance_item(item_id):
     if 'reminders_enabled' in data:
         item.reminders_enabled = data['reminders_enabled']
 
+    refresh_next_due(MaintenanceItem.query.filter_by(id=item.id))
     db.session.commit()
 
     return jsonify(item.to_dict())
@@ -60,7 +89,12 @@ def update_maintenance_item(item_id):
 @bp.route('/<int:item_id>', methods=['DELETE'])
 def delete_maintenance_item(item_id):
     item = MaintenanceItem.query.get_or_404(item_id)
+    # Logs and their attachments go with the item; their files are released afterwards
+    released = record_uploads(log_ids=select(MaintenanceLog.id).where(MaintenanceLog.maintenance_item_id == item_id))
     db.session.delete(item)
     db.session.commit()
 
+    for path in released:
+        release_upload(path)
+
     return '', 204
@@ -1,7 +1,15 @@
 from flask import Blueprint, request, jsonify, current_app
 from werkzeug.utils import secure_filename
+from sqlalchemy.orm import selectinload
 from app import db
 from app.models import MaintenanceLog, MaintenanceItem, Asset, Attachment
+from app.services.status import refresh_next_due
+from app.pagination import keyset_paginate, InvalidCursor
+from app.serialization import InvalidFields, project, requested_fields
+from app.services.batch import handle_batch
+from app.services.storage import save_upload, release_upload
+from app.services.thumbnails import schedule_renditions
+from app.versioning import conditional
 from datetime import datetime
 import os
 
@@ -18,18 +26,44 @@ def validate_file_size(file):
     return size <= current_app.config['MAX_ATTACHMENT_SIZE']
 
 @bp.route('', methods=['GET'])
+@conditional('maintenance_logs', 'attachments')
 def get_maintenance_logs():
     item_id = request.args.get('maintenance_item_id', type=int)
+    try:
+        fields = requested_fields(MaintenanceLog.serializer)
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Pagination reads the date of the last row
+    query = project(MaintenanceLog.query, MaintenanceLog, fields, MaintenanceLog.date_performed)
+    if fields is None or 'attachments' in fields:
+        query = query.options(selectinload(MaintenanceLog.attachments))
     if item_id:
-        logs = MaintenanceLog.query.filter_by(maintenance_item_id=item_id).order_by(MaintenanceLog.date_performed.desc()).all()
-    else:
-        logs = MaintenanceLog.query.order_by(MaintenanceLog.date_performed.desc()).all()
-    return jsonify([log.to_dict() for log in logs])
+        query = query.filter_by(maintenance_item_id=item_id)
+
+    # Unpaginated requests keep returning the full list
+    if 'cursor' not in request.args and 'limit' not in request.args:
+        logs = query.order_by(MaintenanceLog.date_performed.desc(), MaintenanceLog.id.desc()).all()
+        return jsonify(MaintenanceLog.serializer.dump_many(logs, fields))
+
+    try:
+        logs, next_cursor = keyset_paginate(query, MaintenanceLog.date_performed, MaintenanceLog.id,
+                                            cursor=request.args.get('cursor'),
+                                            limit=request.args.get('limit', type=int))
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({'items': MaintenanceLog.serializer.dump_many(logs, fields), 'next_cursor': next_cursor})
 
 @bp.route('/<int:log_id>', methods=['GET'])
+@conditional('maintenance_logs', 'attachments')
 def get_maintenance_log(log_id):
-    log = MaintenanceLog.query.get_or_404(log_id)
-    return jsonify(log.to_dict())
+    try:
+        fields = requested_fields(MaintenanceLog.serializer)
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
+    log = project(MaintenanceLog.query, MaintenanceLog, fields).get_or_404(log_id)
+    return jsonify(log.to_dict(fields))
 
 @bp.route('', methods=['POST'])
 def create_maintenance_log():
@@ -46,12 +80,7 @@ def create_maintenance_log():
     if 'receipt_photo' in request.files:
         file = request.files['receipt_photo']
         if file and file.filename and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"{timestamp}_{filename}"
-            filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
-            receipt_photo = filename
+            receipt_photo = save_upload(file).name
 
     # Convert usage_reading and cost to appropriate types if provided
     usage_reading = int(data.get('usage_reading')) if data.get('usage_reading') else None
@@ -75,25 +104,24 @@ def create_maintenance_log():
     if len(files) > current_app.config['MAX_ATTACHMENTS_PER_LOG']:
         return jsonify({'error': f"Maximum {current_app.config['MAX_ATTACHMENTS_PER_LOG']} attachments allowed"}), 400
 
+    added = []
     for file in files:
         if file and file.filename and allowed_file(file.filename):
             if not validate_file_size(file):
                 return jsonify({'error': f"File {file.filename} exceeds maximum size of {current_app.config['MAX_ATTACHMENT_SIZE'] / (1024*1024)}MB"}), 400
 
-            filename = secure_filename(file.filename)
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            unique_filename = f"{timestamp}_{filename}"
-            filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename)
-            file.save(filepath)
+            stored = save_upload(file)
 
             attachment = Attachment(
-                filename=filename,
-                file_path=filepath,
+                filename=secure_filename(file.filename),
+                file_path=stored.path,
                 file_type=file.content_type,
-                file_size=os.path.getsize(filepath),
+                file_size=stored.size,
+                content_hash=stored.digest,
                 maintenance_log_id=log.id
             )
             db.session.add(attachment)
+            added.append(attachment)
         elif file and file.filename:
             return jsonify({'error': f"File type not allowed for {file.filename}"}), 400
 
@@ -103,10 +131,22 @@ def create_maintenance_log():
         if asset and asset.usage_metric and log.usage_reading > asset.current_usage:
             asset.current_usage = log.usage_reading
 
+    refresh_next_due(MaintenanceItem.query.filter_by(id=item.id))
     db.session.commit()
+    schedule_renditions(added)
 
     return jsonify(log.to_dict()), 201
 
+@bp.route('/batch', methods=['POST'])
+def create_batch_maintenance_logs():
+    """Create many maintenance logs from ``{"entries": [...]}`` in one transaction.
+
+    All-or-nothing unless ``"atomic": false``, which writes the valid entries
+    and answers 207 when some were rejected.
+    """
+    body, status = handle_batch(MaintenanceLog, request.get_json(silent=True))
+    return jsonify(body), status
+
 @bp.route('/<int:log_id>', methods=['PUT'])
 def update_maintenance_log(log_id):
     log = MaintenanceLog.query.get_or_404(log_id)
@@ -132,34 +172,34 @@ def update_maintenance_log(log_id):
     if total_attachments > current_app.config['MAX_ATTACHMENTS_PER_LOG']:
         return jsonify({'error': f"Maximum {current_app.config['MAX_ATTACHMENTS_PER_LOG']} attachments allowed per log"}), 400
 
+    added = []
     for file in files:
         if file and file.filename and allowed_file(file.filename):
             if not validate_file_size(file):
                 return jsonify({'error': f"File {file.filename} exceeds maximum size of {current_app.config['MAX_ATTACHMENT_SIZE'] / (1024*1024)}MB"}), 400
 
-            filename = secure_filename(file.filename)
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            unique_filename = f"{timestamp}_{filename}"
-            filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename)
-            file.save(filepath)
+            stored = save_upload(file)
 
             attachment = Attachment(
-                filename=filename,
-                file_path=filepath,
+                filename=secure_filename(file.filename),
+                file_path=stored.path,
                 file_type=file.content_type,
-                file_size=os.path.getsize(filepath),
+                file_size=stored.size,
+                content_hash=stored.digest,
                 maintenance_log_id=log.id
             )
             db.session.add(attachment)
+            added.append(attachment)
         elif file and file.filename:
             return jsonify({'error': f"File type not allowed for {file.filename}"}), 400
 
+    # Files are only released after commit, once no other row references them
+    released = []
+
     # Handle receipt removal
     if data.get('remove_receipt'):
         if log.receipt_photo:
-            filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], log.receipt_photo)
-            if os.path.exists(filepath):
-                os.remove(filepath)
+            released.append(log.receipt_photo)
             log.receipt_photo = None
 
     # Handle file upload (new receipt)
@@ -167,16 +207,8 @@ def update_maintenance_log(log_id):
         file = request.files['receipt_photo']
         if file and file.filename and allowed_file(file.filename):
             if log.receipt_photo:
-                old_filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], log.receipt_photo)
-                if os.path.exists(old_filepath):
-                    os.remove(old_filepath)
-
-            filename = secure_filename(file.filename)
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"{timestamp}_{filename}"
-            filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
-            log.receipt_photo = filename
+                released.append(log.receipt_photo)
+            log.receipt_photo = save_upload(file).name
 
     # Update asset usage if needed
     if log.usage_reading:
@@ -185,7 +217,12 @@ def update_maintenance_log(log_id):
         if asset and asset.usage_metric and log.usage_reading > asset.current_usage:
             asset.current_usage = log.usage_reading
 
+    refresh_next_due(MaintenanceItem.query.filter_by(id=log.maintenance_item_id))
     db.session.commit()
+    schedule_renditions(added)
+
+    for name in released:
+        release_upload(name)
 
     return jsonify(log.to_dict())
 
@@ -193,29 +230,29 @@ def update_maintenance_log(log_id):
 def delete_maintenance_log(log_id):
     log = MaintenanceLog.query.get_or_404(log_id)
 
+    released = [attachment.file_path for attachment in log.attachments]
     if log.receipt_photo:
-        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], log.receipt_photo)
-        if os.path.exists(filepath):
-            os.remove(filepath)
-
-    for attachment in log.attachments:
-        if os.path.exists(attachment.file_path):
-            os.remove(attachment.file_path)
+        released.append(log.receipt_photo)
 
+    item_id = log.maintenance_item_id
     db.session.delete(log)
+    db.session.flush()
+    refresh_next_due(MaintenanceItem.query.filter_by(id=item_id))
     db.session.commit()
 
+    for path in released:
+        release_upload(path)
+
     return '', 204
 
 @bp.route('/attachments/<int:id>', methods=['DELETE'])
 def delete_attachment(id):
     """Delete a specific attachment"""
     attachment = Attachment.query.get_or_404(id)
-
-    if os.path.exists(attachment.file_path):
-        os.remove(attachment.file_path)
+    path = attachment.file_path
 
     db.session.delete(attachment)
     db.session.commit()
+    release_upload(path)
 
     return '', 204
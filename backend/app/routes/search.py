@@ -0,0 +1,34 @@
+from flask import Blueprint, request, jsonify, current_app
+from app.models.search_index import SEARCH_SOURCES
+from app.pagination import decode_offset_cursor, encode_offset_cursor, InvalidCursor
+from app.services.search import search
+from app.versioning import TRACKED_TABLES, conditional
+
+bp = Blueprint('search', __name__, url_prefix='/api/search')
+
+SEARCH_PAGE_SIZE = 20
+
+
+@bp.route('', methods=['GET'])
+@conditional(*TRACKED_TABLES)
+def search_records():
+    """Ranked full-text search over assets, items, logs, general maintenance and attachment names"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+
+    kinds = [kind for kind in request.args.get('kind', '').split(',') if kind]
+    unknown = set(kinds) - set(SEARCH_SOURCES)
+    if unknown:
+        return jsonify({'error': f'kind must be among {", ".join(SEARCH_SOURCES)}'}), 400
+
+    limit = request.args.get('limit', SEARCH_PAGE_SIZE, type=int)
+    limit = min(max(limit, 1), current_app.config['MAX_PAGE_SIZE'])
+    try:
+        offset = decode_offset_cursor(request.args['cursor']) if request.args.get('cursor') else 0
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+
+    results, has_more = search(query, asset_id=request.args.get('asset_id', type=int), kinds=kinds,
+                               limit=limit, offset=offset)
+    return jsonify({'items': results, 'next_cursor': encode_offset_cursor(offset + limit) if has_more else None})
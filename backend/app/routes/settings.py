@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify
 from app import db
-from app.models import Settings
+from app.models import Settings, OutboxMessage
 
 bp = Blueprint('settings', __name__, url_prefix='/api/settings')
 
@@ -17,9 +17,10 @@ ALLOWED_KEYS = [
 
 @bp.route('', methods=['GET'])
 def get_settings():
+    stored = Settings.all()
     settings = {}
     for key in ALLOWED_KEYS:
-        value = Settings.get(key)
+        value = stored.get(key)
         if value is not None:
             # Don't expose the SMTP password in full
             if key == 'smtp_password' and value:
@@ -32,12 +33,16 @@ def get_settings():
 def update_settings():
     data = request.get_json()
 
+    updates = {}
     for key, value in data.items():
         if key in ALLOWED_KEYS:
             # Skip if password is the masked placeholder
             if key == 'smtp_password' and value == '••••••••':
                 continue
-            Settings.set(key, str(value) if value is not None else '')
+            updates[key] = str(value) if value is not None else ''
+
+    if updates:
+        Settings.update(updates)
 
     return jsonify({'message': 'Settings updated successfully'})
 
@@ -45,7 +50,14 @@ def update_settings():
 def test_email():
     from app.services.email import send_test_email
     try:
-        send_test_email()
-        return jsonify({'message': 'Test email sent successfully'})
+        message = send_test_email()
+        return jsonify({'message': 'Test email queued for delivery', 'outbox': message.to_dict()}), 202
     except Exception as e:
         return jsonify({'error': str(e)}), 400
+
+@bp.route('/outbox', methods=['GET'])
+def get_outbox():
+    """Most recent outbox messages with their delivery status"""
+    limit = min(request.args.get('limit', 20, type=int), 200)
+    messages = OutboxMessage.query.order_by(OutboxMessage.id.desc()).limit(limit).all()
+    return jsonify([m.to_dict() for m in messages])
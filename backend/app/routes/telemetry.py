@@ -0,0 +1,46 @@
+from flask import Blueprint, request, jsonify, current_app
+from app.services.telemetry import get_telemetry
+
+bp = Blueprint('telemetry', __name__, url_prefix='/api/telemetry')
+
+
+def _parse(entry):
+    if not isinstance(entry, dict):
+        raise ValueError('Reading must be an object')
+    try:
+        asset_id, reading = int(entry['asset_id']), int(entry['reading'])
+    except KeyError as e:
+        raise ValueError(f'{e.args[0]} is required') from e
+    except (TypeError, ValueError) as e:
+        raise ValueError('asset_id and reading must be integers') from e
+    if reading < 0:
+        raise ValueError('reading must not be negative')
+    return asset_id, reading
+
+
+@bp.route('', methods=['POST'])
+def ingest():
+    """Accept usage readings for many assets; they are written with the next periodic flush.
+
+    Body: ``{"readings": [{"asset_id": 1, "reading": 12345}, ...]}`` or a
+    bare array. Only the highest reading per asset is kept, and usage never
+    goes down. Readings for unknown assets or assets without a usage
+    metric are dropped at flush time.
+    """
+    data = request.get_json(silent=True)
+    entries = data.get('readings') if isinstance(data, dict) else data
+    if not isinstance(entries, list) or not entries:
+        return jsonify({'error': 'readings must be a non-empty list'}), 400
+    limit = current_app.config['MAX_TELEMETRY_READINGS']
+    if len(entries) > limit:
+        return jsonify({'error': f'At most {limit} readings are allowed per request'}), 400
+
+    readings = []
+    for index, entry in enumerate(entries):
+        try:
+            readings.append(_parse(entry))
+        except ValueError as e:
+            return jsonify({'error': str(e), 'index': index}), 400
+
+    waiting = get_telemetry().add(readings)
+    return jsonify({'accepted': len(readings), 'pending_assets': waiting}), 202
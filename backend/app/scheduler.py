@@ -0,0 +1,128 @@
+import os
+from datetime import datetime, timedelta
+from apscheduler.schedulers.background import BackgroundScheduler
+from app.services.reminders import check_and_send_reminders
+from app.services.outbox import run_delivery
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, every process behaves as the only one
+    fcntl = None
+
+
+class LeaderLock:
+    """Exclusive lock on a file, taken without blocking.
+
+    The operating system releases the lock when the holding process exits
+    or crashes, so another process can take over on its next attempt.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self):
+        return self._file is not None
+
+    def acquire(self):
+        if self.held:
+            return True
+        if fcntl is None:
+            self._file = True
+            return True
+
+        f = open(self.path, 'a+')
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+
+        # Record the leader for anyone inspecting the lock file
+        f.seek(0)
+        f.truncate()
+        f.write(f'{os.getpid()}\n')
+        f.flush()
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file not in (None, True):
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+        self._file = None
+
+
+def add_leader_jobs(app, scheduler):
+    """Jobs that must run in exactly one process: reminders and email delivery"""
+    # Run once shortly after taking over
+    scheduler.add_job(
+        func=check_and_send_reminders,
+        args=[app],
+        trigger='date',
+        run_date=datetime.now() + timedelta(seconds=30),
+        id='reminder_check_startup',
+        replace_existing=True
+    )
+    # Then daily at 8 AM
+    scheduler.add_job(
+        func=check_and_send_reminders,
+        args=[app],
+        trigger='cron',
+        hour=8,
+        minute=0,
+        id='reminder_check_daily',
+        replace_existing=True
+    )
+    # Deliver queued email; woken early whenever a message is queued in this process
+    scheduler.add_job(
+        func=run_delivery,
+        args=[app],
+        trigger='interval',
+        seconds=app.config['OUTBOX_POLL_SECONDS'],
+        id='outbox_delivery',
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+
+
+def run_election(app, scheduler, lock):
+    """Take the leader lock if it is free and start the leader jobs.
+
+    Returns True while this process is the leader.
+    """
+    if lock.held:
+        return True
+    if not lock.acquire():
+        return False
+    print(f'Process {os.getpid()} is now the scheduler leader')
+    add_leader_jobs(app, scheduler)
+    return True
+
+
+def start_scheduler(app):
+    """Start this process's scheduler; only the elected leader runs jobs.
+
+    Every process (each server worker, or the dev server's reloader child)
+    keeps trying the lock at LEADER_ELECTION_SECONDS, so leadership fails
+    over within that interval when the leader dies.
+    """
+    scheduler = BackgroundScheduler()
+    lock = LeaderLock(app.config['SCHEDULER_LOCK_FILE'])
+    run_election(app, scheduler, lock)
+    scheduler.add_job(
+        func=run_election,
+        args=[app, scheduler, lock],
+        trigger='interval',
+        seconds=app.config['LEADER_ELECTION_SECONDS'],
+        id='leader_election',
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+    scheduler.start()
+    app.extensions['scheduler'] = scheduler
+    app.extensions['scheduler_lock'] = lock
+    return scheduler
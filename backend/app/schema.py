@@ -0,0 +1,99 @@
+import sqlite3
+from sqlalchemy import inspect, text
+from app import db
+from app.models import AssetMonthlyCost, UsageReading
+from app.models.search_index import SEARCH_TABLE
+from app.services.costs import rebuild_cost_rollups
+from app.services.search import rebuild_search_index
+from app.services.status import refresh_next_due
+from app.services.usage import rebuild_usage_history
+
+
+def run_migrations(app):
+    """Add new columns to existing tables if they don't exist.
+
+    Returns True if the next-due columns were just added and need a rebuild.
+    """
+    needs_rebuild = False
+    db_path = app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', '')
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        # Check and add new columns to maintenance_items
+        cursor.execute("PRAGMA table_info(maintenance_items)")
+        columns = [col[1] for col in cursor.fetchall()]
+
+        if 'reminders_enabled' not in columns:
+            cursor.execute("ALTER TABLE maintenance_items ADD COLUMN reminders_enabled BOOLEAN DEFAULT 0")
+        if 'last_reminder_sent' not in columns:
+            cursor.execute("ALTER TABLE maintenance_items ADD COLUMN last_reminder_sent DATETIME")
+        if 'next_due_date' not in columns:
+            cursor.execute("ALTER TABLE maintenance_items ADD COLUMN next_due_date DATE")
+            needs_rebuild = True
+        if 'next_due_usage' not in columns:
+            cursor.execute("ALTER TABLE maintenance_items ADD COLUMN next_due_usage INTEGER")
+            needs_rebuild = True
+
+        cursor.execute("PRAGMA table_info(attachments)")
+        columns = [col[1] for col in cursor.fetchall()]
+        if 'content_hash' not in columns:
+            cursor.execute("ALTER TABLE attachments ADD COLUMN content_hash VARCHAR(64)")
+
+        # Covered by ix_outbox_messages_status_next_attempt; it only added write cost
+        cursor.execute("DROP INDEX IF EXISTS ix_outbox_messages_next_attempt_at")
+
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        print(f"Migration note: {e}")
+    return needs_rebuild
+
+
+def ensure_indexes():
+    """Create indexes declared on the models that an existing database lacks.
+
+    create_all() only creates indexes together with new tables. Returns the
+    names of the indexes created; the planner statistics are refreshed when
+    there are any, so SQLite starts choosing them straight away.
+    """
+    inspector = inspect(db.engine)
+    created = []
+    for table in db.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(db.engine)
+                created.append(index.name)
+    if created:
+        with db.engine.begin() as conn:
+            conn.execute(text('ANALYZE'))
+    return created
+
+
+def prepare_database(app):
+    """Create tables, apply column migrations and add missing indexes.
+
+    Run once per deployment before serving: ``run.py`` does it on import and
+    the production server does it in its master process before forking.
+    """
+    with app.app_context():
+        existing_tables = set(inspect(db.engine).get_table_names())
+        db.create_all()
+        if run_migrations(app):
+            refresh_next_due()
+            db.session.commit()
+        if AssetMonthlyCost.__tablename__ not in existing_tables:
+            # Databases from before cost rollups existed
+            rebuild_cost_rollups()
+            db.session.commit()
+        if UsageReading.__tablename__ not in existing_tables:
+            # Seed usage history from the readings already on logs and assets
+            rebuild_usage_history()
+            db.session.commit()
+        if SEARCH_TABLE not in existing_tables:
+            # Index the records written before search existed
+            rebuild_search_index()
+            db.session.commit()
+        for name in ensure_indexes():
+            print(f'Created index {name}')
@@ -0,0 +1,145 @@
+import json
+from functools import lru_cache
+from operator import attrgetter
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.orm import load_only
+
+try:
+    import orjson
+except ImportError:  # optional: the standard library encoder is used instead
+    orjson = None
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def iso(value):
+    return value.isoformat() if value else None
+
+
+def money(value):
+    return float(value) if value else None
+
+
+def _converted(get, convert):
+    return lambda obj: convert(get(obj))
+
+
+class Serializer:
+    """Turns model instances into dicts, optionally limited to some fields.
+
+    ``fields`` maps each output key to the attribute it comes from, an
+    ``(attribute, convert)`` pair, or a callable taking the instance. The
+    per-field work is resolved once for every distinct projection, so
+    serializing a row is one dict comprehension over prepared getters.
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.names = frozenset(fields)
+        self._compile = lru_cache(maxsize=64)(self._build)
+
+    def _build(self, names):
+        getters = []
+        for key, spec in self.fields.items():
+            if names is not None and key not in names:
+                continue
+            if callable(spec):
+                get = spec
+            elif isinstance(spec, tuple):
+                get = _converted(attrgetter(spec[0]), spec[1])
+            else:
+                get = attrgetter(spec)
+            getters.append((key, get))
+        getters = tuple(getters)
+
+        def serialize(obj):
+            return {key: get(obj) for key, get in getters}
+        return serialize
+
+    def columns(self, names):
+        """Attribute names that ``names`` read directly, for loading only those columns"""
+        names = self.names if names is None else names
+        return {spec if isinstance(spec, str) else spec[0]
+                for key, spec in self.fields.items() if key in names and not callable(spec)}
+
+    def dump(self, obj, names=None):
+        return self._compile(names)(obj)
+
+    def dump_many(self, objs, names=None):
+        serialize = self._compile(names)
+        return [serialize(obj) for obj in objs]
+
+
+def requested_fields(serializer):
+    """The ``fields`` query parameter as a frozenset, or None for every field.
+
+    Raises InvalidFields for names the serializer does not know.
+    """
+    raw = request.args.get('fields')
+    if not raw:
+        return None
+    names = frozenset(name.strip() for name in raw.split(',') if name.strip())
+    unknown = names - serializer.names
+    if unknown or not names:
+        raise InvalidFields(f'Unknown fields: {", ".join(sorted(unknown))}' if unknown else 'No fields given')
+    return names
+
+
+def project(query, model, names, *extra):
+    """Load only the columns that the fields in ``names`` read, plus ``extra``; every column when ``names`` is None"""
+    if names is None:
+        return query
+    columns = [getattr(model, column) for column in model.serializer.columns(names)]
+    return query.options(load_only(*columns, *extra))
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider with orjson doing the encoding.
+
+    Output matches the default provider: keys are sorted and anything
+    orjson does not handle itself (dates, decimals, UUIDs) goes through
+    the default provider's conversion.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Callers asking for specific json.dumps options get the standard encoder
+            return super().dumps(obj, **kwargs)
+        return self._dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def _dumps(self, obj):
+        options = orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if not self._compact:
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=options)
+
+    @property
+    def _compact(self):
+        return self.compact if self.compact is not None else not self._app.debug
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # Bytes straight from the encoder, without a round trip through str
+        return self._app.response_class(self._dumps(obj) + b'\n', mimetype=self.mimetype)
+
+
+def dumps(obj):
+    """Compact JSON text for streamed output such as exports, using orjson when available"""
+    if orjson is None:
+        return json.dumps(obj)
+    return orjson.dumps(obj, default=DefaultJSONProvider.default).decode('utf-8')
+
+
+def init_json(app):
+    """Use the orjson provider when ``JSON_PROVIDER`` allows it and orjson is installed"""
+    choice = app.config['JSON_PROVIDER']
+    if choice == 'orjson' and orjson is None:
+        raise RuntimeError('JSON_PROVIDER is orjson but orjson is not installed')
+    if choice in ('auto', 'orjson') and orjson is not None:
+        app.json = FastJSONProvider(app)
@@ -0,0 +1,633 @@
+import codecs
+import itertools
+import json
+import os
+import tarfile
+import time
+import zlib
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, date
+from werkzeug.utils import secure_filename
+from sqlalchemy import func, insert
+from sqlalchemy.orm import noload
+from app import begin_write, db
+from app.serialization import dumps
+from app.services.storage import is_blob_name, reference_count
+from app.models import Asset, MaintenanceItem, MaintenanceLog, GeneralMaintenance, Attachment
+
+BACKUP_VERSION = '2.0'
+
+# Rows fetched per round trip while streaming each table
+STREAM_BATCH_SIZE = 500
+
+# Bytes buffered before a chunk is handed to the WSGI server
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Bytes read from an uploaded backup per parse step
+READ_BLOCK_SIZE = 64 * 1024
+
+
+class _GroupedRows:
+    """Walk rows ordered by their parent's sort key, one parent at a time.
+
+    Every table is streamed with a single ordered query; children are
+    matched to their parent by advancing the child stream in lockstep,
+    so nothing beyond the current row is held in memory.
+    """
+
+    def __init__(self, rows, key):
+        self._rows = iter(rows)
+        self._key = key
+        self._next = next(self._rows, None)
+
+    def take(self, parent_key):
+        # Skip orphans whose parent sorts before the requested one
+        while self._next is not None and self._key(self._next) < parent_key:
+            self._next = next(self._rows, None)
+        while self._next is not None and self._key(self._next) == parent_key:
+            row = self._next
+            self._next = next(self._rows, None)
+            yield row
+
+
+def _open_object(data):
+    """JSON for ``data`` with the closing brace left off so more keys can follow"""
+    return dumps(data)[:-1]
+
+
+def _stream_queries():
+    """One ordered, batched query per table, shared by both export formats"""
+    assets = Asset.query.order_by(Asset.id).yield_per(STREAM_BATCH_SIZE)
+    items = (MaintenanceItem.query
+             .order_by(MaintenanceItem.asset_id, MaintenanceItem.id)
+             .yield_per(STREAM_BATCH_SIZE))
+    logs = (MaintenanceLog.query
+            .options(noload(MaintenanceLog.attachments))
+            .join(MaintenanceItem, MaintenanceLog.maintenance_item_id == MaintenanceItem.id)
+            .add_columns(MaintenanceItem.asset_id)
+            .order_by(MaintenanceItem.asset_id, MaintenanceItem.id, MaintenanceLog.id)
+            .yield_per(STREAM_BATCH_SIZE))
+    log_attachments = (Attachment.query
+                       .join(MaintenanceLog, Attachment.maintenance_log_id == MaintenanceLog.id)
+                       .join(MaintenanceItem, MaintenanceLog.maintenance_item_id == MaintenanceItem.id)
+                       .add_columns(MaintenanceItem.asset_id, MaintenanceItem.id)
+                       .order_by(MaintenanceItem.asset_id, MaintenanceItem.id, MaintenanceLog.id, Attachment.id)
+                       .yield_per(STREAM_BATCH_SIZE))
+    general = (GeneralMaintenance.query
+               .options(noload(GeneralMaintenance.attachments))
+               .order_by(GeneralMaintenance.asset_id, GeneralMaintenance.id)
+               .yield_per(STREAM_BATCH_SIZE))
+    general_attachments = (Attachment.query
+                           .join(GeneralMaintenance, Attachment.general_maintenance_id == GeneralMaintenance.id)
+                           .add_columns(GeneralMaintenance.asset_id)
+                           .order_by(GeneralMaintenance.asset_id, GeneralMaintenance.id, Attachment.id)
+                           .yield_per(STREAM_BATCH_SIZE))
+    return assets, items, logs, log_attachments, general, general_attachments
+
+
+def iter_export_json():
+    """Yield the nested v2.0 backup document piece by piece"""
+    assets, items, logs, log_attachments, general, general_attachments = _stream_queries()
+
+    items = _GroupedRows(items, key=lambda item: item.asset_id)
+    logs = _GroupedRows(logs, key=lambda row: (row[1], row[0].maintenance_item_id))
+    log_attachments = _GroupedRows(log_attachments, key=lambda row: (row[1], row[2], row[0].maintenance_log_id))
+    general = _GroupedRows(general, key=lambda gm: gm.asset_id)
+    general_attachments = _GroupedRows(general_attachments, key=lambda row: (row[1], row[0].general_maintenance_id))
+
+    yield _open_object({'export_date': datetime.utcnow().isoformat(), 'version': BACKUP_VERSION})
+    yield ', "assets": ['
+
+    for asset_index, asset in enumerate(assets):
+        if asset_index:
+            yield ', '
+        yield _open_object(asset.to_dict())
+
+        yield ', "maintenance_items": ['
+        for item_index, item in enumerate(items.take(asset.id)):
+            if item_index:
+                yield ', '
+            yield _open_object(item.to_dict())
+
+            yield ', "logs": ['
+            for log_index, (log, _) in enumerate(logs.take((asset.id, item.id))):
+                log_data = log.to_dict()
+                log_data['attachments'] = [att.to_dict() for att, _, _ in log_attachments.take((asset.id, item.id, log.id))]
+                yield (', ' if log_index else '') + dumps(log_data)
+            yield ']}'
+        yield ']'
+
+        yield ', "general_maintenance": ['
+        for gm_index, gm in enumerate(general.take(asset.id)):
+            gm_data = gm.to_dict()
+            gm_data['attachments'] = [att.to_dict() for att, _ in general_attachments.take((asset.id, gm.id))]
+            yield (', ' if gm_index else '') + dumps(gm_data)
+        yield ']}'
+
+    yield ']}\n'
+
+
+def iter_export_ndjson():
+    """Yield one JSON record per line, parents before children.
+
+    The first line is a header; every other line is
+    ``{"type": <table>, "data": <row>}`` with the row's original ids so
+    an importer can map foreign keys as it goes.
+    """
+    assets, items, logs, log_attachments, general, general_attachments = _stream_queries()
+
+    yield dumps({'type': 'header', 'export_date': datetime.utcnow().isoformat(),
+                      'version': BACKUP_VERSION, 'format': 'ndjson'}) + '\n'
+
+    for asset in assets:
+        yield dumps({'type': 'asset', 'data': asset.to_dict()}) + '\n'
+    for item in items:
+        yield dumps({'type': 'maintenance_item', 'data': item.to_dict()}) + '\n'
+    for log, _ in logs:
+        data = log.to_dict()
+        data.pop('attachments')
+        yield dumps({'type': 'maintenance_log', 'data': data}) + '\n'
+    for gm in general:
+        data = gm.to_dict()
+        data.pop('attachments')
+        yield dumps({'type': 'general_maintenance', 'data': data}) + '\n'
+    for att, _, _ in log_attachments:
+        yield dumps({'type': 'attachment', 'data': att.to_dict()}) + '\n'
+    for att, _ in general_attachments:
+        yield dumps({'type': 'attachment', 'data': att.to_dict()}) + '\n'
+
+
+def buffered(pieces, size=STREAM_CHUNK_SIZE):
+    """Coalesce many small strings into chunks of roughly ``size`` bytes"""
+    buffer = []
+    buffered_size = 0
+    for piece in pieces:
+        data = piece.encode('utf-8')
+        buffer.append(data)
+        buffered_size += len(data)
+        if buffered_size >= size:
+            yield b''.join(buffer)
+            buffer = []
+            buffered_size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzipped(chunks):
+    """Gzip a byte stream incrementally"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class _JSONReader:
+    """Incrementally decode JSON values from a binary stream"""
+
+    def __init__(self, stream, block_size=READ_BLOCK_SIZE):
+        self._stream = stream
+        self._block_size = block_size
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size=None):
+        if self._eof:
+            return False
+        block = self._stream.read(size or self._block_size)
+        if not block:
+            self._eof = True
+            self._buffer = self._buffer[self._pos:] + self._decoder.decode(b'', final=True)
+        else:
+            self._buffer = self._buffer[self._pos:] + self._decoder.decode(block)
+        self._pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character, or '' at end of input"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in ' \t\r\n':
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f'Expected {char!r} in backup file')
+        self._pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value"""
+        self.peek()
+        # Read geometrically larger blocks so a large value is not re-parsed once per block
+        size = self._block_size
+        while True:
+            try:
+                result, end = self._json.raw_decode(self._buffer, self._pos)
+                # A number at the end of the buffer may continue in the next block
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return result
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill(size)
+            size *= 2
+
+
+def iter_json_assets(stream):
+    """Yield each asset of a nested backup document without loading the whole file.
+
+    Only one asset's subtree is decoded at a time. Supports both the
+    current 'assets' key and the legacy 'vehicles' key.
+    """
+    reader = _JSONReader(stream)
+    reader.expect('{')
+    while reader.peek() != '}':
+        key = reader.value()
+        reader.expect(':')
+        if key in ('assets', 'vehicles') and reader.peek() == '[':
+            reader.expect('[')
+            while reader.peek() != ']':
+                yield reader.value()
+                if reader.peek() == ',':
+                    reader.expect(',')
+            reader.expect(']')
+        else:
+            reader.value()
+        if reader.peek() == ',':
+            reader.expect(',')
+        elif reader.peek() != '}':
+            raise ValueError('Invalid backup file format')
+
+
+def iter_ndjson_records(stream):
+    """Yield each record of an NDJSON backup, one line at a time"""
+    for line in codecs.getreader('utf-8')(stream):
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def _parse_date(value):
+    return date.fromisoformat(value[:10])
+
+
+class BulkImporter:
+    """Insert backup rows with executemany, committing every ``chunk_size`` rows.
+
+    Primary keys are assigned in memory from each table's current maximum,
+    so children can reference their parents without a flush per row. Other
+    writers may insert between chunks, so each chunk re-reads the maximum
+    under the write lock and, if its ids were taken, shifts them (and the
+    references to them) past it. ``item_ranges`` lists the committed
+    maintenance item ids as ``(first, last)`` ranges.
+    """
+
+    TABLES = (Asset, MaintenanceItem, MaintenanceLog, GeneralMaintenance, Attachment)
+
+    # Foreign key columns per table and the table each refers to
+    REFERENCES = {
+        Asset: {},
+        MaintenanceItem: {'asset_id': Asset},
+        MaintenanceLog: {'maintenance_item_id': MaintenanceItem},
+        GeneralMaintenance: {'asset_id': Asset},
+        Attachment: {'maintenance_log_id': MaintenanceLog, 'general_maintenance_id': GeneralMaintenance},
+    }
+
+    def __init__(self, chunk_size, progress=None):
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.chunks = 0
+        self.counts = {
+            'assets': 0,
+            'maintenance_items': 0,
+            'maintenance_logs': 0,
+            'general_maintenance': 0,
+            'attachments': 0
+        }
+        self._pending = {model: [] for model in self.TABLES}
+        self._pending_count = 0
+        self._next_id = {
+            model: (db.session.query(func.max(model.id)).scalar() or 0) + 1
+            for model in self.TABLES
+        }
+        # Per table, the first assigned id of each run of chunks inserted with the same shift
+        self._starts = {model: [] for model in self.TABLES}
+        self._shifts = {model: [] for model in self.TABLES}
+        self.item_ranges = []
+
+    def _add(self, model, row, count_key):
+        row['id'] = self._next_id[model]
+        self._next_id[model] += 1
+        self._pending[model].append(row)
+        self._pending_count += 1
+        self.counts[count_key] += 1
+        if self._pending_count >= self.chunk_size:
+            self.flush()
+        return row['id']
+
+    def add_asset(self, data):
+        return self._add(Asset, {
+            'name': data.get('name') or f"{data.get('year', '')} {data.get('make', '')} {data.get('model', '')}".strip(),
+            'description': data.get('description'),
+            'category': data.get('category'),
+            'location': data.get('location'),
+            'usage_metric': data.get('usage_metric'),
+            'current_usage': data.get('current_usage', data.get('current_mileage', 0))
+        }, 'assets')
+
+    def add_item(self, asset_id, data):
+        return self._add(MaintenanceItem, {
+            'asset_id': asset_id,
+            'name': data['name'],
+            'maintenance_type': data.get('maintenance_type', 'time'),
+            'frequency_value': data['frequency_value'],
+            'frequency_unit': data.get('frequency_unit'),
+            'notes': data.get('notes')
+        }, 'maintenance_items')
+
+    def add_log(self, item_id, data, receipt_photo=None):
+        return self._add(MaintenanceLog, {
+            'maintenance_item_id': item_id,
+            'date_performed': _parse_date(data['date_performed']),
+            'usage_reading': data.get('usage_reading', data.get('mileage')),
+            'cost': data.get('cost'),
+            'notes': data.get('notes'),
+            'receipt_photo': receipt_photo
+        }, 'maintenance_logs')
+
+    def add_general(self, asset_id, data):
+        return self._add(GeneralMaintenance, {
+            'asset_id': asset_id,
+            'description': data['description'],
+            'date_performed': _parse_date(data['date_performed']),
+            'usage_reading': data.get('usage_reading', data.get('mileage')),
+            'cost': data.get('cost'),
+            'notes': data.get('notes')
+        }, 'general_maintenance')
+
+    def add_attachment(self, data, file_path, maintenance_log_id=None, general_maintenance_id=None):
+        return self._add(Attachment, {
+            'filename': data['filename'],
+            'file_path': file_path,
+            'file_type': data.get('file_type'),
+            'file_size': data.get('file_size'),
+            'content_hash': data.get('content_hash'),
+            'maintenance_log_id': maintenance_log_id,
+            'general_maintenance_id': general_maintenance_id
+        }, 'attachments')
+
+    def add_nested_asset(self, asset_data):
+        """Import one asset from the nested JSON format with all its children"""
+        asset_id = self.add_asset(asset_data)
+        for item_data in asset_data.get('maintenance_items', []):
+            item_id = self.add_item(asset_id, item_data)
+            for log_data in item_data.get('logs', []):
+                self.add_log(item_id, log_data)
+        for gm_data in asset_data.get('general_maintenance', []):
+            self.add_general(asset_id, gm_data)
+
+    def resolve(self, model, assigned_id):
+        """The id a row given ``assigned_id`` by this importer was inserted with"""
+        index = bisect_right(self._starts[model], assigned_id) - 1
+        return assigned_id + self._shifts[model][index] if index >= 0 else assigned_id
+
+    def _shift(self, model, first):
+        # Under the write lock: nobody else can take ids until this chunk commits
+        shift = self._shifts[model][-1] if self._shifts[model] else 0
+        taken = db.session.query(func.max(model.id)).scalar() or 0
+        if first + shift <= taken:
+            shift = taken + 1 - first
+        if not self._shifts[model] or shift != self._shifts[model][-1]:
+            self._starts[model].append(first)
+            self._shifts[model].append(shift)
+        return shift
+
+    def flush(self):
+        """Bulk insert pending rows, parents first, and commit them as one chunk"""
+        if not self._pending_count:
+            return
+        begin_write()
+        items = None
+        for model in self.TABLES:
+            rows = self._pending[model]
+            if not rows:
+                continue
+            shift = self._shift(model, rows[0]['id'])
+            references = self.REFERENCES[model].items()
+            for row in rows:
+                row['id'] += shift
+                for column, parent in references:
+                    if row[column] is not None:
+                        row[column] = self.resolve(parent, row[column])
+            db.session.execute(insert(model), rows)
+            self._pending[model] = []
+            if model is MaintenanceItem:
+                items = (rows[0]['id'], rows[-1]['id'])
+        db.session.commit()
+
+        if items:
+            if self.item_ranges and self.item_ranges[-1][1] + 1 == items[0]:
+                self.item_ranges[-1] = (self.item_ranges[-1][0], items[1])
+            else:
+                self.item_ranges.append(items)
+        self._pending_count = 0
+        self.chunks += 1
+        if self.progress:
+            self.progress(self.chunks, self.counts)
+
+
+def import_ndjson(records, importer, files=None):
+    """Feed NDJSON backup records to ``importer``, remapping foreign keys.
+
+    Only old-to-new id maps are kept in memory. ``files`` maps stored
+    upload names from an archive to their restored names; without it,
+    attachment records and legacy receipts are skipped because their
+    files are not part of the backup.
+    """
+    asset_ids = {}
+    item_ids = {}
+    log_ids = {}
+    general_ids = {}
+    for record in records:
+        record_type = record.get('type')
+        data = record.get('data', {})
+        if record_type == 'asset':
+            asset_ids[data['id']] = importer.add_asset(data)
+        elif record_type == 'maintenance_item':
+            item_ids[data['id']] = importer.add_item(asset_ids[data['asset_id']], data)
+        elif record_type == 'maintenance_log':
+            receipt = files.get(data['receipt_photo']) if files and data.get('receipt_photo') else None
+            log_ids[data['id']] = importer.add_log(item_ids[data['maintenance_item_id']], data, receipt_photo=receipt)
+        elif record_type == 'general_maintenance':
+            general_ids[data['id']] = importer.add_general(asset_ids[data['asset_id']], data)
+        elif record_type == 'attachment' and files is not None:
+            stored = files.get(os.path.basename(data['file_path']))
+            if stored is None:
+                continue
+            importer.add_attachment(
+                data, files.path(stored),
+                maintenance_log_id=log_ids.get(data['maintenance_log_id']),
+                general_maintenance_id=general_ids.get(data['general_maintenance_id'])
+            )
+
+
+def _tar_member(name, size, mtime=None):
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = int(mtime if mtime is not None else time.time())
+    info.mode = 0o644
+    return info.tobuf(format=tarfile.PAX_FORMAT)
+
+
+def _tar_padding(size):
+    return b'\0' * (-size % tarfile.BLOCKSIZE)
+
+
+def iter_export_archive(upload_folder, chunk_size=1024 * 1024):
+    """Yield a tar archive of every referenced upload followed by the NDJSON data.
+
+    Members are written by hand so file contents stream straight from disk
+    in ``STREAM_CHUNK_SIZE`` reads, and the data is split into
+    ``data/NNNNN.ndjson`` members of known size instead of being staged in
+    a temporary file. Files come first so an importer knows every restored
+    name before it reaches the records that reference them.
+    """
+    stored_names = set()
+    names = itertools.chain(
+        (os.path.basename(path) for (path,) in db.session.query(Attachment.file_path)
+            .order_by(Attachment.id).yield_per(STREAM_BATCH_SIZE)),
+        (name for (name,) in db.session.query(MaintenanceLog.receipt_photo)
+            .filter(MaintenanceLog.receipt_photo.isnot(None))
+            .order_by(MaintenanceLog.id).yield_per(STREAM_BATCH_SIZE))
+    )
+    for name in names:
+        if not name or name in stored_names:
+            continue
+        path = os.path.join(upload_folder, name)
+        if not os.path.isfile(path):
+            continue
+        stored_names.add(name)
+
+        stat = os.stat(path)
+        yield _tar_member(f'uploads/{name}', stat.st_size, stat.st_mtime)
+        written = 0
+        with open(path, 'rb') as f:
+            while written < stat.st_size:
+                block = f.read(min(STREAM_CHUNK_SIZE, stat.st_size - written))
+                if not block:
+                    break
+                written += len(block)
+                yield block
+        # Pad a file that shrank while being read so the archive stays valid
+        if written < stat.st_size:
+            yield b'\0' * (stat.st_size - written)
+        yield _tar_padding(stat.st_size)
+
+    for index, chunk in enumerate(buffered(iter_export_ndjson(), size=chunk_size)):
+        yield _tar_member(f'data/{index:05d}.ndjson', len(chunk))
+        yield chunk
+        yield _tar_padding(len(chunk))
+
+    yield b'\0' * (2 * tarfile.BLOCKSIZE)
+
+
+class RestoredFiles:
+    """Write archive uploads into ``upload_folder`` on a thread pool.
+
+    Maps each stored name in the archive to the name it was restored as.
+    Content-addressed blobs that already exist on disk are reused as is;
+    other names that collide get a timestamp prefix. At most
+    ``workers * 2`` files are held in memory.
+    """
+
+    def __init__(self, upload_folder, workers):
+        self.upload_folder = upload_folder
+        self.workers = workers
+        self._names = {}
+        self._targets = set()
+        self._written = []
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._pending = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        # Lets in-flight writes finish; errors were already surfaced by wait()
+        self._executor.shutdown(wait=True)
+
+    def get(self, name):
+        return self._names.get(name)
+
+    def path(self, name):
+        return os.path.join(self.upload_folder, name)
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, name, content):
+        name = secure_filename(name)
+        if not name:
+            return
+        if is_blob_name(name) and os.path.exists(self.path(name)):
+            self._names[name] = name
+            return
+        target = name
+        if os.path.exists(self.path(target)) or target in self._targets:
+            target = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{len(self._names)}_{name}"
+        self._names[name] = target
+        self._targets.add(target)
+        self._written.append(target)
+
+        if len(self._pending) >= self.workers * 2:
+            done, self._pending = wait(self._pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                future.result()
+        self._pending.add(self._executor.submit(self._write, self.path(target), content))
+
+    @staticmethod
+    def _write(path, content):
+        with open(path, 'wb') as f:
+            f.write(content)
+
+    def wait(self):
+        for future in self._pending:
+            future.result()
+        self._pending = set()
+
+    def discard(self):
+        """Remove the files this restore wrote that no committed row points at, after a failed import"""
+        for future in self._pending:
+            future.exception()
+        self._pending = set()
+        for target in self._written:
+            path = self.path(target)
+            if os.path.exists(path) and reference_count(target) == 0:
+                os.remove(path)
+        self._written = []
+
+
+def iter_archive_records(stream, files):
+    """Read a backup archive sequentially, restoring uploads and yielding data records"""
+    with tarfile.open(fileobj=stream, mode='r|*') as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            directory, _, name = member.name.partition('/')
+            content = archive.extractfile(member)
+            if directory == 'uploads':
+                files.add(name, content.read())
+            elif directory == 'data' and name.endswith('.ndjson'):
+                # Data members always end on a line boundary
+                for line in content.read().decode('utf-8').splitlines():
+                    if line.strip():
+                        yield json.loads(line)
@@ -0,0 +1,175 @@
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func
+from app import begin_write, db
+from app.models import Asset, MaintenanceItem, MaintenanceLog
+from app.services.status import refresh_next_due
+
+
+class BatchError(ValueError):
+    """A batch request that cannot be processed at all, as opposed to one bad entry"""
+
+
+def _date(value):
+    return datetime.fromisoformat(value).date()
+
+
+def _optional(convert, value):
+    # Same rule as the single-record endpoints: empty values are stored as NULL
+    return convert(value) if value else None
+
+
+def _text(data, key):
+    value = data.get(key)
+    if value is not None and not isinstance(value, str):
+        raise ValueError(f'{key} must be a string')
+    return value
+
+
+def _parse_common(data):
+    if not data.get('date_performed'):
+        raise ValueError('date_performed is required')
+    notes = _text(data, 'notes')
+    try:
+        return {
+            'date_performed': _date(data['date_performed']),
+            'usage_reading': _optional(int, data.get('usage_reading')),
+            'cost': _optional(float, data.get('cost')),
+            'notes': notes,
+        }
+    except (TypeError, ValueError) as e:
+        raise ValueError(f'Invalid value: {e}') from e
+
+
+def _parent_id(data, key):
+    try:
+        return int(data.get(key))
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_log(data, items):
+    """Column values for one log entry; ``items`` maps the batch's item ids to their items"""
+    item = items.get(_parent_id(data, 'maintenance_item_id'))
+    if item is None:
+        raise ValueError('Maintenance item not found')
+    return {'maintenance_item_id': item.id, **_parse_common(data)}, item.asset_id
+
+
+def parse_general(data, assets):
+    """Column values for one general maintenance entry; ``assets`` maps the batch's asset ids to assets"""
+    description = _text(data, 'description')
+    if not description:
+        raise ValueError('description is required')
+    asset = assets.get(_parent_id(data, 'asset_id'))
+    if asset is None:
+        raise ValueError('Asset not found')
+    return {'asset_id': asset.id, 'description': description, **_parse_common(data)}, asset.id
+
+
+def _ids(entries, key):
+    return {_parent_id(entry, key) for entry in entries if isinstance(entry, dict)} - {None}
+
+
+def create_batch(model, entries, atomic=True):
+    """Validate every entry, then insert the valid ones in one transaction.
+
+    ``model`` is MaintenanceLog or GeneralMaintenance. With ``atomic`` any
+    invalid entry means nothing is written. Otherwise the valid entries are
+    written and the invalid ones reported. Each asset's ``current_usage``
+    is raised once, to the highest new reading, and the next-due values of
+    the affected items are recomputed once.
+
+    Returns ``(results, created)``, with one result per entry in order:
+    ``created`` with the new id, ``invalid`` with the error, or ``skipped``
+    when an atomic batch was rejected because of other entries.
+    """
+    if not isinstance(entries, list) or not entries:
+        raise BatchError('entries must be a non-empty list')
+    limit = current_app.config['MAX_BATCH_ENTRIES']
+    if len(entries) > limit:
+        raise BatchError(f'At most {limit} entries are allowed per batch')
+
+    # Validation and the insert see the same rows: nothing else writes in between
+    begin_write()
+
+    # One query for every referenced parent rather than one per entry
+    if model is MaintenanceLog:
+        wanted = _ids(entries, 'maintenance_item_id')
+        parents = {item.id: item for item in MaintenanceItem.query.filter(MaintenanceItem.id.in_(wanted))}
+        parse = parse_log
+    else:
+        wanted = _ids(entries, 'asset_id')
+        parents = {asset.id: asset for asset in Asset.query.filter(Asset.id.in_(wanted))}
+        parse = parse_general
+
+    parsed, errors = [], {}
+    for index, data in enumerate(entries):
+        if not isinstance(data, dict):
+            errors[index] = 'Entry must be an object'
+            continue
+        try:
+            parsed.append((index, *parse(data, parents)))
+        except ValueError as e:
+            errors[index] = str(e)
+
+    if errors and atomic:
+        db.session.rollback()
+        return [{'index': index, 'status': 'invalid', 'error': errors[index]} if index in errors
+                else {'index': index, 'status': 'skipped'} for index in range(len(entries))], 0
+
+    # Ids assigned up front, as the importer does, let the flush send one
+    # executemany INSERT; going through the session keeps the rollup and usage hooks.
+    # The write lock taken above keeps another worker from claiming them first.
+    first_id = (db.session.query(func.max(model.id)).scalar() or 0) + 1
+    records = [(index, model(id=record_id, **values), asset_id)
+               for record_id, (index, values, asset_id) in enumerate(parsed, first_id)]
+    db.session.add_all(record for _, record, _ in records)
+    db.session.flush()
+
+    highest = {}
+    for _, record, asset_id in records:
+        if record.usage_reading and record.usage_reading > highest.get(asset_id, 0):
+            highest[asset_id] = record.usage_reading
+    if highest:
+        for asset in Asset.query.filter(Asset.id.in_(highest)):
+            if asset.usage_metric and highest[asset.id] > (asset.current_usage or 0):
+                asset.current_usage = highest[asset.id]
+
+    if model is MaintenanceLog and records:
+        item_ids = {record.maintenance_item_id for _, record, _ in records}
+        refresh_next_due(MaintenanceItem.query.filter(MaintenanceItem.id.in_(item_ids)))
+    created = {index: record.id for index, record, _ in records}
+    db.session.commit()
+
+    return [{'index': index, 'status': 'created', 'id': created[index]} if index in created
+            else {'index': index, 'status': 'invalid', 'error': errors[index]}
+            for index in range(len(entries))], len(created)
+
+
+def handle_batch(model, data):
+    """Run a batch request body; returns ``(body, status)`` for the view to send.
+
+    ``data`` is ``{"entries": [...], "atomic": bool}`` or a bare list of
+    entries. 201 when every entry was created, 400 when the request or an
+    atomic batch was rejected, 207 when only some entries were written.
+    """
+    if isinstance(data, list):
+        data = {'entries': data}
+    if not isinstance(data, dict):
+        return {'error': 'Expected a JSON object with an entries list'}, 400
+
+    atomic = data.get('atomic', True) is not False
+    try:
+        results, created = create_batch(model, data.get('entries'), atomic=atomic)
+    except BatchError as e:
+        return {'error': str(e)}, 400
+
+    invalid = sum(result['status'] == 'invalid' for result in results)
+    body = {'created': created, 'invalid': invalid, 'results': results}
+    if created == len(results):
+        return body, 201
+    if not created and atomic:
+        body['error'] = 'No entries were created because some are invalid'
+        return body, 400
+    return body, 207
@@ -0,0 +1,253 @@
+from datetime import date
+from itertools import chain
+from sqlalchemy import Integer, cast, delete, event, func, inspect, insert, select, union_all
+from app import db
+from app.models import (Asset, MaintenanceItem, MaintenanceLog, GeneralMaintenance,
+                        AssetMonthlyCost, ItemYearlyCost)
+
+GROUPINGS = ('asset', 'category', 'item', 'month')
+
+logs = MaintenanceLog.__table__
+items = MaintenanceItem.__table__
+general = GeneralMaintenance.__table__
+asset_months = AssetMonthlyCost.__table__
+item_years = ItemYearlyCost.__table__
+
+
+def _month_key(day):
+    return f'{day.year:04d}-{day.month:02d}'
+
+
+def _month_bounds(month):
+    year, number = int(month[:4]), int(month[5:])
+    start = date(year, number, 1)
+    end = date(year + 1, 1, 1) if number == 12 else date(year, number + 1, 1)
+    return start, end
+
+
+def _sum_and_count(column):
+    return func.coalesce(func.sum(column), 0), func.count(column)
+
+
+def refresh_asset_months(connection, keys):
+    """Recompute the ``(asset_id, 'YYYY-MM')`` rollups in ``keys`` from the source rows"""
+    for asset_id, month in keys:
+        start, end = _month_bounds(month)
+        scheduled, scheduled_entries = connection.execute(
+            select(*_sum_and_count(logs.c.cost))
+            .select_from(logs.join(items, logs.c.maintenance_item_id == items.c.id))
+            .where(items.c.asset_id == asset_id, logs.c.date_performed >= start, logs.c.date_performed < end)
+        ).one()
+        general_cost, general_entries = connection.execute(
+            select(*_sum_and_count(general.c.cost))
+            .where(general.c.asset_id == asset_id, general.c.date_performed >= start, general.c.date_performed < end)
+        ).one()
+
+        connection.execute(delete(asset_months).where(asset_months.c.asset_id == asset_id,
+                                                      asset_months.c.month == month))
+        if scheduled_entries or general_entries:
+            connection.execute(insert(asset_months).values(
+                asset_id=asset_id, month=month, scheduled_cost=scheduled, general_cost=general_cost,
+                entries=scheduled_entries + general_entries,
+            ))
+
+
+def refresh_item_years(connection, keys):
+    """Recompute the ``(maintenance_item_id, year)`` rollups in ``keys`` from the logs"""
+    for item_id, asset_id, year in keys:
+        cost, entries = connection.execute(
+            select(*_sum_and_count(logs.c.cost))
+            .where(logs.c.maintenance_item_id == item_id,
+                   logs.c.date_performed >= date(year, 1, 1), logs.c.date_performed < date(year + 1, 1, 1))
+        ).one()
+
+        connection.execute(delete(item_years).where(item_years.c.maintenance_item_id == item_id,
+                                                    item_years.c.year == year))
+        if entries:
+            connection.execute(insert(item_years).values(
+                maintenance_item_id=item_id, year=year, asset_id=asset_id, cost=cost, entries=entries,
+            ))
+
+
+def _values(obj, attribute):
+    """Current and pre-flush values of ``attribute``, so moved records clear their old rollup too"""
+    history = inspect(obj).attrs[attribute].history
+    return {value for value in chain(history.unchanged, history.added, history.deleted) if value is not None}
+
+
+@event.listens_for(db.session, 'after_flush')
+def _refresh_flushed(session, flush_context):
+    # Records written one at a time through the ORM; bulk loads call rebuild_cost_rollups()
+    cost_fields = {MaintenanceLog: ('cost', 'date_performed', 'maintenance_item_id'),
+                   GeneralMaintenance: ('cost', 'date_performed', 'asset_id')}
+    changed = [obj for obj in chain(session.new, session.deleted, session.dirty)
+               if type(obj) in cost_fields and (obj not in session.dirty or any(
+                   inspect(obj).attrs[name].history.has_changes() for name in cost_fields[type(obj)]))]
+    if not changed:
+        return
+
+    connection = session.connection()
+    # Items deleted in this flush (asset deletes cascade) are only known to the session
+    item_assets = {obj.id: obj.asset_id for obj in chain(session.new, session.deleted, session.dirty)
+                   if isinstance(obj, MaintenanceItem)}
+    wanted = {item_id for obj in changed if isinstance(obj, MaintenanceLog)
+              for item_id in _values(obj, 'maintenance_item_id')} - set(item_assets)
+    if wanted:
+        item_assets.update(connection.execute(
+            select(items.c.id, items.c.asset_id).where(items.c.id.in_(wanted))
+        ).all())
+
+    months, years = set(), set()
+    for obj in changed:
+        days = _values(obj, 'date_performed')
+        if isinstance(obj, MaintenanceLog):
+            for item_id in _values(obj, 'maintenance_item_id'):
+                asset_id = item_assets.get(item_id)
+                if asset_id is None:
+                    continue
+                months.update((asset_id, _month_key(day)) for day in days)
+                years.update((item_id, asset_id, day.year) for day in days)
+        else:
+            months.update((asset_id, _month_key(day)) for asset_id in _values(obj, 'asset_id') for day in days)
+
+    refresh_asset_months(connection, sorted(months))
+    refresh_item_years(connection, sorted(years))
+
+
+def rebuild_cost_rollups():
+    """Recompute every rollup from the source tables; returns the number of rollup rows"""
+    month = func.strftime('%Y-%m', logs.c.date_performed)
+    scheduled = (
+        select(items.c.asset_id.label('asset_id'), month.label('month'),
+               func.sum(logs.c.cost).label('scheduled_cost'), db.literal(0).label('general_cost'),
+               func.count(logs.c.cost).label('entries'))
+        .select_from(logs.join(items, logs.c.maintenance_item_id == items.c.id))
+        .where(logs.c.cost.isnot(None))
+        .group_by(items.c.asset_id, month)
+    )
+    general_month = func.strftime('%Y-%m', general.c.date_performed)
+    general_rows = (
+        select(general.c.asset_id, general_month, db.literal(0), func.sum(general.c.cost),
+               func.count(general.c.cost))
+        .where(general.c.cost.isnot(None))
+        .group_by(general.c.asset_id, general_month)
+    )
+    combined = union_all(scheduled, general_rows).subquery()
+
+    year = cast(func.strftime('%Y', logs.c.date_performed), Integer)
+
+    db.session.execute(delete(AssetMonthlyCost))
+    db.session.execute(delete(ItemYearlyCost))
+    db.session.execute(insert(AssetMonthlyCost).from_select(
+        ['asset_id', 'month', 'scheduled_cost', 'general_cost', 'entries'],
+        select(combined.c.asset_id, combined.c.month, func.sum(combined.c.scheduled_cost),
+               func.sum(combined.c.general_cost), func.sum(combined.c.entries))
+        .group_by(combined.c.asset_id, combined.c.month)
+    ))
+    db.session.execute(insert(ItemYearlyCost).from_select(
+        ['maintenance_item_id', 'year', 'asset_id', 'cost', 'entries'],
+        select(logs.c.maintenance_item_id, year, items.c.asset_id, func.sum(logs.c.cost), func.count(logs.c.cost))
+        .select_from(logs.join(items, logs.c.maintenance_item_id == items.c.id))
+        .where(logs.c.cost.isnot(None))
+        .group_by(logs.c.maintenance_item_id, year)
+    ))
+    return AssetMonthlyCost.query.count() + ItemYearlyCost.query.count()
+
+
+def _money(value):
+    return round(float(value or 0), 2)
+
+
+def _month_filters(query, year=None, asset_id=None, category=None):
+    if year is not None:
+        query = query.where(asset_months.c.month >= f'{year:04d}-01', asset_months.c.month <= f'{year:04d}-12')
+    if asset_id is not None:
+        query = query.where(asset_months.c.asset_id == asset_id)
+    if category is not None:
+        query = query.where(Asset.category == category)
+    return query
+
+
+def cost_totals(group_by, year=None, asset_id=None, category=None):
+    """Cost totals grouped by ``asset``, ``category``, ``item`` or ``month``, read from the rollups"""
+    if group_by == 'item':
+        query = (
+            select(item_years.c.maintenance_item_id, MaintenanceItem.name, Asset.id, Asset.name,
+                   func.sum(item_years.c.cost).label('total'), func.sum(item_years.c.entries))
+            .select_from(item_years)
+            .join(MaintenanceItem, MaintenanceItem.id == item_years.c.maintenance_item_id)
+            .join(Asset, Asset.id == item_years.c.asset_id)
+            .group_by(item_years.c.maintenance_item_id)
+            .order_by(func.sum(item_years.c.cost).desc(), item_years.c.maintenance_item_id)
+        )
+        if year is not None:
+            query = query.where(item_years.c.year == year)
+        if asset_id is not None:
+            query = query.where(item_years.c.asset_id == asset_id)
+        if category is not None:
+            query = query.where(Asset.category == category)
+        return [{
+            'maintenance_item_id': item_id, 'item_name': item_name,
+            'asset_id': item_asset_id, 'asset_name': asset_name,
+            'total_cost': _money(total), 'entries': entries,
+        } for item_id, item_name, item_asset_id, asset_name, total, entries in db.session.execute(query)]
+
+    keys = {
+        'asset': (Asset.id, Asset.name, Asset.category),
+        'category': (Asset.category,),
+        'month': (asset_months.c.month,),
+    }[group_by]
+    scheduled = func.sum(asset_months.c.scheduled_cost)
+    general_total = func.sum(asset_months.c.general_cost)
+    query = (
+        select(*keys, scheduled, general_total, func.sum(asset_months.c.entries))
+        .select_from(asset_months)
+        .group_by(*keys)
+        .order_by(*keys if group_by == 'month' else ((scheduled + general_total).desc(), *keys))
+    )
+    if group_by != 'month' or category is not None:
+        query = query.join(Asset, Asset.id == asset_months.c.asset_id)
+    query = _month_filters(query, year, asset_id, category)
+
+    results = []
+    for row in db.session.execute(query):
+        *values, scheduled_cost, general_cost, entries = row
+        if group_by == 'asset':
+            entry = {'asset_id': values[0], 'asset_name': values[1], 'category': values[2]}
+        else:
+            entry = {group_by: values[0]}
+        entry.update({
+            'scheduled_cost': _money(scheduled_cost),
+            'general_cost': _money(general_cost),
+            'total_cost': _money((scheduled_cost or 0) + (general_cost or 0)),
+            'entries': entries,
+        })
+        results.append(entry)
+    return results
+
+
+def _change(current, previous):
+    return {
+        'current': _money(current),
+        'previous': _money(previous),
+        'change': _money(current - previous),
+        'change_percent': round((current - previous) / previous * 100, 1) if previous else None,
+    }
+
+
+def year_over_year(year, asset_id=None, category=None):
+    """Monthly and annual totals for ``year`` next to the year before"""
+    totals = {}
+    for previous in (False, True):
+        for entry in cost_totals('month', year - 1 if previous else year, asset_id, category):
+            number = int(entry['month'][5:])
+            totals.setdefault(number, [0, 0])[int(previous)] += entry['total_cost']
+
+    months = [{'month': number, **_change(*totals.get(number, (0, 0)))} for number in range(1, 13)]
+    return {
+        'year': year,
+        'previous_year': year - 1,
+        'months': months,
+        'total': _change(sum(current for current, _ in totals.values()),
+                         sum(previous for _, previous in totals.values())),
+    }
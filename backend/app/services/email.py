@@ -1,7 +1,11 @@
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from app import db
 from app.models.settings import Settings
+from app.models.outbox import OutboxMessage
+
+SMTP_TIMEOUT = 30
 
 
 def get_smtp_config():
@@ -14,22 +18,50 @@ def get_smtp_config():
     }
 
 
-def send_email(to_email, subject, html_body):
-    config = get_smtp_config()
+def ensure_smtp_configured(config):
     if not config['host'] or not config['username'] or not config['password']:
         raise ValueError('SMTP not configured. Please set up email settings.')
 
+
+def build_message(sender, to_email, subject, html_body):
     msg = MIMEMultipart('alternative')
     msg['Subject'] = subject
-    msg['From'] = config['username']
+    msg['From'] = sender
     msg['To'] = to_email
     msg.attach(MIMEText(html_body, 'html'))
+    return msg
 
-    with smtplib.SMTP(config['host'], config['port']) as server:
+
+def open_smtp_connection(config):
+    """Connect, upgrade to TLS if configured and log in; the caller closes it"""
+    server = smtplib.SMTP(config['host'], config['port'], timeout=SMTP_TIMEOUT)
+    try:
         if config['use_tls']:
             server.starttls()
         server.login(config['username'], config['password'])
-        server.sendmail(config['username'], to_email, msg.as_string())
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+def queue_email(to_email, subject, html_body, commit=True):
+    """Store a message in the outbox for background delivery.
+
+    With ``commit=False`` the message is only added to the session, so it
+    commits together with the caller's other writes; the caller then wakes
+    delivery itself.
+    """
+    ensure_smtp_configured(get_smtp_config())
+
+    message = OutboxMessage(to_email=to_email, subject=subject, html_body=html_body)
+    db.session.add(message)
+    if commit:
+        db.session.commit()
+
+        from app.services.outbox import wake_delivery
+        wake_delivery()
+    return message
 
 
 def send_test_email():
@@ -37,14 +69,14 @@ def send_test_email():
     if not to_email:
         raise ValueError('No notification email configured.')
 
-    send_email(
+    return queue_email(
         to_email,
         'Upkeep - Test Notification',
         '<h2>Upkeep</h2><p>This is a test email. Your notification settings are working correctly!</p>'
     )
 
 
-def send_reminder_email(to_email, items_due):
+def send_reminder_email(to_email, items_due, commit=True):
     if not items_due:
         return
 
@@ -85,4 +117,4 @@ def send_reminder_email(to_email, items_due):
     </div>
     '''
 
-    send_email(to_email, f'Upkeep - {len(items_due)} item(s) need attention', html)
+    return queue_email(to_email, f'Upkeep - {len(items_due)} item(s) need attention', html, commit=commit)
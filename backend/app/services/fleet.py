@@ -0,0 +1,145 @@
+import hashlib
+import random
+from datetime import date, timedelta
+from sqlalchemy import func, insert
+from app import db
+from app.models import Asset, MaintenanceItem, MaintenanceLog, GeneralMaintenance, Attachment
+from app.services.costs import rebuild_cost_rollups
+from app.services.status import refresh_next_due
+from app.services.usage import rebuild_usage_history
+
+ASSET_KINDS = [
+    ('Vehicle', 'miles', ['Oil Change', 'Tire Rotation', 'Brake Pads', 'Air Filter', 'Coolant Flush']),
+    ('Generator', 'hours', ['Oil Change', 'Spark Plug', 'Fuel Filter', 'Load Test']),
+    ('Building', None, ['HVAC Filter', 'Smoke Detectors', 'Gutter Cleaning', 'Roof Inspection']),
+    ('Boat', 'hours', ['Impeller', 'Hull Cleaning', 'Zincs', 'Winterize']),
+]
+TIME_UNITS = [('days', 30, 180), ('weeks', 2, 26), ('months', 1, 24), ('years', 1, 5)]
+ATTACHMENT_TYPES = [('receipt.jpg', 'image/jpeg'), ('invoice.pdf', 'application/pdf'), ('notes.txt', 'text/plain')]
+
+
+def _next_id(model):
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+
+def _spread(total, buckets):
+    """Split ``total`` into ``buckets`` near-equal whole counts"""
+    base, extra = divmod(total, buckets) if buckets else (0, 0)
+    return [base + (1 if n < extra else 0) for n in range(buckets)]
+
+
+class FleetGenerator:
+    """Insert a reproducible synthetic fleet in chunks of ``chunk_size`` rows.
+
+    Totals are spread evenly: ``items`` across assets and ``logs`` across
+    items. ``attachment_ratio`` of logs get attachment metadata (no files
+    are written). The same ``seed`` always yields the same data.
+    """
+
+    TABLES = [Asset, MaintenanceItem, MaintenanceLog, GeneralMaintenance, Attachment]
+
+    def __init__(self, seed=42, chunk_size=5000, attachment_ratio=0.2, general_per_asset=2, progress=None):
+        self.random = random.Random(seed)
+        self.chunk_size = chunk_size
+        self.attachment_ratio = attachment_ratio
+        self.general_per_asset = general_per_asset
+        self.progress = progress
+        self.pending = {model: [] for model in self.TABLES}
+        self.counts = {model.__tablename__: 0 for model in self.TABLES}
+        self.today = date.today()
+
+    def _add(self, model, row):
+        self.pending[model].append(row)
+        if len(self.pending[model]) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        # Parents before children, so foreign keys always resolve
+        for model in self.TABLES:
+            rows = self.pending[model]
+            if rows:
+                db.session.execute(insert(model), rows)
+                self.counts[model.__tablename__] += len(rows)
+                self.pending[model] = []
+        db.session.commit()
+        if self.progress:
+            self.progress(self.counts)
+
+    def generate(self, assets, items, logs):
+        asset_id = _next_id(Asset)
+        item_id = _next_id(MaintenanceItem)
+        log_id = _next_id(MaintenanceLog)
+        general_id = _next_id(GeneralMaintenance)
+        first_item_id = item_id
+
+        items_per_asset = _spread(items, assets)
+        logs_per_item = _spread(logs, items)
+        rng = self.random
+
+        for n, item_count in enumerate(items_per_asset):
+            kind, metric, item_names = ASSET_KINDS[n % len(ASSET_KINDS)]
+            usage = rng.randint(1000, 150000) if metric else 0
+            self._add(Asset, {
+                'id': asset_id, 'name': f'{kind} {asset_id}', 'category': kind,
+                'location': f'Site {rng.randint(1, 50)}', 'usage_metric': metric, 'current_usage': usage,
+            })
+
+            for g in range(self.general_per_asset):
+                self._add(GeneralMaintenance, {
+                    'id': general_id, 'asset_id': asset_id, 'description': f'Repair {g + 1}',
+                    'date_performed': self.today - timedelta(days=rng.randint(0, 1500)),
+                    'cost': round(rng.uniform(20, 900), 2),
+                })
+                general_id += 1
+
+            for i in range(item_count):
+                log_count = logs_per_item[item_id - first_item_id]
+                if metric and i % 2 == 0:
+                    frequency = rng.choice([100, 250, 500, 1000, 3000, 5000])
+                    item = {'maintenance_type': 'usage', 'frequency_value': frequency, 'frequency_unit': metric}
+                else:
+                    unit, low, high = rng.choice(TIME_UNITS)
+                    frequency = rng.randint(low, high)
+                    item = {'maintenance_type': 'time', 'frequency_value': frequency, 'frequency_unit': unit}
+                self._add(MaintenanceItem, {
+                    'id': item_id, 'asset_id': asset_id, 'reminders_enabled': rng.random() < 0.3,
+                    'name': f'{item_names[i % len(item_names)]} {i // len(item_names) + 1}', **item,
+                })
+
+                # Logs walk back from today at roughly the item's interval
+                performed = self.today - timedelta(days=rng.randint(0, 60))
+                reading = usage
+                for _ in range(log_count):
+                    self._add(MaintenanceLog, {
+                        'id': log_id, 'maintenance_item_id': item_id, 'date_performed': performed,
+                        'usage_reading': reading if metric else None,
+                        'cost': round(rng.uniform(10, 400), 2) if rng.random() < 0.7 else None,
+                    })
+                    if rng.random() < self.attachment_ratio:
+                        self._add_attachment(log_id)
+                    performed -= timedelta(days=rng.randint(14, 120))
+                    reading = max(0, reading - rng.randint(100, 5000))
+                    log_id += 1
+                item_id += 1
+            asset_id += 1
+
+        self.flush()
+        for start in range(first_item_id, item_id, self.chunk_size):
+            refresh_next_due(MaintenanceItem.query.filter(
+                MaintenanceItem.id >= start, MaintenanceItem.id < start + self.chunk_size
+            ))
+            db.session.commit()
+        rebuild_cost_rollups()
+        rebuild_usage_history()
+        db.session.commit()
+        return dict(self.counts)
+
+    def _add_attachment(self, log_id):
+        filename, file_type = self.random.choice(ATTACHMENT_TYPES)
+        digest = hashlib.sha256(f'synthetic-{log_id}'.encode('ascii')).hexdigest()
+        extension = filename.rsplit('.', 1)[1]
+        self._add(Attachment, {
+            'filename': filename, 'file_path': f'{digest}.{extension}', 'file_type': file_type,
+            'file_size': self.random.randint(20_000, 8_000_000), 'content_hash': digest,
+            'maintenance_log_id': log_id,
+        })
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.models import OutboxMessage
+from app.services.email import get_smtp_config, ensure_smtp_configured, build_message, open_smtp_connection
+
+
+def retry_delay(attempts):
+    """Exponential backoff: base, 2x base, 4x base ... capped at the configured maximum"""
+    base = current_app.config['OUTBOX_RETRY_BASE_SECONDS']
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), current_app.config['OUTBOX_RETRY_MAX_SECONDS']))
+
+
+def record_failure(message, error, now):
+    message.attempts += 1
+    message.last_error = str(error)
+    if message.attempts >= current_app.config['OUTBOX_MAX_ATTEMPTS']:
+        message.status = 'failed'
+    else:
+        message.next_attempt_at = now + retry_delay(message.attempts)
+
+
+def deliver_pending():
+    """Send due outbox messages over a single authenticated SMTP connection.
+
+    Returns the number of messages delivered. Must run inside an app context.
+    """
+    now = datetime.utcnow()
+    messages = (OutboxMessage.query
+                .filter(OutboxMessage.status == 'pending', OutboxMessage.next_attempt_at <= now)
+                .order_by(OutboxMessage.next_attempt_at, OutboxMessage.id)
+                .limit(current_app.config['OUTBOX_BATCH_SIZE'])
+                .all())
+    if not messages:
+        return 0
+
+    config = get_smtp_config()
+    try:
+        ensure_smtp_configured(config)
+        server = open_smtp_connection(config)
+    except Exception as e:
+        # Nothing could be sent; every message in the batch waits for the next attempt
+        for message in messages:
+            record_failure(message, e, now)
+        db.session.commit()
+        return 0
+
+    delivered = 0
+    try:
+        for message in messages:
+            try:
+                msg = build_message(config['username'], message.to_email, message.subject, message.html_body)
+                server.sendmail(config['username'], message.to_email, msg.as_string())
+            except Exception as e:
+                record_failure(message, e, now)
+            else:
+                message.status = 'sent'
+                message.sent_at = datetime.utcnow()
+                message.last_error = None
+                delivered += 1
+            # Record each outcome as it happens so a crash cannot resend delivered mail
+            db.session.commit()
+    finally:
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    return delivered
+
+
+def run_delivery(app):
+    """Scheduler entry point"""
+    with app.app_context():
+        try:
+            deliver_pending()
+        except Exception as e:
+            db.session.rollback()
+            print(f'Outbox delivery failed: {e}')
+
+
+def wake_delivery():
+    """Ask the scheduler to run delivery now instead of at its next interval"""
+    scheduler = current_app.extensions.get('scheduler')
+    if scheduler is None:
+        return
+    job = scheduler.get_job('outbox_delivery')
+    if job is not None:
+        job.modify(next_run_time=datetime.now())
@@ -1,116 +1,101 @@
 from datetime import datetime, timedelta
-from app import db
-from app.models import MaintenanceItem, MaintenanceLog, Asset, Settings
+from sqlalchemy import case, func, union
+from app import begin_write, db
+from app.metrics import get_metrics, track_job
+from app.models import MaintenanceItem, Settings
 from app.services.email import send_reminder_email
-
-
-def check_and_send_reminders(app):
-    with app.app_context():
+from app.services.outbox import wake_delivery
+from app.services.status import FREQUENCY_DAYS, due_items_query, evaluate_items
+
+
+def reminder_candidates(fraction, today=None):
+    """Reminder-enabled items that may have reached their reminder point.
+
+    An item is reminded once ``fraction`` of its interval or less remains.
+    The window searched is that fraction of the longest time-based and
+    usage-based interval among the items, so the next-due indexes narrow
+    the candidates and evaluate_items makes the exact per-item check.
+    Items never performed are always candidates.
+    """
+    today = today or datetime.utcnow().date()
+    enabled = MaintenanceItem.reminders_enabled.is_(True)
+    period_days = MaintenanceItem.frequency_value * case(FREQUENCY_DAYS, value=MaintenanceItem.frequency_unit, else_=1)
+    longest_days, longest_usage = db.session.query(
+        func.max(case((MaintenanceItem.next_due_date.isnot(None), period_days))),
+        func.max(case((MaintenanceItem.next_due_usage.isnot(None), MaintenanceItem.frequency_value))),
+    ).filter(enabled).one()
+
+    # One branch per next-due index; an OR across them would scan the table instead
+    branches = [due_items_query(include_never=True)]
+    if longest_days:
+        branches.append(due_items_query(due_before=today + timedelta(days=longest_days * fraction),
+                                        include_never=False))
+    if longest_usage:
+        branches.append(due_items_query(due_within=int(longest_usage * fraction), include_never=False))
+    ids = union(*(branch.filter(enabled).with_entities(MaintenanceItem.id).statement for branch in branches))
+    return MaintenanceItem.query.filter(MaintenanceItem.id.in_(ids))
+
+
+def check_and_send_reminders(app, item_ids=None):
+    """Email reminders for items at or below the threshold; only ``item_ids`` when given"""
+    with app.app_context(), track_job('reminders') as run:
         notification_email = Settings.get('notification_email', '')
         if not notification_email:
+            run['outcome'] = 'disabled'
             return
 
         threshold = float(Settings.get('reminder_threshold_percent', '30'))
         interval_days = int(Settings.get('reminder_interval_days', '1'))
 
-        items = MaintenanceItem.query.filter_by(reminders_enabled=True).all()
+        now = datetime.utcnow()
         items_due = []
 
-        for item in items:
+        # Held from reading last_reminder_sent until the reminder is queued, so
+        # another worker running the same check waits and then skips these items
+        begin_write()
+        items = reminder_candidates(threshold / 100)
+        if item_ids is not None:
+            items = items.filter(MaintenanceItem.id.in_(item_ids))
+
+        for result in evaluate_items(items):
+            item = result['item']
+
             # Skip if reminder was sent recently
             if item.last_reminder_sent:
-                days_since = (datetime.utcnow() - item.last_reminder_sent).total_seconds() / 86400
+                days_since = (now - item.last_reminder_sent).total_seconds() / 86400
                 if days_since < interval_days:
                     continue
 
-            asset = Asset.query.get(item.asset_id)
-            if not asset:
-                continue
-
-            status_info = get_item_status(item, asset)
-            if not status_info:
-                continue
-
             # Check if percentage remaining is at or below threshold
-            if status_info['percentage_remaining'] <= threshold:
+            if result['percentage_remaining'] <= threshold:
                 items_due.append({
-                    'asset_name': asset.name,
+                    'asset_name': result['asset'].name,
                     'item_name': item.name,
-                    'status': status_info['status'],
-                    'remaining': status_info['remaining_text'],
-                    'item_id': item.id
+                    # Items that were never performed are reported as overdue
+                    'status': 'overdue' if result['status'] == 'never' else result['status'],
+                    'remaining': result['remaining_text'],
+                    'item': item
                 })
 
-        if items_due:
-            try:
-                send_reminder_email(notification_email, items_due)
-                # Update last_reminder_sent for all notified items
-                for due_item in items_due:
-                    item = MaintenanceItem.query.get(due_item['item_id'])
-                    if item:
-                        item.last_reminder_sent = datetime.utcnow()
-                db.session.commit()
-            except Exception as e:
-                print(f'Failed to send reminder email: {e}')
-
-
-def get_item_status(item, asset):
-    last_log = (MaintenanceLog.query
-                .filter_by(maintenance_item_id=item.id)
-                .order_by(MaintenanceLog.date_performed.desc())
-                .first())
-
-    if not last_log:
-        return {
-            'status': 'overdue',
-            'percentage_remaining': 0,
-            'remaining_text': 'Never performed'
-        }
-
-    if item.maintenance_type == 'usage' and asset.usage_metric:
-        last_usage = last_log.usage_reading or 0
-        next_usage = last_usage + item.frequency_value
-        usage_remaining = next_usage - asset.current_usage
-        percentage = max(0, (usage_remaining / item.frequency_value) * 100)
-
-        status = 'good'
-        if usage_remaining <= 0:
-            status = 'overdue'
-        elif percentage <= 30:
-            status = 'due-soon'
-
-        return {
-            'status': status,
-            'percentage_remaining': percentage,
-            'remaining_text': f'{max(0, usage_remaining)} {asset.usage_metric} remaining'
-        }
-    else:
-        last_date = last_log.date_performed
-        if isinstance(last_date, str):
-            last_date = datetime.strptime(last_date, '%Y-%m-%d').date()
-
-        today = datetime.utcnow().date()
-        days_since = (today - last_date).days
-
-        frequency_in_days = item.frequency_value
-        if item.frequency_unit == 'weeks':
-            frequency_in_days = item.frequency_value * 7
-        elif item.frequency_unit == 'months':
-            frequency_in_days = item.frequency_value * 30
-        elif item.frequency_unit == 'years':
-            frequency_in_days = item.frequency_value * 365
-
-        days_remaining = frequency_in_days - days_since
-        percentage = max(0, (days_remaining / frequency_in_days) * 100)
+        if not items_due:
+            run['outcome'] = 'nothing_due'
+            return
 
-        status = 'good'
-        if days_remaining <= 0:
-            status = 'overdue'
-        elif percentage <= 30:
-            status = 'due-soon'
+        try:
+            # The message and last_reminder_sent commit together
+            send_reminder_email(notification_email, items_due, commit=False)
+            for due_item in items_due:
+                due_item['item'].last_reminder_sent = datetime.utcnow()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            run['outcome'] = 'failed'
+            print(f'Failed to send reminder email: {e}')
+            return
+        wake_delivery()
 
-        return {
-            'status': status,
-            'percentage_remaining': percentage,
-            'remaining_text': f'{max(0, days_remaining)} days remaining' if days_remaining > 0 else 'Overdue'
-        }
+        run['outcome'] = 'queued'
+        metrics = get_metrics()
+        if metrics is not None:
+            with metrics.lock:
+                metrics.reminder_items.inc(amount=len(items_due))
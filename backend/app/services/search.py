@@ -0,0 +1,97 @@
+import re
+from html import escape
+from sqlalchemy import select, text
+from app import db
+from app.models import Asset, MaintenanceItem, MaintenanceLog
+from app.models.search_index import (SEARCH_TABLE, SEARCH_SOURCES, SEARCH_KINDS, ROWID_STRIDE,
+                                     index_statement)
+
+# Private-use characters mark matches inside snippets until the text has been escaped
+MATCH_START, MATCH_END = '\ue000', '\ue001'
+
+SNIPPET_TOKENS = 12
+
+
+def build_match(query):
+    """FTS5 query matching every word of ``query``, the last one as a prefix.
+
+    Words are quoted, so operators and punctuation typed by the user are
+    searched for as text rather than parsed. Returns None when there are
+    no words.
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"' for word in words) + '*'
+
+
+def rebuild_search_index():
+    """Re-index every record from the source tables; returns the number of entries"""
+    db.session.execute(text(f'DELETE FROM {SEARCH_TABLE}'))
+    for kind in SEARCH_SOURCES:
+        db.session.execute(text(index_statement(kind, from_table=True)))
+    db.session.execute(text(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')"))
+    return db.session.execute(text(f'SELECT count(*) FROM {SEARCH_TABLE}')).scalar()
+
+
+def _highlight(fragment):
+    return escape(fragment or '').replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+
+
+def search(query, asset_id=None, kinds=None, limit=20, offset=0):
+    """Records matching ``query``, best first.
+
+    Returns ``(results, has_more)``. Each result names the record's kind,
+    id and asset; ``snippet`` is HTML-escaped text around the matches with
+    ``<mark>`` around each one.
+    """
+    match = build_match(query)
+    if match is None:
+        return [], False
+
+    conditions = [f'{SEARCH_TABLE} MATCH :match']
+    params = {'match': match, 'limit': limit + 1, 'offset': offset}
+    if asset_id is not None:
+        conditions.append('asset_id = :asset_id')
+        params['asset_id'] = asset_id
+    if kinds:
+        codes = ', '.join(str(SEARCH_SOURCES[kind][0]) for kind in kinds)
+        conditions.append(f'rowid % {ROWID_STRIDE} IN ({codes})')
+
+    rows = db.session.execute(text(
+        f"SELECT rowid, asset_id, title, snippet({SEARCH_TABLE}, -1, '{MATCH_START}', '{MATCH_END}', "
+        f"'…', {SNIPPET_TOKENS}), rank FROM {SEARCH_TABLE} WHERE {' AND '.join(conditions)} "
+        'ORDER BY rank LIMIT :limit OFFSET :offset'
+    ), params).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Display names come from the records, so they are current even for kinds indexed without a title
+    asset_names = dict(db.session.execute(
+        select(Asset.id, Asset.name).where(Asset.id.in_({row.asset_id for row in rows}))).all())
+    log_ids = [rowid // ROWID_STRIDE for rowid, *_ in rows
+               if SEARCH_KINDS[rowid % ROWID_STRIDE] == 'maintenance_log']
+    log_items = {}
+    if log_ids:
+        log_items = {log_id: (item_id, name) for log_id, item_id, name in db.session.execute(
+            select(MaintenanceLog.id, MaintenanceItem.id, MaintenanceItem.name)
+            .join(MaintenanceItem, MaintenanceItem.id == MaintenanceLog.maintenance_item_id)
+            .where(MaintenanceLog.id.in_(log_ids)))}
+
+    results = []
+    for rowid, row_asset_id, title, snippet, rank in rows:
+        kind = SEARCH_KINDS[rowid % ROWID_STRIDE]
+        record_id = rowid // ROWID_STRIDE
+        result = {
+            'kind': kind,
+            'id': record_id,
+            'asset_id': row_asset_id,
+            'asset_name': asset_names.get(row_asset_id),
+            'title': title,
+            'snippet': _highlight(snippet),
+            'score': round(-rank, 4),
+        }
+        if kind == 'maintenance_log' and record_id in log_items:
+            result['maintenance_item_id'], result['title'] = log_items[record_id]
+        results.append(result)
+    return results, has_more
@@ -0,0 +1,180 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func, or_, false
+from app import db
+from app.models import MaintenanceItem, MaintenanceLog, Asset
+
+# Fraction of the interval remaining at which an item becomes "due soon"
+DUE_SOON_FRACTION = 0.3
+
+FREQUENCY_DAYS = {
+    'days': 1,
+    'weeks': 7,
+    'months': 30,
+    'years': 365,
+}
+
+
+def latest_logs_subquery(items_query=None):
+    """Most recent log per maintenance item, ranked by date then id.
+
+    With ``items_query`` only the logs of those items are ranked, which
+    lets SQLite seek into ix_maintenance_logs_item_date per item instead of
+    ranking every log in the table.
+    """
+    ranked = db.session.query(
+        MaintenanceLog.maintenance_item_id.label('item_id'),
+        MaintenanceLog.date_performed.label('date_performed'),
+        MaintenanceLog.usage_reading.label('usage_reading'),
+        func.row_number().over(
+            partition_by=MaintenanceLog.maintenance_item_id,
+            order_by=(MaintenanceLog.date_performed.desc(), MaintenanceLog.id.desc())
+        ).label('rn')
+    )
+    if items_query is not None:
+        ranked = ranked.filter(MaintenanceLog.maintenance_item_id.in_(
+            items_query.with_entities(MaintenanceItem.id).order_by(None)
+        ))
+    ranked = ranked.subquery()
+
+    return db.session.query(ranked.c.item_id, ranked.c.date_performed, ranked.c.usage_reading) \
+        .filter(ranked.c.rn == 1).subquery()
+
+
+def frequency_in_days(frequency_value, frequency_unit):
+    return frequency_value * FREQUENCY_DAYS.get(frequency_unit, 1)
+
+
+def evaluate_items(items_query=None, today=None):
+    """Evaluate the status of every item in ``items_query`` in a single pass.
+
+    Items, their assets and their latest logs are fetched with one joined
+    query. Returns a list of dicts with the item, its asset and the computed
+    status, percentage remaining, remaining amount and remaining text.
+    """
+    latest = latest_logs_subquery(items_query)
+    if items_query is None:
+        items_query = MaintenanceItem.query
+    if today is None:
+        today = datetime.utcnow().date()
+
+    rows = (items_query
+            .join(Asset, MaintenanceItem.asset_id == Asset.id)
+            .outerjoin(latest, latest.c.item_id == MaintenanceItem.id)
+            .add_columns(Asset, latest.c.date_performed, latest.c.usage_reading)
+            .order_by(MaintenanceItem.id)
+            .all())
+
+    if not rows:
+        return []
+
+    items, assets, last_dates, last_usages = zip(*rows)
+
+    # Work column-wise: first the interval and amount remaining for every item,
+    # then percentages and statuses.
+    usage_based = [item.maintenance_type == 'usage' and bool(asset.usage_metric)
+                   for item, asset in zip(items, assets)]
+    periods = [item.frequency_value if is_usage else frequency_in_days(item.frequency_value, item.frequency_unit)
+               for item, is_usage in zip(items, usage_based)]
+    remaining = [
+        None if last_date is None
+        else (last_usage or 0) + period - (asset.current_usage or 0) if is_usage
+        else period - (today - last_date).days
+        for asset, last_date, last_usage, period, is_usage
+        in zip(assets, last_dates, last_usages, periods, usage_based)
+    ]
+
+    results = []
+    for item, asset, last_date, period, left, is_usage in zip(items, assets, last_dates, periods, remaining, usage_based):
+        if left is None:
+            results.append({
+                'item': item,
+                'asset': asset,
+                'status': 'never',
+                'percentage_remaining': 0,
+                'remaining': None,
+                'remaining_text': 'Never performed',
+                'last_performed': None,
+            })
+            continue
+
+        percentage = max(0, (left / period) * 100) if period else 0
+
+        status = 'good'
+        if left <= 0:
+            status = 'overdue'
+        elif left <= period * DUE_SOON_FRACTION:
+            status = 'due-soon'
+
+        if is_usage:
+            remaining_text = f'{max(0, left)} {asset.usage_metric} remaining'
+        else:
+            remaining_text = f'{left} days remaining' if left > 0 else 'Overdue'
+
+        results.append({
+            'item': item,
+            'asset': asset,
+            'status': status,
+            'percentage_remaining': percentage,
+            'remaining': left,
+            'remaining_text': remaining_text,
+            'last_performed': last_date,
+        })
+
+    return results
+
+
+def refresh_next_due(items_query=None):
+    """Recompute the stored next_due_date / next_due_usage for ``items_query``.
+
+    Called after every log write and whenever an item's schedule or its
+    asset's usage metric changes. ``next_due_usage`` is an absolute reading,
+    so it does not change when the asset's current usage moves. The caller
+    is responsible for committing.
+    """
+    latest = latest_logs_subquery(items_query)
+    if items_query is None:
+        items_query = MaintenanceItem.query
+
+    rows = (items_query
+            .join(Asset, MaintenanceItem.asset_id == Asset.id)
+            .outerjoin(latest, latest.c.item_id == MaintenanceItem.id)
+            .add_columns(Asset.usage_metric, latest.c.date_performed, latest.c.usage_reading)
+            .all())
+
+    for item, usage_metric, last_date, last_usage in rows:
+        item.next_due_date = None
+        item.next_due_usage = None
+        if last_date is None:
+            continue
+        if item.maintenance_type == 'usage' and usage_metric:
+            item.next_due_usage = (last_usage or 0) + item.frequency_value
+        else:
+            item.next_due_date = last_date + timedelta(days=frequency_in_days(item.frequency_value, item.frequency_unit))
+
+    return len(rows)
+
+
+def due_items_query(due_before=None, due_within=None, include_never=True):
+    """Items due by ``due_before`` (a date) or within ``due_within`` usage units.
+
+    Uses the indexed next-due columns instead of scanning maintenance_logs.
+    Items that have never been performed are included unless
+    ``include_never`` is False.
+    """
+    conditions = []
+    if due_before is not None:
+        conditions.append(MaintenanceItem.next_due_date <= due_before)
+    if due_within is not None:
+        conditions.append(MaintenanceItem.next_due_usage <= Asset.current_usage + due_within)
+    if include_never:
+        conditions.append(
+            (MaintenanceItem.next_due_date.is_(None)) & (MaintenanceItem.next_due_usage.is_(None))
+        )
+    if not conditions:
+        return MaintenanceItem.query.filter(false())
+
+    query = MaintenanceItem.query
+    if due_within is not None:
+        # Only the usage comparison needs the asset's current reading
+        query = query.join(Asset, MaintenanceItem.asset_id == Asset.id)
+    return query.filter(or_(*conditions))
@@ -0,0 +1,192 @@
+import hashlib
+import os
+import re
+import tempfile
+import mimetypes
+from collections import namedtuple
+from urllib.parse import quote
+from flask import current_app, request, send_file, abort
+from werkzeug.security import safe_join
+from werkzeug.utils import secure_filename
+from sqlalchemy import select
+from app import begin_write, db
+from app.models import Attachment, MaintenanceLog
+from app.services.thumbnails import discard_renditions
+
+# Bytes read per step while hashing an upload to disk
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Blob names are the SHA-256 of the content plus the original extension
+BLOB_NAME = re.compile(r'^[0-9a-f]{64}(\.[a-z0-9]+)?$')
+
+# Content-addressed blobs never change, so browsers may keep them for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+StoredUpload = namedtuple('StoredUpload', ['name', 'path', 'size', 'digest'])
+
+
+def blob_name(digest, filename):
+    safe = secure_filename(filename)
+    ext = safe.rsplit('.', 1)[1].lower() if '.' in safe else ''
+    return f'{digest}.{ext}' if ext else digest
+
+
+def is_blob_name(name):
+    return bool(BLOB_NAME.match(name))
+
+
+def save_upload(file, upload_folder=None):
+    """Stream an uploaded file to disk, hashing it on the way, and keep one copy per digest.
+
+    The content is written to a temporary file in the upload folder and
+    then atomically renamed to its content address. If a blob with the
+    same digest already exists the temporary copy is discarded.
+
+    That choice is made holding the database write lock, which stays held
+    until the caller commits the row referencing the blob, so a concurrent
+    release_upload cannot delete a blob that is being reused.
+    """
+    upload_folder = upload_folder or current_app.config['UPLOAD_FOLDER']
+    digest = hashlib.sha256()
+    size = 0
+
+    file.stream.seek(0)
+    fd, temp_path = tempfile.mkstemp(dir=upload_folder, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = file.stream.read(HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+
+        name = blob_name(digest.hexdigest(), file.filename)
+        path = os.path.join(upload_folder, name)
+        begin_write()
+        if os.path.exists(path):
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return StoredUpload(name, path, size, digest.hexdigest())
+
+
+def reference_count(name):
+    """Number of attachments and legacy receipts pointing at the stored file ``name``"""
+    query = Attachment.query
+    if is_blob_name(name):
+        # Narrow with the indexed digest before matching the extension
+        query = query.filter(Attachment.content_hash == name.split('.', 1)[0])
+    attachments = query.filter(
+        (Attachment.file_path == name) | Attachment.file_path.like(f'%/{name}')
+    ).count()
+    receipts = MaintenanceLog.query.filter_by(receipt_photo=name).count()
+    return attachments + receipts
+
+
+def release_upload(path, upload_folder=None):
+    """Delete a stored file once nothing references it any more.
+
+    Call after the referencing row has been deleted or changed and committed.
+    The count and the removal happen under the database write lock, the
+    lock save_upload holds while it reuses a blob, and the lock is released
+    again before returning.
+    """
+    if not path:
+        return False
+    upload_folder = upload_folder or current_app.config['UPLOAD_FOLDER']
+    name = os.path.basename(path)
+    begin_write()
+    try:
+        if reference_count(name) > 0:
+            return False
+
+        # Legacy rows may hold a path relative to the working directory
+        for candidate in {path, os.path.join(upload_folder, name)}:
+            if os.path.exists(candidate):
+                os.remove(candidate)
+                discard_renditions(name, upload_folder)
+                return True
+        return False
+    finally:
+        db.session.commit()
+
+
+def record_uploads(log_ids=None, general_ids=None):
+    """Stored files of the logs and general maintenance records whose ids the given selects return.
+
+    Collect them before deleting a parent whose records go with it by
+    cascade, then release_upload each once the delete is committed.
+    """
+    queries = []
+    if log_ids is not None:
+        queries.append(select(Attachment.file_path).where(Attachment.maintenance_log_id.in_(log_ids)))
+        queries.append(select(MaintenanceLog.receipt_photo)
+                       .where(MaintenanceLog.id.in_(log_ids), MaintenanceLog.receipt_photo.isnot(None)))
+    if general_ids is not None:
+        queries.append(select(Attachment.file_path).where(Attachment.general_maintenance_id.in_(general_ids)))
+    return sorted({path for query in queries for path in db.session.scalars(query)})
+
+
+def verify_blob(path, digest):
+    """Return None if ``path`` hashes to ``digest``, otherwise a description of the problem"""
+    if not os.path.exists(path):
+        return 'missing'
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            sha.update(chunk)
+    if sha.hexdigest() != digest:
+        return 'content does not match its digest'
+    return None
+
+
+def send_stored_file(relative_path, etag=None, max_age=None, immutable=False, mimetype=None):
+    """Respond with a file under the upload folder.
+
+    Conditional and ``Range`` requests are honoured. With ``UPLOAD_ACCEL``
+    set to ``nginx`` only the headers are produced here and the body is
+    handed to the proxy through ``X-Accel-Redirect``; with ``sendfile`` the
+    server is given the path in ``X-Sendfile``.
+    """
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    path = safe_join(upload_folder, relative_path)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    mimetype = mimetype or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    if current_app.config['UPLOAD_ACCEL'] == 'nginx':
+        response = current_app.response_class(mimetype=mimetype)
+        prefix = current_app.config['UPLOAD_ACCEL_PREFIX'].rstrip('/')
+        response.headers['X-Accel-Redirect'] = f'{prefix}/{quote(relative_path)}'
+        if etag:
+            response.set_etag(etag)
+        if max_age is not None:
+            response.cache_control.public = True
+            response.cache_control.max_age = max_age
+        # Answer revalidations here; nginx handles ranges when it serves the body
+        response.make_conditional(request)
+        if response.status_code == 304:
+            # nginx would serve the file in place of a bodiless 304
+            del response.headers['X-Accel-Redirect']
+    else:
+        response = send_file(path, mimetype=mimetype, etag=etag or True, max_age=max_age,
+                             conditional=True)
+
+    if immutable:
+        response.cache_control.immutable = True
+    return response
+
+
+def send_upload(name):
+    """Serve an uploaded file; content-addressed blobs are cached as immutable"""
+    if is_blob_name(name):
+        return send_stored_file(name, etag=name.split('.', 1)[0], max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    # Legacy timestamp-named files are revalidated with their modification-time ETag
+    return send_stored_file(name)
@@ -0,0 +1,141 @@
+import atexit
+import threading
+import time
+from flask import current_app
+from sqlalchemy import bindparam, select, update
+from app import begin_write, db
+from app.metrics import track_job
+from app.models import Asset, MaintenanceItem, Settings
+from app.services.reminders import check_and_send_reminders
+from app.services.usage import record_asset_readings
+
+assets_table = Asset.__table__
+
+
+class TelemetryBuffer:
+    """Usage readings received since the last flush, reduced to the highest per asset.
+
+    Each server process buffers its own readings; a background thread
+    started on first use writes them every ``flush_seconds``, and once more
+    when the process exits. With ``flush_seconds`` at 0 readings are written
+    as they arrive.
+    """
+
+    def __init__(self, app, flush_seconds=30):
+        self.app = app
+        self.flush_seconds = flush_seconds
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.flusher = None
+
+    def add(self, readings):
+        """Buffer ``(asset_id, reading)`` pairs; returns the number of assets waiting for a flush"""
+        with self.lock:
+            for asset_id, reading in readings:
+                if reading > self.pending.get(asset_id, -1):
+                    self.pending[asset_id] = reading
+
+        if not self.flush_seconds:
+            self.flush()
+        elif self.flusher is None and not self.app.testing:
+            # Tests flush by hand, as they run scheduled jobs by hand
+            self._start()
+        return len(self.pending)
+
+    def _start(self):
+        # Started on first use, so it runs in server workers rather than a parent that forks them
+        with self.lock:
+            if self.flusher is None:
+                self.flusher = threading.Thread(target=self._flush_periodically, name='telemetry-flush',
+                                                daemon=True)
+                self.flusher.start()
+                atexit.register(self.flush)
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f'Failed to write telemetry: {e}')
+
+    def flush(self):
+        """Write the buffered readings; returns the ids of the assets whose usage went up"""
+        with self.lock:
+            readings, self.pending = self.pending, {}
+        if not readings:
+            return []
+
+        try:
+            with self.app.app_context(), track_job('telemetry_flush') as run:
+                raised, crossed = apply_readings(readings)
+                db.session.commit()
+                run['outcome'] = 'updated' if raised else 'unchanged'
+        except Exception:
+            # Keep the readings for the next attempt, unless newer ones arrived meanwhile
+            with self.lock:
+                for asset_id, reading in readings.items():
+                    if reading > self.pending.get(asset_id, -1):
+                        self.pending[asset_id] = reading
+            raise
+        if crossed:
+            check_and_send_reminders(self.app, item_ids=crossed)
+        return sorted(raised)
+
+
+def crossed_items(previous):
+    """Usage-based items whose due-soon or due point lies between each asset's old and new usage.
+
+    ``previous`` maps asset ids to their usage before the update. The
+    due-soon point uses the reminder threshold, so these are exactly the
+    items whose reminder status may have changed.
+    """
+    fraction = float(Settings.get('reminder_threshold_percent', '30')) / 100
+    current = dict(db.session.execute(
+        select(Asset.id, Asset.current_usage).where(Asset.id.in_(previous))).all())
+    rows = db.session.execute(
+        select(MaintenanceItem.id, MaintenanceItem.asset_id, MaintenanceItem.next_due_usage,
+               MaintenanceItem.frequency_value)
+        .where(MaintenanceItem.asset_id.in_(previous), MaintenanceItem.maintenance_type == 'usage',
+               MaintenanceItem.next_due_usage.isnot(None), MaintenanceItem.reminders_enabled.is_(True))
+    ).all()
+    return [item_id for item_id, asset_id, due, frequency in rows
+            if any(previous[asset_id] < point <= current[asset_id] for point in (due - frequency * fraction, due))]
+
+
+def apply_readings(readings):
+    """Raise ``current_usage`` to the readings in ``{asset_id: reading}`` where they are higher.
+
+    One executemany UPDATE, guarded in SQL so a lower value never moves
+    usage back. Assets without a usage metric are left alone. The current
+    values are read holding the write lock, so the assets counted as raised
+    are exactly the rows the UPDATE changes, even with other workers
+    flushing. Returns ``(raised_asset_ids, crossed_item_ids)``; the caller
+    commits.
+    """
+    begin_write()
+    previous = {asset_id: usage or 0 for asset_id, usage in db.session.execute(
+        select(Asset.id, Asset.current_usage)
+        .where(Asset.id.in_(readings), Asset.usage_metric.isnot(None))
+    )}
+    raised = {asset_id: readings[asset_id] for asset_id, usage in previous.items() if readings[asset_id] > usage}
+    if not raised:
+        return set(), []
+
+    # Core UPDATE: the session's versioning hook still bumps the assets collection
+    db.session.execute(
+        update(assets_table)
+        .where(assets_table.c.id == bindparam('asset_id'), assets_table.c.current_usage < bindparam('reading'))
+        .values(current_usage=bindparam('reading')),
+        [{'asset_id': asset_id, 'reading': reading} for asset_id, reading in raised.items()])
+    record_asset_readings(db.session.connection(), raised)
+    return set(raised), crossed_items({asset_id: previous[asset_id] for asset_id in raised})
+
+
+def get_telemetry(app=None):
+    app = app or current_app
+    return app.extensions['telemetry']
+
+
+def init_telemetry(app):
+    app.extensions['telemetry'] = TelemetryBuffer(app, app.config['TELEMETRY_FLUSH_SECONDS'])
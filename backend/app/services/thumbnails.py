@@ -0,0 +1,177 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from flask import current_app
+from PIL import Image, ImageOps, features
+
+# Optional decoders: HEIC photos from phones and the first page of PDFs
+try:
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+    HEIC_SUPPORTED = True
+except ImportError:
+    HEIC_SUPPORTED = False
+
+try:
+    import fitz  # PyMuPDF
+    PDF_SUPPORTED = True
+except ImportError:
+    fitz = None
+    PDF_SUPPORTED = False
+
+# Bounding boxes for each rendition; aspect ratio is preserved
+RENDITIONS = {
+    'thumb': (256, 256),
+    'preview': (1024, 1024),
+}
+
+RENDITION_FOLDER = 'renditions'
+RENDITION_FORMAT = 'WEBP' if features.check('webp') else 'JPEG'
+RENDITION_EXTENSION = 'webp' if RENDITION_FORMAT == 'WEBP' else 'jpg'
+RENDITION_MIMETYPE = f'image/{"webp" if RENDITION_FORMAT == "WEBP" else "jpeg"}'
+RENDITION_QUALITY = 80
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+
+
+def _extension(path):
+    return path.rsplit('.', 1)[1].lower() if '.' in path else ''
+
+
+def can_render(path):
+    ext = _extension(path)
+    return (ext in IMAGE_EXTENSIONS
+            or (ext == 'heic' and HEIC_SUPPORTED)
+            or (ext == 'pdf' and PDF_SUPPORTED))
+
+
+def rendition_path(stored_name, size, upload_folder=None):
+    """Where the ``size`` rendition of a stored upload lives.
+
+    Renditions are keyed by the stored file name, so duplicate uploads that
+    share a content-addressed blob also share their renditions.
+    """
+    upload_folder = upload_folder or current_app.config['UPLOAD_FOLDER']
+    stem = os.path.splitext(os.path.basename(stored_name))[0]
+    return os.path.join(upload_folder, RENDITION_FOLDER, f'{stem}-{size}.{RENDITION_EXTENSION}')
+
+
+def _open_source(source):
+    if _extension(source) == 'pdf':
+        with fitz.open(source) as doc:
+            # Rasterise the first page at roughly the largest rendition size
+            page = doc[0]
+            longest = max(max(box) for box in RENDITIONS.values())
+            zoom = longest / max(page.rect.width, page.rect.height)
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            return Image.frombytes('RGB', (pix.width, pix.height), pix.samples)
+
+    image = Image.open(source)
+    # Let the JPEG decoder downscale while decoding instead of expanding the full photo
+    image.draft('RGB', max(RENDITIONS.values()))
+    return image
+
+
+def render(source, targets):
+    """Decode ``source`` once and write each ``(path, (width, height))`` rendition.
+
+    Runs in a worker process, so it only deals in file paths. Targets are
+    written largest first, each one downscaled from the previous.
+    """
+    with _open_source(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        if RENDITION_FORMAT == 'JPEG' and image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        written = []
+        for path, box in sorted(targets, key=lambda target: target[1], reverse=True):
+            image.thumbnail(box, Image.LANCZOS)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write beside the target and rename so readers never see a partial file
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.rendition-')
+            try:
+                with os.fdopen(fd, 'wb') as out:
+                    image.save(out, RENDITION_FORMAT, quality=RENDITION_QUALITY)
+                os.replace(temp_path, path)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            written.append(path)
+    return written
+
+
+def get_pool(app=None):
+    """The app's rendition worker pool, or None when rendering happens inline"""
+    app = app or current_app._get_current_object()
+    workers = app.config['THUMBNAIL_WORKERS']
+    if not workers:
+        return None
+    pool = app.extensions.get('thumbnail_pool')
+    if pool is None:
+        # Spawned workers never inherit the server's threads, locks or DB connections
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'))
+        app.extensions['thumbnail_pool'] = pool
+    return pool
+
+
+def _targets(stored_name, sizes, upload_folder):
+    return [(rendition_path(stored_name, size, upload_folder), RENDITIONS[size]) for size in sizes]
+
+
+def _report_failure(future):
+    if future.exception():
+        print(f'Rendition failed: {future.exception()}')
+
+
+def schedule_renditions(attachments):
+    """Queue every rendition for newly stored attachments; call after commit"""
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    pool = get_pool()
+    for attachment in attachments:
+        source = os.path.join(upload_folder, os.path.basename(attachment.file_path))
+        if not can_render(source):
+            continue
+        targets = [(path, box) for path, box in _targets(source, RENDITIONS, upload_folder)
+                   if not os.path.exists(path)]
+        if not targets:
+            continue
+        if pool is None:
+            try:
+                render(source, targets)
+            except Exception as e:
+                print(f'Rendition failed: {e}')
+        else:
+            pool.submit(render, source, targets).add_done_callback(_report_failure)
+
+
+def ensure_rendition(attachment, size):
+    """Path to the ``size`` rendition, generating it now if it does not exist yet.
+
+    Covers attachments uploaded before renditions existed and jobs that
+    were lost when the server restarted.
+    """
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    source = os.path.join(upload_folder, os.path.basename(attachment.file_path))
+    path = rendition_path(source, size, upload_folder)
+    if os.path.exists(path):
+        return path
+
+    targets = _targets(source, [size], upload_folder)
+    pool = get_pool()
+    if pool is None:
+        render(source, targets)
+    else:
+        pool.submit(render, source, targets).result()
+    return path
+
+
+def discard_renditions(stored_name, upload_folder=None):
+    """Remove every rendition of a stored upload that has been deleted"""
+    for size in RENDITIONS:
+        path = rendition_path(stored_name, size, upload_folder)
+        if os.path.exists(path):
+            os.remove(path)
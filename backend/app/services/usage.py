@@ -0,0 +1,280 @@
+from datetime import date, datetime
+from itertools import chain
+import numpy as np
+from sqlalchemy import delete, event, func, inspect, insert, select
+from app import db
+from app.models import (Asset, MaintenanceItem, MaintenanceLog, GeneralMaintenance,
+                        UsageReading, UsageForecast)
+
+# julianday() of a date minus this is its proleptic Gregorian ordinal (0001-01-01 is 1)
+JULIAN_ORDINAL_OFFSET = 1721424.5
+
+# Rates are fitted to the readings within this many days of each asset's latest one
+FIT_WINDOW_DAYS = 365
+
+readings_table = UsageReading.__table__
+forecasts_table = UsageForecast.__table__
+items_table = MaintenanceItem.__table__
+assets_table = Asset.__table__
+
+RECORD_SOURCES = {MaintenanceLog: 'maintenance_log', GeneralMaintenance: 'general_maintenance'}
+
+
+def _changed(obj, *names):
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in names)
+
+
+def _store_asset_readings(connection, readings, today=None):
+    # One asset-sourced reading per day: a later value replaces the earlier one
+    if not readings:
+        return
+    today = today or date.today()
+    now = datetime.utcnow()
+    connection.execute(delete(readings_table).where(
+        readings_table.c.asset_id.in_(readings), readings_table.c.source == 'asset',
+        readings_table.c.recorded_on == today))
+    connection.execute(insert(readings_table), [
+        {'asset_id': asset_id, 'reading': reading, 'recorded_on': today, 'source': 'asset', 'created_at': now}
+        for asset_id, reading in readings.items()])
+
+
+def record_asset_readings(connection, readings, today=None):
+    """Store ``{asset_id: reading}`` as today's asset-sourced readings and refit those assets' forecasts.
+
+    One asset-sourced reading per day: a later value replaces the earlier one.
+    """
+    _store_asset_readings(connection, readings, today)
+    refit_forecasts(connection, readings)
+
+
+def _insert_forecasts(connection, asset_ids):
+    fits = fit_usage_rates(asset_ids, connection=connection)
+    now = datetime.utcnow()
+    connection.execute(insert(forecasts_table), [{
+        'asset_id': asset_id, 'rate_per_day': rate, 'readings': used,
+        'last_reading': value, 'last_reading_on': day, 'computed_at': now,
+    } for asset_id, (rate, used, value, day) in ((asset_id, fits.get(asset_id, (None, 0, None, None)))
+                                                   for asset_id in asset_ids)])
+
+
+def refit_forecasts(connection, asset_ids):
+    """Replace the cached forecasts of ``asset_ids`` in the caller's transaction.
+
+    Assets that were deleted or no longer track usage are left without one.
+    """
+    if not asset_ids:
+        return
+    connection.execute(delete(forecasts_table).where(forecasts_table.c.asset_id.in_(asset_ids)))
+    tracked = connection.execute(select(assets_table.c.id).where(
+        assets_table.c.id.in_(asset_ids), assets_table.c.usage_metric.isnot(None))).scalars().all()
+    if tracked:
+        _insert_forecasts(connection, tracked)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _record_flushed(session, flush_context):
+    # Keep readings in step with ORM writes; bulk loads call rebuild_usage_history()
+    connection = session.connection()
+    stale = set()
+
+    assets = [obj for obj in chain(session.new, session.dirty) if isinstance(obj, Asset) and obj not in session.deleted]
+    # Zero is also the default for assets whose usage was never entered, so it is not a reading
+    readings = {obj.id: obj.current_usage for obj in assets if obj.usage_metric and obj.current_usage
+                and (obj in session.new or _changed(obj, 'current_usage'))}
+    _store_asset_readings(connection, readings)
+    stale.update(readings)
+    # Newly tracked assets get a forecast, untracked ones lose theirs
+    stale.update(obj.id for obj in assets if (obj in session.new and obj.usage_metric)
+                 or (obj not in session.new and _changed(obj, 'usage_metric')))
+
+    records = [obj for obj in chain(session.new, session.deleted, session.dirty)
+               if type(obj) in RECORD_SOURCES and (obj not in session.dirty or _changed(
+                   obj, 'usage_reading', 'date_performed',
+                   'maintenance_item_id' if isinstance(obj, MaintenanceLog) else 'asset_id'))]
+    if records:
+        item_assets = {obj.id: obj.asset_id for obj in chain(session.new, session.deleted, session.dirty)
+                       if isinstance(obj, MaintenanceItem)}
+        wanted = {obj.maintenance_item_id for obj in records if isinstance(obj, MaintenanceLog)} - set(item_assets)
+        if wanted:
+            item_assets.update(connection.execute(
+                select(items_table.c.id, items_table.c.asset_id).where(items_table.c.id.in_(wanted))
+            ).all())
+
+        added = []
+        for obj in records:
+            source = RECORD_SOURCES[type(obj)]
+            if obj not in session.new:
+                existing = (readings_table.c.source == source, readings_table.c.source_id == obj.id)
+                stale.update(connection.execute(select(readings_table.c.asset_id).where(*existing)).scalars())
+                connection.execute(delete(readings_table).where(*existing))
+            if obj in session.deleted or obj.usage_reading is None:
+                continue
+            asset_id = item_assets.get(obj.maintenance_item_id) if isinstance(obj, MaintenanceLog) else obj.asset_id
+            if asset_id is None:
+                continue
+            added.append({'asset_id': asset_id, 'reading': obj.usage_reading, 'recorded_on': obj.date_performed,
+                          'source': source, 'source_id': obj.id, 'created_at': datetime.utcnow()})
+            stale.add(asset_id)
+        if added:
+            # New records have no readings yet: batch writes get one executemany insert
+            connection.execute(insert(readings_table), added)
+
+    stale.update(obj.id for obj in session.deleted if isinstance(obj, Asset))
+    # Refit here so reads of the cached forecasts never have to write
+    refit_forecasts(connection, stale)
+
+
+def rebuild_usage_history():
+    """Re-derive log and general maintenance readings and refit every cached forecast.
+
+    Asset-sourced readings are history that exists nowhere else, so they are
+    kept; assets without one get their current usage as today's reading.
+    """
+    logs, general, assets = MaintenanceLog.__table__, GeneralMaintenance.__table__, Asset.__table__
+    now = datetime.utcnow()
+    columns = ['asset_id', 'reading', 'recorded_on', 'source', 'source_id', 'created_at']
+
+    db.session.execute(delete(UsageReading).where(UsageReading.source != 'asset'))
+    db.session.execute(insert(UsageReading).from_select(columns, (
+        select(items_table.c.asset_id, logs.c.usage_reading, logs.c.date_performed,
+               db.literal('maintenance_log'), logs.c.id, db.literal(now))
+        .select_from(logs.join(items_table, logs.c.maintenance_item_id == items_table.c.id))
+        .where(logs.c.usage_reading.isnot(None))
+    )))
+    db.session.execute(insert(UsageReading).from_select(columns, (
+        select(general.c.asset_id, general.c.usage_reading, general.c.date_performed,
+               db.literal('general_maintenance'), general.c.id, db.literal(now))
+        .where(general.c.usage_reading.isnot(None))
+    )))
+    has_asset_reading = select(readings_table.c.id).where(
+        readings_table.c.asset_id == assets.c.id, readings_table.c.source == 'asset').exists()
+    db.session.execute(insert(UsageReading).from_select(columns, (
+        select(assets.c.id, assets.c.current_usage, db.literal(date.today()),
+               db.literal('asset'), db.literal(None), db.literal(now))
+        .where(assets.c.usage_metric.isnot(None), assets.c.current_usage > 0, ~has_asset_reading)
+    )))
+    db.session.execute(delete(UsageForecast))
+    refresh_forecasts()
+    return UsageReading.query.count()
+
+
+def fit_usage_rates(asset_ids, window_days=FIT_WINDOW_DAYS, connection=None):
+    """Least-squares usage per day for every asset in ``asset_ids`` at once.
+
+    Returns ``{asset_id: (rate, readings_used, last_reading, last_reading_on)}``;
+    ``rate`` is None for assets whose readings span less than two days or do
+    not increase.
+    """
+    readings = readings_table.c
+    latest = (
+        select(readings.asset_id, func.julianday(func.max(readings.recorded_on)).label('day'))
+        .where(readings.asset_id.in_(asset_ids))
+        .group_by(readings.asset_id)
+        .subquery()
+    )
+    # Julian day numbers: plain floats, with no date objects built per row
+    day = func.julianday(readings.recorded_on)
+    rows = (connection or db.session).execute(
+        select(readings.asset_id, day - latest.c.day, readings.reading, latest.c.day)
+        .join(latest, latest.c.asset_id == readings.asset_id)
+        .where(day >= latest.c.day - window_days)
+    ).all()
+    if not rows:
+        return {}
+
+    # Flatten first: numpy probes Row objects as mappings, which is far slower
+    data = np.fromiter(chain.from_iterable(rows), dtype=np.float64, count=len(rows) * 4).reshape(-1, 4)
+    assets, first, g = np.unique(data[:, 0].astype(np.int64), return_index=True, return_inverse=True)
+    count = len(assets)
+    # Days are relative to each asset's latest reading, so the sums stay small
+    x, y = data[:, 1], data[:, 2]
+    latest_day = data[first, 3]
+
+    n = np.bincount(g, minlength=count).astype(np.float64)
+    sx = np.bincount(g, x, count)
+    sy = np.bincount(g, y, count)
+    sxx = np.bincount(g, x * x, count)
+    sxy = np.bincount(g, x * y, count)
+    denominator = n * sxx - sx * sx
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(denominator > 0, (n * sxy - sx * sy) / denominator, np.nan)
+
+    # Anchor projections on the highest value seen on the latest day
+    last_value = np.full(count, -np.inf)
+    on_latest = x == 0
+    np.maximum.at(last_value, g[on_latest], y[on_latest])
+
+    return {
+        int(asset_id): (
+            float(rate) if np.isfinite(rate) and rate > 0 else None,
+            int(used),
+            int(value),
+            date.fromordinal(int(day - JULIAN_ORDINAL_OFFSET)),
+        )
+        for asset_id, rate, used, value, day in zip(assets, slope, n, last_value, latest_day)
+    }
+
+
+def refresh_forecasts(asset_ids=None):
+    """Fit and cache rates for usage-tracked assets that have no cached forecast; caller commits"""
+    missing = (
+        select(Asset.id)
+        .outerjoin(UsageForecast, UsageForecast.asset_id == Asset.id)
+        .where(Asset.usage_metric.isnot(None), UsageForecast.asset_id.is_(None))
+    )
+    if asset_ids is not None:
+        missing = missing.where(Asset.id.in_(asset_ids))
+    stale = db.session.execute(missing).scalars().all()
+    if stale:
+        _insert_forecasts(db.session.connection(), stale)
+    return len(stale)
+
+
+def project_due_dates(items):
+    """``{item_id: date}`` when each usage-based item's next-due usage should be reached.
+
+    Uses the cached forecasts, which every write of readings refits. Items
+    without a next-due usage or whose asset has no rate are left out.
+    """
+    items = [item for item in items if item.maintenance_type == 'usage' and item.next_due_usage is not None]
+    if not items:
+        return {}
+    forecasts = {forecast.asset_id: forecast for forecast in UsageForecast.query.filter(
+        UsageForecast.asset_id.in_({item.asset_id for item in items}),
+        UsageForecast.rate_per_day.isnot(None))}
+    items = [item for item in items if item.asset_id in forecasts]
+    if not items:
+        return {}
+
+    due = np.array([item.next_due_usage for item in items], dtype=np.float64)
+    anchor = np.array([forecasts[item.asset_id].last_reading for item in items], dtype=np.float64)
+    rate = np.array([forecasts[item.asset_id].rate_per_day for item in items], dtype=np.float64)
+    anchor_day = np.array([forecasts[item.asset_id].last_reading_on.toordinal() for item in items])
+    # Already-passed targets project to the day they were (or will be) crossed, possibly in the past
+    projected = anchor_day + np.ceil((due - anchor) / rate).astype(np.int64)
+    return {item.id: date.fromordinal(int(day)) for item, day in zip(items, projected)}
+
+
+def usage_forecasts(asset_id=None):
+    """Cached rates and projected due dates for usage-based items"""
+    forecasts = UsageForecast.query.order_by(UsageForecast.asset_id)
+    items = (MaintenanceItem.query.join(Asset)
+             .filter(MaintenanceItem.maintenance_type == 'usage', Asset.usage_metric.isnot(None))
+             .order_by(MaintenanceItem.id))
+    if asset_id is not None:
+        forecasts = forecasts.filter(UsageForecast.asset_id == asset_id)
+        items = items.filter(MaintenanceItem.asset_id == asset_id)
+    items = items.all()
+    projected = project_due_dates(items)
+
+    return {
+        'assets': [forecast.to_dict() for forecast in forecasts],
+        'items': [{
+            'maintenance_item_id': item.id,
+            'asset_id': item.asset_id,
+            'name': item.name,
+            'next_due_usage': item.next_due_usage,
+            'projected_due_date': projected[item.id].isoformat() if item.id in projected else None,
+        } for item in items],
+    }
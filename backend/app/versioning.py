@@ -0,0 +1,97 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from itertools import chain
+from flask import current_app, request, make_response
+from sqlalchemy import event, select
+from sqlalchemy.dialects.sqlite import insert
+from app import db
+from app.models import CollectionVersion
+
+# Tables whose writes invalidate cached API responses
+TRACKED_TABLES = {'assets', 'maintenance_items', 'maintenance_logs', 'general_maintenance', 'attachments'}
+
+versions = CollectionVersion.__table__
+
+
+def bump(connection, names):
+    """Increment the version of each table in ``names`` inside the current transaction"""
+    now = datetime.utcnow()
+    stmt = insert(versions).values([{'name': name, 'version': 1, 'updated_at': now} for name in sorted(names)])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[versions.c.name],
+        set_={'version': versions.c.version + 1, 'updated_at': stmt.excluded.updated_at},
+    )
+    connection.execute(stmt)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _bump_flushed(session, flush_context):
+    # Unit-of-work writes: anything added, changed or deleted through the ORM
+    changed = chain(session.new, session.deleted,
+                    (obj for obj in session.dirty if session.is_modified(obj, include_collections=False)))
+    names = {obj.__table__.name for obj in changed} & TRACKED_TABLES
+    if names:
+        bump(session.connection(), names)
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _bump_bulk(orm_execute_state):
+    # Bulk statements such as the backup importer's executemany inserts and Query.delete()
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        name = orm_execute_state.statement.table.name
+        if name in TRACKED_TABLES:
+            bump(orm_execute_state.session.connection(), {name})
+
+
+def collection_state(names):
+    """``(etag, last_modified)`` for the current versions of ``names``"""
+    rows = {name: (version, updated_at) for name, version, updated_at in db.session.execute(
+        select(versions.c.name, versions.c.version, versions.c.updated_at).where(versions.c.name.in_(names))
+    )}
+    key = '|'.join(f'{name}:{rows.get(name, (0, None))[0]}' for name in sorted(names))
+    etag = hashlib.sha1(f'{request.full_path}#{key}'.encode('utf-8')).hexdigest()
+    stamps = [updated_at for _, updated_at in rows.values()]
+    if not stamps:
+        return etag, None
+    # HTTP dates have whole seconds: round up, so a write later in the second is never reported as older
+    latest = max(stamps)
+    last_modified = latest.replace(microsecond=0, tzinfo=timezone.utc)
+    if latest.microsecond:
+        last_modified += timedelta(seconds=1)
+    return etag, last_modified
+
+
+def conditional(*names):
+    """Answer GETs with ETag/Last-Modified derived from the versions of ``names``.
+
+    A matching ``If-None-Match`` (or, without one, a current
+    ``If-Modified-Since``) gets a 304 before the view runs, so no rows are
+    loaded or serialised.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag, last_modified = collection_state(names)
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = bool(since and last_modified and last_modified <= since)
+
+            if not_modified:
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            # Cache, but always revalidate: the 304 costs one indexed lookup
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,107 @@
+"""Concurrent log writes against a file-backed SQLite database.
+
+Runs the same workload with SQLite's defaults and with the configured
+SQLITE_PRAGMAS profile: several threads create maintenance logs through
+the API while others read the dashboard, as the scheduler and browsers do.
+
+    python -m benchmarks.concurrent_writes --writers 8 --writes 50 --readers 2
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from app import create_app, db
+from config import Config
+
+
+def build_app(folder, pragmas):
+    config = type('BenchConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(folder, "bench.db")}',
+        'UPLOAD_FOLDER': os.path.join(folder, 'uploads'),
+        'SQLITE_PRAGMAS': pragmas,
+        'TESTING': True,
+    })
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed(client, items):
+    asset = client.post('/api/assets', json={'name': 'Bench', 'usage_metric': 'miles'}).json
+    return [client.post('/api/maintenance-items', json={
+        'asset_id': asset['id'], 'name': f'Item {n}', 'maintenance_type': 'usage',
+        'frequency_value': 1000, 'frequency_unit': 'miles',
+    }).json['id'] for n in range(items)]
+
+
+def run(pragmas, writers, writes, readers):
+    with tempfile.TemporaryDirectory() as folder:
+        app = build_app(folder, pragmas)
+        item_ids = seed(app.test_client(), writers)
+        results = {'ok': 0, 'locked': 0, 'errors': 0, 'reads': 0}
+        lock = threading.Lock()
+        done = threading.Event()
+
+        def record(key):
+            with lock:
+                results[key] += 1
+
+        def writer(item_id):
+            client = app.test_client()
+            for n in range(writes):
+                try:
+                    response = client.post('/api/maintenance-logs', json={
+                        'maintenance_item_id': item_id, 'date_performed': '2024-01-01',
+                        'usage_reading': n * 10,
+                    })
+                    record('ok' if response.status_code == 201 else 'errors')
+                except Exception as e:
+                    record('locked' if 'locked' in str(e) else 'errors')
+
+        def reader():
+            client = app.test_client()
+            while not done.is_set():
+                try:
+                    client.get('/api/dashboard')
+                    record('reads')
+                except Exception:
+                    record('errors')
+
+        threads = [threading.Thread(target=writer, args=(item_id,)) for item_id in item_ids]
+        background = [threading.Thread(target=reader) for _ in range(readers)]
+        start = time.perf_counter()
+        for thread in background + threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        done.set()
+        for thread in background:
+            thread.join()
+        with app.app_context():
+            db.engine.dispose()
+
+        results['seconds'] = round(elapsed, 2)
+        results['writes_per_second'] = round(results['ok'] / elapsed, 1)
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--writes', type=int, default=50, help='logs created per writer')
+    parser.add_argument('--readers', type=int, default=2)
+    args = parser.parse_args()
+
+    report = {
+        'defaults': run({}, args.writers, args.writes, args.readers),
+        'profile': run(Config.SQLITE_PRAGMAS, args.writers, args.writes, args.readers),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
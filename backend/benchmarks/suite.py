@@ -0,0 +1,286 @@
+"""Latency, throughput and peak memory for every API endpoint and the heavy jobs.
+
+Generates a synthetic fleet in a temporary file-backed SQLite database
+(with the production pragma profile), then times each case through the
+Flask test client and writes the results as JSON:
+
+    python -m benchmarks.suite --assets 200 --items 2000 --logs 40000 --output results.json
+
+Latency percentiles come from ``--repeat`` timed runs after one warm-up.
+Peak memory is the largest Python allocation peak (tracemalloc) seen in a
+separate, untimed run, so tracing overhead does not skew the timings.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from PIL import Image
+from app import create_app, db
+from config import Config
+
+SCHEMA_VERSION = 1
+
+
+def build_app(folder):
+    config = type('BenchConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(folder, "bench.db")}',
+        'UPLOAD_FOLDER': os.path.join(folder, 'uploads'),
+        'INSTANCE_FOLDER': folder,
+        'THUMBNAIL_WORKERS': 0,
+        'SCHEDULER_ENABLED': False,
+        'TESTING': True,
+    })
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def generate(app, assets, items, logs, seed):
+    from app.services.fleet import FleetGenerator
+    with app.app_context():
+        return FleetGenerator(seed=seed).generate(assets, items, logs)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def measure(name, action, repeat, setup=None):
+    """Time ``action(i)`` ``repeat`` times; ``setup(n)`` prepares inputs for n calls first"""
+    calls = repeat + 2
+    if setup:
+        setup(calls)
+
+    status = action(0)  # warm-up
+    tracemalloc.start()
+    action(1)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    samples = []
+    for i in range(2, calls):
+        start = time.perf_counter()
+        status = action(i)
+        samples.append(time.perf_counter() - start)
+
+    total = sum(samples)
+    result = {
+        'name': name,
+        'status': status,
+        'runs': len(samples),
+        'latency_ms': {
+            'mean': round(statistics.mean(samples) * 1000, 3),
+            'p50': round(percentile(samples, 0.5) * 1000, 3),
+            'p95': round(percentile(samples, 0.95) * 1000, 3),
+            'max': round(max(samples) * 1000, 3),
+        },
+        'throughput_per_second': round(len(samples) / total, 2) if total else None,
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+    print(f"{name:45} p50 {result['latency_ms']['p50']:>10.2f} ms  peak {result['peak_memory_kb']:>10.1f} KB",
+          flush=True)
+    return result
+
+
+class Cases:
+    """Benchmark cases sharing one app, client and a few known ids"""
+
+    def __init__(self, app):
+        self.app = app
+        self.client = app.test_client()
+        with app.app_context():
+            from app.models import Asset, MaintenanceItem, MaintenanceLog, GeneralMaintenance
+            self.asset_id = db.session.query(Asset.id).order_by(Asset.id).first()[0]
+            self.item_id = db.session.query(MaintenanceItem.id).filter_by(asset_id=self.asset_id).first()[0]
+            self.log_id = db.session.query(MaintenanceLog.id).filter_by(maintenance_item_id=self.item_id).first()[0]
+            self.general_id = db.session.query(GeneralMaintenance.id).filter_by(asset_id=self.asset_id).first()[0]
+        self.pending = []
+
+    def get(self, path, headers=None):
+        def action(i):
+            response = self.client.get(path, headers=headers)
+            response.get_data()  # drain streamed bodies
+            return response.status_code
+        return action
+
+    def send(self, method, path, body=None, **kwargs):
+        def action(i):
+            target = path(i) if callable(path) else path
+            payload = body(i) if callable(body) else body
+            return self.client.open(target, method=method, json=payload, **kwargs).status_code
+        return action
+
+    def create_many(self, path, body):
+        """Setup hook creating records for DELETE cases to consume"""
+        def setup(count):
+            self.pending = [self.client.post(path, json=body).json['id'] for _ in range(count)]
+        return setup
+
+    def image_attachment(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (3000, 2000), (120, 80, 40)).save(buffer, 'JPEG')
+        buffer.seek(0)
+        response = self.client.put(f'/api/maintenance-logs/{self.log_id}',
+                                   data={'notes': 'Photo', 'attachments': (buffer, 'photo.jpg')},
+                                   content_type='multipart/form-data')
+        return response.json['attachments'][-1]
+
+    def etag(self, path):
+        return self.client.get(path).headers['ETag']
+
+    def all(self):
+        asset, item, log, general = self.asset_id, self.item_id, self.log_id, self.general_id
+        new_item = {'asset_id': asset, 'name': 'Bench', 'maintenance_type': 'time',
+                    'frequency_value': 3, 'frequency_unit': 'months'}
+        new_log = {'maintenance_item_id': item, 'date_performed': '2024-06-01', 'cost': 12.5}
+        new_general = {'asset_id': asset, 'description': 'Bench', 'date_performed': '2024-06-01'}
+        photo = self.image_attachment()
+
+        return [
+            ('GET /api/assets', self.get('/api/assets'), None),
+            ('GET /api/assets (304)', self.get('/api/assets', {'If-None-Match': self.etag('/api/assets')}), None),
+            ('GET /api/assets/:id', self.get(f'/api/assets/{asset}'), None),
+            ('POST /api/assets', self.send('POST', '/api/assets', {'name': 'Bench'}), None),
+            ('PUT /api/assets/:id', self.send('PUT', f'/api/assets/{asset}', lambda i: {'current_usage': 200000 + i}), None),
+            ('DELETE /api/assets/:id', self.send('DELETE', lambda i: f'/api/assets/{self.pending[i]}'),
+             self.create_many('/api/assets', {'name': 'Doomed'})),
+
+            ('GET /api/maintenance-items', self.get('/api/maintenance-items'), None),
+            ('GET /api/maintenance-items?asset_id', self.get(f'/api/maintenance-items?asset_id={asset}'), None),
+            ('GET /api/maintenance-items?due_before', self.get('/api/maintenance-items?due_before=2030-01-01'), None),
+            ('GET /api/maintenance-items?due_within', self.get('/api/maintenance-items?due_within=1000'), None),
+            ('GET /api/maintenance-items/:id', self.get(f'/api/maintenance-items/{item}'), None),
+            ('POST /api/maintenance-items', self.send('POST', '/api/maintenance-items', new_item), None),
+            ('PUT /api/maintenance-items/:id', self.send('PUT', f'/api/maintenance-items/{item}', {'notes': 'Bench'}), None),
+            ('DELETE /api/maintenance-items/:id', self.send('DELETE', lambda i: f'/api/maintenance-items/{self.pending[i]}'),
+             self.create_many('/api/maintenance-items', new_item)),
+
+            ('GET /api/maintenance-logs', self.get('/api/maintenance-logs'), None),
+            ('GET /api/maintenance-logs?limit=100', self.get('/api/maintenance-logs?limit=100'), None),
+            ('GET /api/maintenance-logs?maintenance_item_id', self.get(f'/api/maintenance-logs?maintenance_item_id={item}'), None),
+            ('GET /api/maintenance-logs/:id', self.get(f'/api/maintenance-logs/{log}'), None),
+            ('POST /api/maintenance-logs', self.send('POST', '/api/maintenance-logs', new_log), None),
+            ('PUT /api/maintenance-logs/:id', self.send('PUT', f'/api/maintenance-logs/{log}', {'notes': 'Bench'}), None),
+            ('DELETE /api/maintenance-logs/:id', self.send('DELETE', lambda i: f'/api/maintenance-logs/{self.pending[i]}'),
+             self.create_many('/api/maintenance-logs', new_log)),
+            ('POST /api/maintenance-logs/batch (100)', self.send('POST', '/api/maintenance-logs/batch', [new_log] * 100), None),
+
+            ('GET /api/general-maintenance', self.get('/api/general-maintenance'), None),
+            ('GET /api/general-maintenance?limit=100', self.get('/api/general-maintenance?limit=100'), None),
+            ('GET /api/general-maintenance?asset_id', self.get(f'/api/general-maintenance?asset_id={asset}'), None),
+            ('GET /api/general-maintenance/:id', self.get(f'/api/general-maintenance/{general}'), None),
+            ('POST /api/general-maintenance', self.send('POST', '/api/general-maintenance', new_general), None),
+            ('PUT /api/general-maintenance/:id', self.send('PUT', f'/api/general-maintenance/{general}', {'notes': 'Bench'}), None),
+            ('DELETE /api/general-maintenance/:id', self.send('DELETE', lambda i: f'/api/general-maintenance/{self.pending[i]}'),
+             self.create_many('/api/general-maintenance', new_general)),
+            ('POST /api/general-maintenance/batch (100)',
+             self.send('POST', '/api/general-maintenance/batch', [new_general] * 100), None),
+
+            ('GET /api/attachments/:id/renditions/thumb', self.get(photo['renditions']['thumb']), None),
+            ('GET /uploads/:name', self.get(f"/uploads/{os.path.basename(photo['file_path'])}"), None),
+            ('GET /api/dashboard', self.get('/api/dashboard'), None),
+            ('GET /api/settings', self.get('/api/settings'), None),
+            ('PUT /api/settings', self.send('PUT', '/api/settings', lambda i: {'reminder_interval_days': str(1 + i % 7)}), None),
+            ('GET /api/settings/outbox', self.get('/api/settings/outbox'), None),
+        ]
+
+    def reminders(self):
+        from app.models import Settings
+        from app.services.reminders import check_and_send_reminders
+        with self.app.app_context():
+            # Queue-only: delivery is a scheduler job, which is not running here
+            Settings.update({'notification_email': 'bench@example.com', 'smtp_host': '127.0.0.1',
+                             'smtp_port': '2525', 'smtp_username': 'bench@example.com', 'smtp_password': 'x',
+                             'reminder_interval_days': '0'})
+
+        def action(i):
+            check_and_send_reminders(self.app)
+            return None
+        return action
+
+    def exports(self):
+        return [(f'GET /api/backup/export?format={fmt}', self.get(f'/api/backup/export?format={fmt}'))
+                for fmt in ('json', 'ndjson', 'archive')]
+
+
+def bench_import(folder, exported, repeat):
+    """Replace-mode import of the exported JSON into a fresh database each run"""
+    apps = [build_app(os.path.join(folder, f'import-{n}')) for n in range(repeat + 2)]
+
+    def action(i):
+        client = apps[i].test_client()
+        response = client.post('/api/backup/import', content_type='multipart/form-data',
+                               data={'file': (io.BytesIO(exported), 'backup.json'), 'mode': 'replace'})
+        return response.status_code
+    return action
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--assets', type=int, default=100)
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--logs', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=20, help='timed runs per endpoint')
+    parser.add_argument('--heavy-repeat', type=int, default=3, help='timed runs for export, import and reminders')
+    parser.add_argument('--output', default='benchmark-results.json')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        os.makedirs(os.path.join(folder, 'uploads'))
+        app = build_app(folder)
+        start = time.perf_counter()
+        counts = generate(app, args.assets, args.items, args.logs, args.seed)
+        print(f'Generated {counts} in {time.perf_counter() - start:.1f}s', flush=True)
+
+        cases = Cases(app)
+        results = []
+        for name, action, setup in cases.all():
+            results.append(measure(name, action, args.repeat, setup))
+        for name, action in cases.exports():
+            results.append(measure(name, action, args.heavy_repeat))
+        results.append(measure('check_and_send_reminders', cases.reminders(), args.heavy_repeat))
+
+        exported = cases.client.get('/api/backup/export').get_data()
+        results.append(measure('POST /api/backup/import (replace)',
+                               bench_import(folder, exported, args.heavy_repeat), args.heavy_repeat))
+
+    report = {
+        'schema_version': SCHEMA_VERSION,
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'fleet': {'seed': args.seed, **counts},
+            'repeat': args.repeat,
+            'heavy_repeat': args.heavy_repeat,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Wrote {len(results)} results to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -11,10 +11,68 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(INSTANCE_FOLDER, 'upkeep.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Applied to every pooled SQLite connection; set SQLITE_PRAGMAS = {} to keep SQLite's defaults.
+    # WAL lets the scheduler and request threads read while one writes, and
+    # busy_timeout makes writers wait for the lock instead of failing.
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE') or 'WAL',
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS') or 5000),
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,  # KiB, i.e. 64MB of page cache
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'foreign_keys': 'ON',
+    }
     UPLOAD_FOLDER = os.path.join(basedir, 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max request size
+    MAX_BACKUP_SIZE = int(os.environ.get('MAX_BACKUP_SIZE') or 4 * 1024 * 1024 * 1024)  # backup imports only
 
     # File attachment settings
     MAX_ATTACHMENTS_PER_LOG = 5
     MAX_ATTACHMENT_SIZE = 16 * 1024 * 1024  # 16MB per file
+    MAX_BATCH_ENTRIES = 1000  # entries per batch log or general maintenance request
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf', 'gif', 'doc', 'docx', 'txt', 'csv', 'xlsx', 'heic'}
+
+    # How uploads are served: '' streams from Flask, 'nginx' hands off with
+    # X-Accel-Redirect to the internal location below, 'sendfile' uses X-Sendfile
+    UPLOAD_ACCEL = os.environ.get('UPLOAD_ACCEL', '')
+    UPLOAD_ACCEL_PREFIX = os.environ.get('UPLOAD_ACCEL_PREFIX') or '/protected-uploads/'
+
+    # Processes generating image thumbnails after upload; 0 renders inline
+    THUMBNAIL_WORKERS = int(os.environ.get('THUMBNAIL_WORKERS') or 2)
+
+    # Keyset pagination for list endpoints
+    DEFAULT_PAGE_SIZE = 100
+    MAX_PAGE_SIZE = 500
+
+    # Rows inserted per committed chunk during backup import
+    BACKUP_IMPORT_CHUNK_SIZE = 5000
+    # Threads writing attachment files when restoring an archive backup
+    ARCHIVE_RESTORE_WORKERS = 4
+
+    # Background scheduler. Every process competes for the lock file; the holder
+    # runs reminders and email delivery, the rest retry at the election interval
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', 'true').lower() != 'false'
+    SCHEDULER_LOCK_FILE = os.path.join(INSTANCE_FOLDER, 'scheduler.lock')
+    LEADER_ELECTION_SECONDS = 15
+
+    # Prometheus-style /metrics. With several server processes, METRICS_DIR is
+    # where each one shares its values so any of them can answer a scrape
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() != 'false'
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_FLUSH_SECONDS = 5
+
+    # JSON encoder for API responses: 'auto' uses orjson when it is installed,
+    # 'orjson' requires it, 'default' keeps Flask's standard library encoder
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER', 'auto')
+
+    # Telemetry readings are buffered per process and written this often (0 writes them as they arrive)
+    TELEMETRY_FLUSH_SECONDS = int(os.environ.get('TELEMETRY_FLUSH_SECONDS') or 30)
+    MAX_TELEMETRY_READINGS = 10000  # readings per telemetry request
+
+    # Email outbox delivery
+    OUTBOX_POLL_SECONDS = 30
+    OUTBOX_BATCH_SIZE = 50
+    OUTBOX_MAX_ATTEMPTS = 6
+    OUTBOX_RETRY_BASE_SECONDS = 60
+    OUTBOX_RETRY_MAX_SECONDS = 3600
@@ -0,0 +1,40 @@
+import os
+
+# Several processes, each with a pool of threads. SQLite allows one writer at
+# a time, so extra processes mainly add read and upload concurrency.
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 3))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+# Backup exports and imports stream for a long time
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 300))
+graceful_timeout = 30
+accesslog = '-'
+errorlog = '-'
+
+# Workers share their /metrics values through files here (see app/metrics.py)
+os.environ.setdefault('METRICS_DIR', os.path.join(
+    os.environ.get('INSTANCE_FOLDER') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance'),
+    'metrics'))
+
+# Each worker builds its own app after forking, with its own engine, pool,
+# scheduler and telemetry buffer. The master has already imported the package
+# and built a throwaway app in on_starting; that app starts no threads and its
+# engine is disposed before any fork, so no SQLite connection crosses the fork.
+preload_app = False
+
+
+def on_starting(server):
+    """Migrate the database once, in the master, before any worker starts"""
+    from app import create_app, db
+    from app.metrics import clear_snapshots
+    from app.schema import prepare_database
+    from config import Config
+
+    clear_snapshots(Config.METRICS_DIR)
+
+    app = create_app(type('MigrationConfig', (Config,), {'SCHEDULER_ENABLED': False}))
+    prepare_database(app)
+    # Close the pooled connections rather than let every worker inherit them
+    with app.app_context():
+        db.engine.dispose()
@@ -1,4 +1,6 @@
 import pytest
+from contextlib import contextmanager
+from sqlalchemy import event
 from app import create_app, db
 from config import Config
 
@@ -7,6 +9,7 @@ class TestConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     UPLOAD_FOLDER = '/tmp/test_uploads'
+    THUMBNAIL_WORKERS = 0
 
 
 @pytest.fixture
@@ -28,3 +31,52 @@ def client(app):
 @pytest.fixture
 def runner(app):
     return app.test_cli_runner()
+
+
+@pytest.fixture
+def count_queries(app):
+    """Context manager collecting the SQL statements executed inside it.
+
+    Usage::
+
+        with count_queries() as queries:
+            client.get('/api/maintenance-logs')
+        assert len(queries) == 2
+    """
+    @contextmanager
+    def counter():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+    return counter
+
+
+@pytest.fixture
+def smtp_server():
+    """Local SMTP stand-in; configure the app with ``smtp_settings``"""
+    from tests.smtp_stub import SMTPStub
+    server = SMTPStub().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def smtp_settings(app, smtp_server):
+    from app.models import Settings
+    Settings.update({
+        'smtp_host': '127.0.0.1',
+        'smtp_port': str(smtp_server.port),
+        'smtp_username': 'upkeep@example.com',
+        'smtp_password': 'secret',
+        'smtp_use_tls': 'false',
+        'notification_email': 'owner@example.com',
+    })
+    return smtp_server
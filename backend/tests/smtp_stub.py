@@ -0,0 +1,93 @@
+import socketserver
+import threading
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP (EHLO, AUTH PLAIN/LOGIN, MAIL, RCPT, DATA) for smtplib"""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode('ascii'))
+
+    def readline(self):
+        return self.rfile.readline().decode('utf-8').rstrip('\r\n')
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply('220 localhost SMTP stub')
+        sender = None
+        recipients = []
+        while True:
+            line = self.readline()
+            if not line and self.rfile.closed:
+                return
+            command = line.split(' ', 1)[0].upper()
+            if command in ('EHLO', 'HELO'):
+                self.wfile.write(b'250-localhost\r\n250 AUTH PLAIN LOGIN\r\n')
+            elif command == 'AUTH':
+                parts = line.split()
+                if parts[1].upper() == 'LOGIN':
+                    # Username and password prompts
+                    self.reply('334 VXNlcm5hbWU6')
+                    self.readline()
+                    self.reply('334 UGFzc3dvcmQ6')
+                    self.readline()
+                server.logins += 1
+                self.reply('235 Authentication successful')
+            elif command == 'MAIL':
+                sender = line.split(':', 1)[1].strip().strip('<>')
+                recipients = []
+                self.reply('250 OK')
+            elif command == 'RCPT':
+                recipient = line.split(':', 1)[1].strip().strip('<>')
+                if recipient in server.reject:
+                    self.reply('550 Mailbox unavailable')
+                else:
+                    recipients.append(recipient)
+                    self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                while True:
+                    data_line = self.readline()
+                    if data_line == '.':
+                        break
+                    lines.append(data_line)
+                server.messages.append({'from': sender, 'to': recipients, 'data': '\n'.join(lines)})
+                self.reply('250 OK')
+            elif command in ('RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            elif not line:
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class SMTPStub(socketserver.ThreadingTCPServer):
+    """Local SMTP stand-in recording connections, logins and messages"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _SMTPHandler)
+        self.connections = 0
+        self.logins = 0
+        self.messages = []
+        self.reject = set()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,87 @@
+import io
+import json
+import os
+import pytest
+from PIL import Image
+
+
+@pytest.fixture
+def sample_log(client):
+    asset = client.post('/api/assets',
+                        data=json.dumps({'name': 'Truck', 'usage_metric': 'miles'}),
+                        content_type='application/json').json
+    item = client.post('/api/maintenance-items',
+                       data=json.dumps({'asset_id': asset['id'], 'name': 'Oil Change',
+                                        'maintenance_type': 'time', 'frequency_value': 3,
+                                        'frequency_unit': 'months'}),
+                       content_type='application/json').json
+    return client.post('/api/maintenance-logs',
+                       data=json.dumps({'maintenance_item_id': item['id'], 'date_performed': '2024-01-01'}),
+                       content_type='application/json').json
+
+
+def photo(width=2000, height=1200, color=(200, 40, 40)):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, 'JPEG')
+    buffer.seek(0)
+    return buffer
+
+
+def attach(client, log, content, filename):
+    response = client.put(f'/api/maintenance-logs/{log["id"]}',
+                          data={'notes': 'Receipt', 'attachments': (content, filename)},
+                          content_type='multipart/form-data')
+    return response.json['attachments'][-1]
+
+
+def test_renditions_generated_after_upload(client, sample_log):
+    """Test that image uploads get bounded renditions served from their own URL"""
+    attachment = attach(client, sample_log, photo(), 'receipt.jpg')
+    assert set(attachment['renditions']) == {'thumb', 'preview'}
+
+    response = client.get(attachment['renditions']['thumb'])
+    assert response.status_code == 200
+    assert response.mimetype.startswith('image/')
+    with Image.open(io.BytesIO(response.data)) as image:
+        assert image.size == (256, 154)
+
+    with Image.open(io.BytesIO(client.get(attachment['renditions']['preview']).data)) as image:
+        assert max(image.size) == 1024
+
+
+def test_rendition_generated_lazily(client, app, sample_log):
+    """Test that a missing rendition, e.g. for an older attachment, is created on request"""
+    from app.models import Attachment
+    from app.services.thumbnails import rendition_path
+
+    attachment = attach(client, sample_log, photo(color=(10, 90, 10)), 'old.jpg')
+    path = rendition_path(Attachment.query.get(attachment['id']).file_path, 'thumb')
+    os.remove(path)
+
+    response = client.get(f'/api/attachments/{attachment["id"]}/renditions/thumb')
+    assert response.status_code == 200
+    assert os.path.exists(path)
+
+
+def test_renditions_removed_with_last_reference(client, sample_log):
+    """Test that deleting the blob also deletes its cached renditions"""
+    from app.models import Attachment
+    from app.services.thumbnails import rendition_path
+
+    attachment = attach(client, sample_log, photo(color=(1, 2, 3)), 'gone.jpg')
+    path = rendition_path(Attachment.query.get(attachment['id']).file_path, 'thumb')
+    assert os.path.exists(path)
+
+    client.delete(f'/api/maintenance-logs/attachments/{attachment["id"]}')
+    assert not os.path.exists(path)
+
+
+def test_rendition_not_available(client, sample_log):
+    """Test rendition requests for non-images and unknown sizes"""
+    attachment = attach(client, sample_log, io.BytesIO(b'plain text'), 'notes.txt')
+    assert attachment['renditions'] == {}
+    assert client.get(f'/api/attachments/{attachment["id"]}/renditions/thumb').status_code == 404
+
+    image = attach(client, sample_log, photo(), 'receipt.jpg')
+    assert client.get(f'/api/attachments/{image["id"]}/renditions/huge').status_code == 404
+    assert client.get('/api/attachments/9999/renditions/thumb').status_code == 404
@@ -0,0 +1,248 @@
+import gzip
+import io
+import json
+import os
+import tarfile
+import pytest
+
+
+@pytest.fixture
+def populated(client):
+    """Create two assets with items, logs and general maintenance"""
+    for n in range(2):
+        asset = client.post('/api/assets',
+                            data=json.dumps({'name': f'Asset {n}', 'usage_metric': 'miles', 'current_usage': 1000}),
+                            content_type='application/json').json
+        for i in range(3):
+            item = client.post('/api/maintenance-items',
+                               data=json.dumps({'asset_id': asset['id'], 'name': f'Item {i}',
+                                                'maintenance_type': 'usage', 'frequency_value': 500,
+                                                'frequency_unit': 'miles'}),
+                               content_type='application/json').json
+            for day in range(1, 4):
+                client.post('/api/maintenance-logs',
+                            data=json.dumps({'maintenance_item_id': item['id'],
+                                             'date_performed': f'2024-01-{day:02d}',
+                                             'usage_reading': 100 * day,
+                                             'cost': 10}),
+                            content_type='application/json')
+        client.post('/api/general-maintenance',
+                    data=json.dumps({'asset_id': asset['id'], 'description': 'Wash',
+                                     'date_performed': '2024-02-01'}),
+                    content_type='application/json')
+
+
+def test_export(client, populated):
+    """Test exporting the full tree"""
+    response = client.get('/api/backup/export')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert len(data['assets']) == 2
+    assert len(data['assets'][0]['maintenance_items']) == 3
+    assert len(data['assets'][0]['maintenance_items'][0]['logs']) == 3
+    assert len(data['assets'][0]['general_maintenance']) == 1
+
+
+def test_export_query_count(client, populated, count_queries):
+    """Test that export runs one query per table, not per row"""
+    with count_queries() as queries:
+        response = client.get('/api/backup/export')
+    assert response.status_code == 200
+    assert len(queries) == 6
+
+
+def test_export_attachments_nested_under_their_log(client, populated):
+    """Test that streamed attachments are matched to the right log"""
+    logs = client.get('/api/maintenance-logs').json
+    target = logs[4]
+    client.put(f'/api/maintenance-logs/{target["id"]}',
+               data={'notes': 'Receipt', 'attachments': (io.BytesIO(b'receipt'), 'receipt.txt')},
+               content_type='multipart/form-data')
+
+    data = json.loads(client.get('/api/backup/export').data)
+    found = [(log['id'], att['filename'])
+             for asset in data['assets']
+             for item in asset['maintenance_items']
+             for log in item['logs']
+             for att in log['attachments']]
+    assert found == [(target['id'], 'receipt.txt')]
+
+
+def test_export_ndjson_gzip(client, populated):
+    """Test the gzipped NDJSON export variant"""
+    response = client.get('/api/backup/export?format=ndjson&compress=gzip')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/gzip'
+    assert '.ndjson.gz' in response.headers['Content-Disposition']
+
+    lines = gzip.decompress(response.data).decode('utf-8').splitlines()
+    records = [json.loads(line) for line in lines]
+    assert records[0]['type'] == 'header'
+    types = [r['type'] for r in records[1:]]
+    assert types.count('asset') == 2
+    assert types.count('maintenance_item') == 6
+    assert types.count('maintenance_log') == 18
+    assert types.count('general_maintenance') == 2
+    # Parents always precede their children
+    assert types.index('maintenance_log') > types.index('maintenance_item') > types.index('asset')
+
+
+def import_file(client, content, filename, **form):
+    form['file'] = (io.BytesIO(content), filename)
+    return client.post('/api/backup/import', data=form, content_type='multipart/form-data')
+
+
+def test_import_roundtrip_in_chunks(client, populated):
+    """Test that an export re-imports in replace mode across several chunks"""
+    exported = client.get('/api/backup/export').data
+
+    response = import_file(client, exported, 'backup.json', mode='replace', chunk_size='4')
+    assert response.status_code == 200
+    assert response.json['counts'] == {
+        'assets': 2, 'maintenance_items': 6, 'maintenance_logs': 18, 'general_maintenance': 2,
+        'attachments': 0
+    }
+    assert response.json['chunks'] == 7
+
+    items = client.get('/api/maintenance-items').json
+    assert len(items) == 6
+    assert all(item['next_due_usage'] == 800 for item in items)
+    assert len(client.get('/api/maintenance-logs').json) == 18
+
+
+def test_import_ndjson_gzip_merge(client, populated):
+    """Test merging a gzipped NDJSON export remaps ids onto new rows"""
+    exported = client.get('/api/backup/export?format=ndjson&compress=gzip').data
+
+    response = import_file(client, exported, 'backup.ndjson.gz')
+    assert response.status_code == 200
+    assert response.json['counts']['maintenance_logs'] == 18
+
+    assets = client.get('/api/assets').json
+    assert len(assets) == 4
+    copy = assets[2]
+    items = client.get(f'/api/maintenance-items?asset_id={copy["id"]}').json
+    assert len(items) == 3
+    logs = client.get(f'/api/maintenance-logs?maintenance_item_id={items[0]["id"]}').json
+    assert len(logs) == 3
+
+
+def test_import_legacy_vehicles(client):
+    """Test importing the legacy vehicle backup format"""
+    backup = {
+        'version': '1.0',
+        'vehicles': [{
+            'year': 2015, 'make': 'Honda', 'model': 'Civic', 'current_mileage': 90000,
+            'maintenance_items': [{
+                'name': 'Oil Change', 'maintenance_type': 'mileage', 'frequency_value': 5000,
+                'frequency_unit': 'miles',
+                'logs': [{'date_performed': '2023-05-01', 'mileage': 88000}]
+            }]
+        }]
+    }
+    response = import_file(client, json.dumps(backup).encode('utf-8'), 'old.json')
+    assert response.status_code == 200
+
+    asset = client.get('/api/assets').json[0]
+    assert asset['name'] == '2015 Honda Civic'
+    assert asset['current_usage'] == 90000
+
+
+def test_import_invalid_files(client):
+    """Test rejection of malformed backups"""
+    assert import_file(client, b'{"assets": [', 'bad.json').status_code == 400
+    assert import_file(client, b'{"other": []}', 'bad.json').status_code == 400
+    assert import_file(client, b'{}', 'backup.txt').status_code == 400
+
+
+def test_archive_roundtrip_restores_files(client, app, populated):
+    """Test that an archive backup carries attachment files and re-points their paths"""
+    log = client.get('/api/maintenance-logs').json[0]
+    client.put(f'/api/maintenance-logs/{log["id"]}',
+               data={'notes': 'Receipt', 'attachments': (io.BytesIO(b'archived receipt'), 'archived.txt')},
+               content_type='multipart/form-data')
+
+    response = client.get('/api/backup/export?format=archive&compress=gzip')
+    assert response.status_code == 200
+    archive = response.data
+    with tarfile.open(fileobj=io.BytesIO(archive), mode='r:gz') as tar:
+        names = tar.getnames()
+    assert any(name.startswith('uploads/') and name.endswith('.txt') for name in names)
+    assert any(name.startswith('data/') for name in names)
+
+    response = import_file(client, archive, 'backup.tar.gz', mode='replace')
+    assert response.status_code == 200
+    assert response.json['counts']['attachments'] == 1
+    assert response.json['files_restored'] == 1
+
+    attachments = [att for entry in client.get('/api/maintenance-logs').json for att in entry['attachments']]
+    assert len(attachments) == 1
+    restored = attachments[0]['file_path']
+    assert os.path.dirname(restored) == app.config['UPLOAD_FOLDER']
+    with open(restored, 'rb') as f:
+        assert f.read() == b'archived receipt'
+
+
+def test_failed_archive_import_removes_restored_files(client, app):
+    """Test that files written by an import that then fails are cleaned up"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w') as tar:
+        for name, content in (('uploads/failed_restore.txt', b'orphan'), ('data/00000.ndjson', b'not json\n')):
+            member = tarfile.TarInfo(name)
+            member.size = len(content)
+            tar.addfile(member, io.BytesIO(content))
+
+    path = os.path.join(app.config['UPLOAD_FOLDER'], 'failed_restore.txt')
+    if os.path.exists(path):
+        os.remove(path)
+    response = import_file(client, buffer.getvalue(), 'backup.tar')
+    assert response.status_code == 400
+    assert not os.path.exists(path)
+
+
+def test_failed_import_keeps_derived_data_for_committed_chunks(client):
+    """Test that chunks committed before a failure get next-due values, cost rollups and usage history"""
+    from app.models import AssetMonthlyCost, MaintenanceItem, UsageReading
+    records = [
+        {'type': 'header', 'version': '2.0'},
+        {'type': 'asset', 'data': {'id': 1, 'name': 'Truck', 'usage_metric': 'miles', 'current_usage': 1000}},
+        {'type': 'maintenance_item', 'data': {'id': 1, 'asset_id': 1, 'name': 'Oil Change',
+                                              'maintenance_type': 'usage', 'frequency_value': 5000,
+                                              'frequency_unit': 'miles'}},
+        {'type': 'maintenance_log', 'data': {'id': 1, 'maintenance_item_id': 1, 'date_performed': '2024-01-01',
+                                             'cost': 50, 'usage_reading': 900}},
+        {'type': 'maintenance_log', 'data': {'id': 2, 'maintenance_item_id': 99, 'date_performed': '2024-02-01'}},
+    ]
+    content = '\n'.join(json.dumps(record) for record in records).encode('utf-8')
+
+    response = import_file(client, content, 'backup.ndjson', chunk_size='1')
+    assert response.status_code == 400
+    assert response.json['chunks'] == 3
+
+    item = MaintenanceItem.query.one()
+    assert item.next_due_usage == 5900
+    assert AssetMonthlyCost.query.count() == 1
+    assert UsageReading.query.filter_by(source='maintenance_log').count() == 1
+
+
+def test_import_chunks_move_past_ids_taken_by_other_writers(app):
+    """Test that rows inserted between chunks shift the importer's ids instead of colliding"""
+    from app import db
+    from app.models import Asset, MaintenanceItem
+    from app.services.backup import BulkImporter
+
+    importer = BulkImporter(chunk_size=1)
+    importer.add_asset({'name': 'First import'})
+    importer.chunk_size = 10
+    asset_id = importer.add_asset({'name': 'Second import'})
+    importer.add_item(asset_id, {'name': 'Oil Change', 'frequency_value': 6, 'frequency_unit': 'months'})
+
+    # A request in another worker takes the ids the pending chunk was given
+    db.session.add_all([Asset(name='Posted meanwhile'), Asset(name='And another')])
+    db.session.commit()
+    importer.flush()
+
+    names = [asset.name for asset in Asset.query.order_by(Asset.id)]
+    assert names == ['First import', 'Posted meanwhile', 'And another', 'Second import']
+    assert MaintenanceItem.query.one().asset.name == 'Second import'
+    assert importer.item_ranges == [(1, 1)]
@@ -0,0 +1,131 @@
+import pytest
+from app.models import Asset, GeneralMaintenance, MaintenanceItem, MaintenanceLog, UsageReading
+
+
+@pytest.fixture
+def fleet(client):
+    truck = client.post('/api/assets', json={'name': 'Truck', 'usage_metric': 'miles', 'current_usage': 1000}).json
+    van = client.post('/api/assets', json={'name': 'Van', 'usage_metric': 'miles', 'current_usage': 500}).json
+    oil = client.post('/api/maintenance-items', json={
+        'asset_id': truck['id'], 'name': 'Oil Change', 'maintenance_type': 'usage',
+        'frequency_value': 5000, 'frequency_unit': 'miles'}).json
+    tyres = client.post('/api/maintenance-items', json={
+        'asset_id': van['id'], 'name': 'Tyres', 'maintenance_type': 'time',
+        'frequency_value': 1, 'frequency_unit': 'years'}).json
+    return {'truck': truck, 'van': van, 'oil': oil, 'tyres': tyres}
+
+
+def test_log_batch_creates_every_entry(client, fleet, count_queries):
+    entries = [{'maintenance_item_id': fleet['oil']['id'], 'date_performed': f'2024-0{n}-01',
+                'usage_reading': 2000 + n * 100, 'cost': 50} for n in range(1, 6)]
+    entries.append({'maintenance_item_id': fleet['tyres']['id'], 'date_performed': '2024-02-01', 'notes': 'All four'})
+
+    with count_queries() as queries:
+        response = client.post('/api/maintenance-logs/batch', json={'entries': entries})
+    assert response.status_code == 201
+    assert response.json['created'] == 6
+    assert [result['status'] for result in response.json['results']] == ['created'] * 6
+    ids = [result['id'] for result in response.json['results']]
+    assert sorted(log.id for log in MaintenanceLog.query) == sorted(ids)
+    # Six entries cost about what one does: nothing is repeated per entry
+    assert len([q for q in queries if q.lstrip().upper().startswith('INSERT INTO MAINTENANCE_LOGS')]) == 1
+
+    # Usage raised once to the highest reading; next-due follows the latest log
+    assert Asset.query.get(fleet['truck']['id']).current_usage == 2500
+    assert MaintenanceItem.query.get(fleet['oil']['id']).next_due_usage == 7500
+    assert MaintenanceItem.query.get(fleet['tyres']['id']).next_due_date.isoformat() == '2025-01-31'
+    assert UsageReading.query.filter_by(source='maintenance_log').count() == 5
+
+
+def test_atomic_batch_writes_nothing_when_an_entry_is_invalid(client, fleet):
+    response = client.post('/api/maintenance-logs/batch', json=[
+        {'maintenance_item_id': fleet['oil']['id'], 'date_performed': '2024-01-01'},
+        {'maintenance_item_id': 9999, 'date_performed': '2024-01-01'},
+        {'maintenance_item_id': fleet['oil']['id'], 'date_performed': 'yesterday'},
+        'not an entry',
+    ])
+    assert response.status_code == 400
+    assert response.json['created'] == 0
+    assert [result['status'] for result in response.json['results']] == ['skipped', 'invalid', 'invalid', 'invalid']
+    assert response.json['results'][1]['error'] == 'Maintenance item not found'
+    assert MaintenanceLog.query.count() == 0
+
+
+def test_non_atomic_batch_writes_the_valid_entries(client, fleet):
+    response = client.post('/api/general-maintenance/batch', json={'atomic': False, 'entries': [
+        {'asset_id': fleet['van']['id'], 'description': 'Wiper blades', 'date_performed': '2024-03-01',
+         'usage_reading': '900'},
+        {'asset_id': fleet['van']['id'], 'date_performed': '2024-03-01'},
+        {'asset_id': str(fleet['truck']['id']), 'description': 'Wash', 'date_performed': '2024-03-02', 'cost': '12.50'},
+    ]})
+    assert response.status_code == 207
+    assert (response.json['created'], response.json['invalid']) == (2, 1)
+    statuses = [(result['status'], result.get('error')) for result in response.json['results']]
+    assert statuses == [('created', None), ('invalid', 'description is required'), ('created', None)]
+    assert sorted(record.description for record in GeneralMaintenance.query) == ['Wash', 'Wiper blades']
+    assert Asset.query.get(fleet['van']['id']).current_usage == 900
+
+    costs = client.get('/api/costs?group_by=asset').json
+    assert {entry['asset_name']: entry['general_cost'] for entry in costs} == {'Truck': 12.5}
+
+
+def test_rejected_requests(client, fleet, app):
+    assert client.post('/api/maintenance-logs/batch', json={'entries': []}).status_code == 400
+    assert client.post('/api/maintenance-logs/batch', json={'entries': 'x'}).status_code == 400
+    assert client.post('/api/general-maintenance/batch', data='nope').status_code == 400
+
+    app.config['MAX_BATCH_ENTRIES'] = 2
+    entry = {'maintenance_item_id': fleet['oil']['id'], 'date_performed': '2024-01-01'}
+    response = client.post('/api/maintenance-logs/batch', json=[entry] * 3)
+    assert response.status_code == 400
+    assert response.json['error'] == 'At most 2 entries are allowed per batch'
+
+
+def test_text_fields_must_be_strings(client, fleet):
+    response = client.post('/api/general-maintenance/batch', json={'atomic': False, 'entries': [
+        {'asset_id': fleet['van']['id'], 'description': ['Wash'], 'date_performed': '2024-03-01'},
+        {'asset_id': fleet['van']['id'], 'description': 'Wash', 'date_performed': '2024-03-01', 'notes': 5},
+    ]})
+    assert [result['error'] for result in response.json['results']] == \
+        ['description must be a string', 'notes must be a string']
+
+
+def test_batch_holds_the_write_lock_while_assigning_ids(tmp_path):
+    """Test that another connection cannot insert between reading max(id) and the batch insert"""
+    import sqlite3
+    from sqlalchemy import event
+    from app import create_app, db
+    from tests.conftest import TestConfig
+
+    path = tmp_path / 'upkeep.db'
+    config = type('FileConfig', (TestConfig,), {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+        asset = client.post('/api/assets', json={'name': 'Truck'}).json
+        entries = [{'asset_id': asset['id'], 'description': 'Wash', 'date_performed': '2024-03-01'}] * 3
+
+        attempts = []
+
+        def competing_insert(session, flush_context, instances):
+            other = sqlite3.connect(path, timeout=0)
+            try:
+                other.execute("INSERT INTO general_maintenance (asset_id, description, date_performed) "
+                              "VALUES (?, 'Rival', '2024-03-01')", (asset['id'],))
+                other.commit()
+                attempts.append('inserted')
+            except sqlite3.OperationalError as e:
+                attempts.append(str(e))
+            finally:
+                other.close()
+
+        event.listen(db.session, 'before_flush', competing_insert)
+        try:
+            response = client.post('/api/general-maintenance/batch', json=entries)
+        finally:
+            event.remove(db.session, 'before_flush', competing_insert)
+        assert response.status_code == 201
+        assert attempts and set(attempts) == {'database is locked'}
+        db.session.remove()
+        db.engine.dispose()
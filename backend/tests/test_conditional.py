@@ -0,0 +1,118 @@
+import io
+import json
+from datetime import datetime
+from app import db
+from app.models import CollectionVersion
+
+
+def create_asset(client, name='Boat'):
+    return client.post('/api/assets', data=json.dumps({'name': name}), content_type='application/json').json
+
+
+def test_list_not_modified_without_loading_rows(client, count_queries):
+    """Test that a matching If-None-Match gets a 304 from the version lookup alone"""
+    create_asset(client)
+    response = client.get('/api/assets')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert response.headers['Last-Modified']
+    assert response.cache_control.no_cache
+
+    with count_queries() as queries:
+        response = client.get('/api/assets', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+    assert len(queries) == 1
+
+
+def test_writes_change_only_their_collections(client):
+    """Test that a write bumps the versions of the tables it touched"""
+    asset = create_asset(client)
+    assets_etag = client.get('/api/assets').headers['ETag']
+    items_etag = client.get('/api/maintenance-items').headers['ETag']
+
+    client.post('/api/maintenance-items',
+                data=json.dumps({'asset_id': asset['id'], 'name': 'Hull', 'maintenance_type': 'time',
+                                 'frequency_value': 1, 'frequency_unit': 'years'}),
+                content_type='application/json')
+
+    assert client.get('/api/assets', headers={'If-None-Match': assets_etag}).status_code == 304
+    response = client.get('/api/maintenance-items', headers={'If-None-Match': items_etag})
+    assert response.status_code == 200
+    assert len(response.json) == 1
+
+
+def test_detail_and_query_string_etags(client):
+    """Test that detail endpoints are conditional and each URL has its own ETag"""
+    asset = create_asset(client)
+    detail = client.get(f'/api/assets/{asset["id"]}')
+    assert detail.headers['ETag'] != client.get('/api/assets').headers['ETag']
+    assert client.get(f'/api/assets/{asset["id"]}',
+                      headers={'If-None-Match': detail.headers['ETag']}).status_code == 304
+
+    client.put(f'/api/assets/{asset["id"]}', data=json.dumps({'name': 'Yacht'}), content_type='application/json')
+    response = client.get(f'/api/assets/{asset["id"]}', headers={'If-None-Match': detail.headers['ETag']})
+    assert response.status_code == 200
+    assert response.json['name'] == 'Yacht'
+
+    assert client.get('/api/assets/9999').status_code == 404
+
+
+def test_if_modified_since(client):
+    """Test Last-Modified revalidation for clients that do not send ETags"""
+    create_asset(client)
+    last_modified = client.get('/api/general-maintenance').headers.get('Last-Modified')
+    assert last_modified is None
+
+    response = client.get('/api/assets')
+    assert client.get('/api/assets', headers={'If-Modified-Since': response.headers['Last-Modified']}).status_code == 304
+    assert client.get('/api/assets', headers={'If-Modified-Since': 'Mon, 01 Jan 2001 00:00:00 GMT'}).status_code == 200
+
+
+def test_last_modified_rounds_up_to_the_second(client):
+    """Test that a write part way through a second is newer than that second"""
+    create_asset(client)
+    CollectionVersion.query.filter_by(name='assets').update({'updated_at': datetime(2024, 5, 1, 12, 0, 0, 500000)})
+    db.session.commit()
+
+    response = client.get('/api/assets')
+    assert response.headers['Last-Modified'] == 'Wed, 01 May 2024 12:00:01 GMT'
+    assert client.get('/api/assets', headers={'If-Modified-Since': 'Wed, 01 May 2024 12:00:00 GMT'}).status_code == 200
+    assert client.get('/api/assets', headers={'If-Modified-Since': 'Wed, 01 May 2024 12:00:01 GMT'}).status_code == 304
+
+
+def test_bulk_import_bumps_versions(client):
+    """Test that the backup importer's bulk statements invalidate cached lists"""
+    create_asset(client)
+    etag = client.get('/api/assets').headers['ETag']
+
+    backup = json.dumps({'version': '2.0', 'assets': [{'name': 'Imported'}]}).encode('utf-8')
+    client.post('/api/backup/import', data={'file': (io.BytesIO(backup), 'backup.json'), 'mode': 'replace'},
+                content_type='multipart/form-data')
+
+    response = client.get('/api/assets', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert [a['name'] for a in response.json] == ['Imported']
+
+
+def test_due_within_follows_asset_usage(client):
+    """Test that the usage-relative due list is revalidated when asset usage changes"""
+    asset = client.post('/api/assets', data=json.dumps({'name': 'Truck', 'usage_metric': 'miles'}),
+                        content_type='application/json').json
+    item = client.post('/api/maintenance-items',
+                       data=json.dumps({'asset_id': asset['id'], 'name': 'Oil Change', 'maintenance_type': 'usage',
+                                        'frequency_value': 5000, 'frequency_unit': 'miles'}),
+                       content_type='application/json').json
+    client.post('/api/maintenance-logs',
+                data=json.dumps({'maintenance_item_id': item['id'], 'date_performed': '2024-01-01',
+                                 'usage_reading': 1000}),
+                content_type='application/json')
+
+    response = client.get('/api/maintenance-items?due_within=100')
+    assert response.json == []
+
+    client.put(f'/api/assets/{asset["id"]}', data=json.dumps({'current_usage': 5950}), content_type='application/json')
+    response = client.get('/api/maintenance-items?due_within=100', headers={'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 200
+    assert [i['id'] for i in response.json] == [item['id']]
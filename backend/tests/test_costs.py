@@ -0,0 +1,154 @@
+import io
+import pytest
+from app import db
+from app.models import AssetMonthlyCost, ItemYearlyCost
+from app.services.costs import rebuild_cost_rollups
+
+
+@pytest.fixture
+def fleet(client):
+    """Two assets in different categories, each with a scheduled item"""
+    truck = client.post('/api/assets', json={'name': 'Truck', 'category': 'Vehicle'}).json
+    house = client.post('/api/assets', json={'name': 'House', 'category': 'Building'}).json
+    oil = client.post('/api/maintenance-items', json={
+        'asset_id': truck['id'], 'name': 'Oil Change', 'maintenance_type': 'time',
+        'frequency_value': 6, 'frequency_unit': 'months'}).json
+    filters = client.post('/api/maintenance-items', json={
+        'asset_id': house['id'], 'name': 'HVAC Filter', 'maintenance_type': 'time',
+        'frequency_value': 3, 'frequency_unit': 'months'}).json
+    return {'truck': truck, 'house': house, 'oil': oil, 'filters': filters}
+
+
+def add_log(client, item, day, cost):
+    return client.post('/api/maintenance-logs', json={
+        'maintenance_item_id': item['id'], 'date_performed': day, 'cost': cost}).json
+
+
+def add_general(client, asset, day, cost):
+    return client.post('/api/general-maintenance', json={
+        'asset_id': asset['id'], 'description': 'Repair', 'date_performed': day, 'cost': cost}).json
+
+
+def rollups():
+    months = sorted((r.asset_id, r.month, float(r.scheduled_cost), float(r.general_cost), r.entries)
+                    for r in AssetMonthlyCost.query)
+    years = sorted((r.maintenance_item_id, r.year, r.asset_id, float(r.cost), r.entries)
+                   for r in ItemYearlyCost.query)
+    return months, years
+
+
+def assert_matches_rebuild():
+    incremental = rollups()
+    rebuild_cost_rollups()
+    db.session.commit()
+    assert rollups() == incremental
+
+
+def test_rollups_follow_writes(client, fleet):
+    log = add_log(client, fleet['oil'], '2024-03-10', 40)
+    add_log(client, fleet['oil'], '2024-03-25', 60)
+    add_log(client, fleet['oil'], '2024-04-02', None)
+    add_general(client, fleet['truck'], '2024-03-15', 200)
+    assert_matches_rebuild()
+    assert rollups()[0] == [(fleet['truck']['id'], '2024-03', 100.0, 200.0, 3)]
+
+    # Moving a log to another month and year clears the old rollups
+    client.put(f"/api/maintenance-logs/{log['id']}", json={'date_performed': '2023-12-31', 'cost': 45})
+    assert_matches_rebuild()
+    assert (fleet['oil']['id'], 2023, fleet['truck']['id'], 45.0, 1) in rollups()[1]
+
+    client.delete(f"/api/maintenance-logs/{log['id']}")
+    assert_matches_rebuild()
+    assert all(year != 2023 for _, year, *_ in rollups()[1])
+
+
+def test_rollups_cleared_when_asset_deleted(client, fleet):
+    add_log(client, fleet['oil'], '2024-03-10', 40)
+    add_general(client, fleet['truck'], '2024-05-01', 200)
+    add_log(client, fleet['filters'], '2024-03-10', 15)
+
+    client.delete(f"/api/assets/{fleet['truck']['id']}")
+
+    months, years = rollups()
+    assert {asset_id for asset_id, *_ in months} == {fleet['house']['id']}
+    assert {item_id for item_id, *_ in years} == {fleet['filters']['id']}
+    assert_matches_rebuild()
+
+
+def test_totals_by_each_grouping(client, fleet):
+    add_log(client, fleet['oil'], '2024-01-10', 50)
+    add_log(client, fleet['oil'], '2024-02-10', 70)
+    add_general(client, fleet['truck'], '2024-02-20', 30)
+    add_log(client, fleet['filters'], '2024-02-05', 20)
+    add_log(client, fleet['filters'], '2023-11-05', 10)
+
+    by_asset = client.get('/api/costs?group_by=asset&year=2024').json
+    assert [(row['asset_name'], row['scheduled_cost'], row['general_cost'], row['total_cost'])
+            for row in by_asset] == [('Truck', 120.0, 30.0, 150.0), ('House', 20.0, 0.0, 20.0)]
+
+    by_category = client.get('/api/costs?group_by=category').json
+    assert {row['category']: row['total_cost'] for row in by_category} == {'Vehicle': 150.0, 'Building': 30.0}
+
+    by_item = client.get('/api/costs?group_by=item').json
+    assert [(row['item_name'], row['total_cost'], row['entries']) for row in by_item] == [
+        ('Oil Change', 120.0, 2), ('HVAC Filter', 30.0, 2)]
+
+    by_month = client.get(f"/api/costs?group_by=month&asset_id={fleet['truck']['id']}").json
+    assert [(row['month'], row['total_cost']) for row in by_month] == [('2024-01', 50.0), ('2024-02', 100.0)]
+
+    assert client.get('/api/costs?category=Building').json == [
+        {'month': '2023-11', 'scheduled_cost': 10.0, 'general_cost': 0.0, 'total_cost': 10.0, 'entries': 1},
+        {'month': '2024-02', 'scheduled_cost': 20.0, 'general_cost': 0.0, 'total_cost': 20.0, 'entries': 1},
+    ]
+
+
+def test_year_over_year(client, fleet):
+    add_log(client, fleet['oil'], '2023-02-10', 100)
+    add_log(client, fleet['oil'], '2024-02-10', 150)
+    add_general(client, fleet['truck'], '2024-07-01', 25)
+
+    report = client.get('/api/costs/year-over-year?year=2024').json
+    assert report['previous_year'] == 2023
+    february, july = report['months'][1], report['months'][6]
+    assert february == {'month': 2, 'current': 150.0, 'previous': 100.0, 'change': 50.0, 'change_percent': 50.0}
+    assert july['change_percent'] is None
+    assert report['total'] == {'current': 175.0, 'previous': 100.0, 'change': 75.0, 'change_percent': 75.0}
+
+
+def test_invalid_grouping(client):
+    response = client.get('/api/costs?group_by=week')
+    assert response.status_code == 400
+
+
+def test_cost_reports_are_conditional(client, fleet):
+    first = client.get('/api/costs')
+    assert client.get('/api/costs', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    add_log(client, fleet['oil'], '2024-01-10', 50)
+    assert client.get('/api/costs', headers={'If-None-Match': first.headers['ETag']}).status_code == 200
+
+
+def test_import_rebuilds_rollups(client, fleet):
+    add_log(client, fleet['oil'], '2024-01-10', 50)
+    add_general(client, fleet['house'], '2024-01-12', 5)
+    before = rollups()
+    exported = client.get('/api/backup/export').get_data()
+
+    client.post('/api/backup/import', data={'file': (io.BytesIO(exported), 'backup.json'), 'mode': 'replace'},
+                content_type='multipart/form-data')
+    assert client.get('/api/costs?group_by=category').json == [
+        {'category': 'Vehicle', 'scheduled_cost': 50.0, 'general_cost': 0.0, 'total_cost': 50.0, 'entries': 1},
+        {'category': 'Building', 'scheduled_cost': 0.0, 'general_cost': 5.0, 'total_cost': 5.0, 'entries': 1},
+    ]
+    assert len(rollups()[0]) == len(before[0])
+
+
+def test_rebuild_command(app, runner, client, fleet):
+    add_log(client, fleet['oil'], '2024-01-10', 50)
+    AssetMonthlyCost.query.delete()
+    db.session.commit()
+
+    result = runner.invoke(args=['rebuild-cost-rollups'])
+    assert result.exit_code == 0
+    assert 'Rebuilt 2 cost rollup row(s)' in result.output
+    assert client.get('/api/costs').json[0]['total_cost'] == 50.0
@@ -0,0 +1,99 @@
+import json
+import pytest
+from datetime import date, timedelta
+
+
+@pytest.fixture
+def sample_asset(client):
+    """Create a sample asset for testing"""
+    asset_data = {
+        'name': '2020 Toyota Camry',
+        'category': 'Vehicle',
+        'usage_metric': 'miles',
+        'current_usage': 25000
+    }
+
+    response = client.post('/api/assets',
+                          data=json.dumps(asset_data),
+                          content_type='application/json')
+    return response.json
+
+
+def create_item(client, asset_id, **overrides):
+    item_data = {
+        'asset_id': asset_id,
+        'name': 'Oil Change',
+        'maintenance_type': 'usage',
+        'frequency_value': 5000,
+        'frequency_unit': 'miles'
+    }
+    item_data.update(overrides)
+    response = client.post('/api/maintenance-items',
+                          data=json.dumps(item_data),
+                          content_type='application/json')
+    return response.json
+
+
+def create_log(client, item_id, date_performed, usage_reading=None):
+    log_data = {
+        'maintenance_item_id': item_id,
+        'date_performed': date_performed,
+        'usage_reading': usage_reading
+    }
+    response = client.post('/api/maintenance-logs',
+                          data=json.dumps(log_data),
+                          content_type='application/json')
+    return response.json
+
+
+def test_dashboard_empty(client):
+    """Test the dashboard with no assets"""
+    response = client.get('/api/dashboard')
+    assert response.status_code == 200
+    assert response.json == []
+
+
+def test_dashboard_asset_without_items(client, sample_asset):
+    """Test that an asset with no items reports full health"""
+    response = client.get('/api/dashboard')
+    assert response.status_code == 200
+    data = response.json
+    assert len(data) == 1
+    assert data[0]['id'] == sample_asset['id']
+    assert data[0]['items_tracked'] == 0
+    assert data[0]['health'] == {'score': 100, 'status': 'good', 'items_due': 0, 'items_overdue': 0}
+    assert data[0]['top_urgent_items'] == []
+
+
+def test_dashboard_uses_latest_log(client, sample_asset):
+    """Test that status is computed from the most recent log only"""
+    item = create_item(client, sample_asset['id'])
+    create_log(client, item['id'], '2024-06-15', 24000)
+    create_log(client, item['id'], '2024-01-15', 19000)
+
+    data = client.get('/api/dashboard').json
+    urgent = data[0]['top_urgent_items']
+    assert len(urgent) == 1
+    assert urgent[0]['status'] == 'good'
+    assert urgent[0]['percentage_remaining'] == 80
+
+
+def test_dashboard_health_and_urgency(client, sample_asset):
+    """Test health counts and ordering of urgent items"""
+    overdue = create_item(client, sample_asset['id'], name='Overdue')
+    due_soon = create_item(client, sample_asset['id'], name='Due Soon',
+                           maintenance_type='time', frequency_value=10, frequency_unit='days')
+    create_item(client, sample_asset['id'], name='Never Done')
+    good = create_item(client, sample_asset['id'], name='Good',
+                       maintenance_type='time', frequency_value=1, frequency_unit='years')
+
+    create_log(client, overdue['id'], date.today().isoformat(), 19000)
+    create_log(client, due_soon['id'], (date.today() - timedelta(days=8)).isoformat())
+    create_log(client, good['id'], date.today().isoformat())
+
+    data = client.get('/api/dashboard?limit=3').json[0]
+    assert data['items_tracked'] == 4
+    assert data['health']['status'] == 'overdue'
+    assert data['health']['items_overdue'] == 1
+    assert data['health']['items_due'] == 2
+    assert [i['name'] for i in data['top_urgent_items']] == ['Overdue', 'Due Soon', 'Good']
@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import text
+from app import create_app, db
+from tests.conftest import TestConfig
+
+
+def make_app(tmp_path, **overrides):
+    config = type('FileConfig', (TestConfig,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "upkeep.db"}',
+        **overrides,
+    })
+    return create_app(config)
+
+
+def pragma(name):
+    return db.session.execute(text(f'PRAGMA {name}')).scalar()
+
+
+def test_pragmas_applied_to_every_connection(tmp_path):
+    """Test that the SQLite profile is set on each pooled connection"""
+    app = make_app(tmp_path)
+    with app.app_context():
+        db.create_all()
+        assert pragma('journal_mode') == 'wal'
+        assert pragma('busy_timeout') == 5000
+        assert pragma('synchronous') == 1  # NORMAL
+        assert pragma('foreign_keys') == 1
+
+        # A second connection gets the same settings
+        with db.engine.connect() as other:
+            assert other.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+            assert other.execute(text('PRAGMA foreign_keys')).scalar() == 1
+        db.engine.dispose()
+
+
+def test_foreign_keys_enforced(app):
+    """Test that rows pointing at missing parents are rejected"""
+    from sqlalchemy.exc import IntegrityError
+    from app.models import MaintenanceItem
+    db.session.add(MaintenanceItem(asset_id=999, name='Orphan', frequency_value=1, frequency_unit='days'))
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
+
+
+def test_empty_profile_keeps_defaults(tmp_path):
+    """Test that SQLITE_PRAGMAS = {} leaves SQLite's own defaults"""
+    app = make_app(tmp_path, SQLITE_PRAGMAS={})
+    with app.app_context():
+        db.create_all()
+        assert pragma('journal_mode') == 'delete'
+        assert pragma('foreign_keys') == 0
+        db.engine.dispose()
+
+
+def test_outbox_has_only_the_delivery_index(tmp_path):
+    """Test that the redundant next_attempt_at index is neither created nor kept by migrations"""
+    from sqlalchemy import inspect
+    from app.schema import run_migrations
+    app = make_app(tmp_path)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(text('CREATE INDEX ix_outbox_messages_next_attempt_at ON outbox_messages (next_attempt_at)'))
+        db.session.commit()
+        run_migrations(app)
+        names = {index['name'] for index in inspect(db.engine).get_indexes('outbox_messages')}
+        assert names == {'ix_outbox_messages_status_next_attempt'}
+        db.engine.dispose()
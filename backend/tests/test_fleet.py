@@ -0,0 +1,47 @@
+from app import db
+from app.models import Asset, MaintenanceItem, MaintenanceLog, Attachment
+from app.services.fleet import FleetGenerator
+
+
+def snapshot():
+    return [(log.maintenance_item_id, log.date_performed, log.usage_reading, log.cost)
+            for log in MaintenanceLog.query.order_by(MaintenanceLog.id)]
+
+
+def test_generates_requested_counts(app):
+    with app.app_context():
+        counts = FleetGenerator(chunk_size=50).generate(assets=4, items=10, logs=120)
+
+        assert counts['assets'] == Asset.query.count() == 4
+        assert counts['maintenance_items'] == MaintenanceItem.query.count() == 10
+        assert counts['maintenance_logs'] == MaintenanceLog.query.count() == 120
+        assert counts['attachments'] == Attachment.query.count()
+        # Next-due values are refreshed like any other write
+        assert MaintenanceItem.query.filter(
+            MaintenanceItem.next_due_date.is_(None), MaintenanceItem.next_due_usage.is_(None)
+        ).count() == 0
+
+
+def test_same_seed_gives_same_fleet(app):
+    with app.app_context():
+        FleetGenerator(seed=7).generate(assets=2, items=4, logs=30)
+        first = snapshot()
+        db.drop_all()
+        db.create_all()
+        FleetGenerator(seed=7).generate(assets=2, items=4, logs=30)
+        assert snapshot() == first
+
+
+def test_appends_to_existing_data(app):
+    with app.app_context():
+        FleetGenerator().generate(assets=1, items=2, logs=5)
+        FleetGenerator().generate(assets=1, items=2, logs=5)
+        assert Asset.query.count() == 2
+        assert MaintenanceLog.query.count() == 10
+
+
+def test_generate_fleet_command(app, runner):
+    result = runner.invoke(args=['generate-fleet', '--assets', '2', '--items', '6', '--logs', '40'])
+
+    assert result.exit_code == 0
+    assert '2 assets, 6 maintenance_items, 40 maintenance_logs' in result.output
@@ -146,3 +146,36 @@ def test_create_time_based_maintenance(client, sample_asset):
     data = response.json
     assert data['maintenance_type'] == 'time'
     assert data['frequency_unit'] == 'years'
+
+
+def test_get_maintenance_items_due(client, sample_asset):
+    """Test range queries over the next-due index"""
+    def create(name, **fields):
+        item_data = {'asset_id': sample_asset['id'], 'name': name}
+        item_data.update(fields)
+        return client.post('/api/maintenance-items',
+                           data=json.dumps(item_data),
+                           content_type='application/json').json
+
+    oil = create('Oil Change', maintenance_type='usage', frequency_value=5000, frequency_unit='miles')
+    wipers = create('Wipers', maintenance_type='time', frequency_value=1, frequency_unit='years')
+    create('Never Done', maintenance_type='time', frequency_value=1, frequency_unit='years')
+
+    for item_id, usage in ((oil['id'], 21000), (wipers['id'], None)):
+        client.post('/api/maintenance-logs',
+                    data=json.dumps({'maintenance_item_id': item_id,
+                                     'date_performed': '2024-01-01',
+                                     'usage_reading': usage}),
+                    content_type='application/json')
+
+    wipers_data = client.get(f'/api/maintenance-items/{wipers["id"]}').json
+    assert wipers_data['next_due_date'] == '2024-12-31'
+
+    response = client.get('/api/maintenance-items?due_before=2025-01-01')
+    assert sorted(i['name'] for i in response.json) == ['Never Done', 'Wipers']
+
+    response = client.get('/api/maintenance-items?due_within=500')
+    assert [i['name'] for i in response.json] == ['Never Done']
+
+    response = client.get('/api/maintenance-items?due_within=1000')
+    assert sorted(i['name'] for i in response.json) == ['Never Done', 'Oil Change']
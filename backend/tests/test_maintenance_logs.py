@@ -1,4 +1,6 @@
 import json
+import io
+import os
 import pytest
 from datetime import date
 
@@ -120,3 +122,176 @@ def test_delete_maintenance_log(client, sample_maintenance_item):
 
     get_response = client.get(f'/api/maintenance-logs/{log_id}')
     assert get_response.status_code == 404
+
+
+def test_next_due_maintained_on_log_writes(client, sample_maintenance_item):
+    """Test that next_due_usage tracks the latest log across create, update and delete"""
+    item_url = f'/api/maintenance-items/{sample_maintenance_item["id"]}'
+    assert client.get(item_url).json['next_due_usage'] is None
+
+    old = client.post('/api/maintenance-logs',
+                      data=json.dumps({'maintenance_item_id': sample_maintenance_item['id'],
+                                       'date_performed': '2024-01-15', 'usage_reading': 20000}),
+                      content_type='application/json').json
+    assert client.get(item_url).json['next_due_usage'] == 25000
+
+    new = client.post('/api/maintenance-logs',
+                      data=json.dumps({'maintenance_item_id': sample_maintenance_item['id'],
+                                       'date_performed': '2024-06-15', 'usage_reading': 24000}),
+                      content_type='application/json').json
+    assert client.get(item_url).json['next_due_usage'] == 29000
+
+    client.put(f'/api/maintenance-logs/{new["id"]}',
+               data=json.dumps({'usage_reading': 24500}),
+               content_type='application/json')
+    assert client.get(item_url).json['next_due_usage'] == 29500
+
+    client.delete(f'/api/maintenance-logs/{new["id"]}')
+    assert client.get(item_url).json['next_due_usage'] == 25000
+
+    client.delete(f'/api/maintenance-logs/{old["id"]}')
+    assert client.get(item_url).json['next_due_usage'] is None
+
+
+def test_get_maintenance_logs_paginated(client, sample_maintenance_item):
+    """Test keyset pagination over maintenance logs"""
+    dates = ['2024-01-15', '2024-03-15', '2024-03-15', '2024-06-15', '2024-09-15']
+    for i, performed in enumerate(dates):
+        client.post('/api/maintenance-logs',
+                   data=json.dumps({'maintenance_item_id': sample_maintenance_item['id'],
+                                    'date_performed': performed,
+                                    'usage_reading': 20000 + i}),
+                   content_type='application/json')
+
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        url = '/api/maintenance-logs?limit=2'
+        if cursor:
+            url += f'&cursor={cursor}'
+        response = client.get(url)
+        assert response.status_code == 200
+        seen.extend(log['date_performed'] for log in response.json['items'])
+        cursor = response.json['next_cursor']
+        pages += 1
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert seen == sorted(dates, reverse=True)
+
+    response = client.get('/api/maintenance-logs?cursor=not-a-cursor')
+    assert response.status_code == 400
+
+
+def test_get_maintenance_logs_query_count(client, sample_maintenance_item, count_queries):
+    """Test that listing logs loads attachments in one extra query, not one per log
+
+    The third query is the collection version lookup for the ETag.
+    """
+    for day in range(1, 11):
+        client.post('/api/maintenance-logs',
+                   data=json.dumps({'maintenance_item_id': sample_maintenance_item['id'],
+                                    'date_performed': f'2024-01-{day:02d}'}),
+                   content_type='application/json')
+
+    with count_queries() as queries:
+        response = client.get('/api/maintenance-logs')
+    assert len(response.json) == 10
+    assert len(queries) == 3
+
+    with count_queries() as queries:
+        response = client.get('/api/maintenance-logs?limit=5')
+    assert len(response.json['items']) == 5
+    assert len(queries) == 3
+
+
+def test_identical_attachments_share_one_file(client, sample_maintenance_item):
+    """Test that identical uploads are stored once and removed with their last reference"""
+    def upload():
+        return client.post('/api/maintenance-logs',
+                           data={'maintenance_item_id': str(sample_maintenance_item['id']),
+                                 'date_performed': '2024-01-01',
+                                 'attachments': (io.BytesIO(b'same receipt'), 'receipt.pdf')},
+                           content_type='multipart/form-data').json
+
+    first, second = upload(), upload()
+    first_att, second_att = first['attachments'][0], second['attachments'][0]
+    assert first_att['file_path'] == second_att['file_path']
+    assert first_att['content_hash'] == second_att['content_hash']
+    assert first_att['file_path'].endswith(first_att['content_hash'] + '.pdf')
+
+    path = first_att['file_path']
+    assert client.delete(f'/api/maintenance-logs/{first["id"]}').status_code == 204
+    assert os.path.exists(path)
+
+    assert client.delete(f'/api/maintenance-logs/attachments/{second_att["id"]}').status_code == 204
+    assert not os.path.exists(path)
+
+
+def test_deleting_item_or_asset_releases_files(client, sample_asset, sample_maintenance_item):
+    """Test that files of records removed by cascade are released with them"""
+    def upload(content, name):
+        return client.post('/api/maintenance-logs',
+                           data={'maintenance_item_id': str(sample_maintenance_item['id']),
+                                 'date_performed': '2024-01-01',
+                                 'attachments': (io.BytesIO(content), name)},
+                           content_type='multipart/form-data').json['attachments'][0]['file_path']
+
+    item_file = upload(b'item receipt', 'item.pdf')
+    general = client.post('/api/general-maintenance',
+                          data={'asset_id': str(sample_asset['id']), 'description': 'Wash',
+                                'date_performed': '2024-01-01',
+                                'attachments': (io.BytesIO(b'wash receipt'), 'wash.pdf')},
+                          content_type='multipart/form-data').json
+    general_file = general['attachments'][0]['file_path']
+
+    assert client.delete(f'/api/maintenance-items/{sample_maintenance_item["id"]}').status_code == 204
+    assert not os.path.exists(item_file)
+    assert os.path.exists(general_file)
+
+    assert client.delete(f'/api/assets/{sample_asset["id"]}').status_code == 204
+    assert not os.path.exists(general_file)
+
+
+def test_blob_reuse_and_release_are_serialised(tmp_path):
+    """Test that a blob being reused cannot be released until the reusing row commits"""
+    import sqlite3
+    from werkzeug.datastructures import FileStorage
+    from app import create_app, db
+    from app.services.storage import release_upload, save_upload
+    from tests.conftest import TestConfig
+
+    path = tmp_path / 'upkeep.db'
+    config = type('FileConfig', (TestConfig,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'UPLOAD_FOLDER': str(tmp_path),
+        'SQLITE_PRAGMAS': {**TestConfig.SQLITE_PRAGMAS, 'busy_timeout': 0},
+    })
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        stored = save_upload(FileStorage(io.BytesIO(b'shared'), 'shared.pdf'))
+        db.session.commit()
+
+        # Reusing the blob takes the write lock and keeps it until the commit
+        assert save_upload(FileStorage(io.BytesIO(b'shared'), 'shared.pdf')).path == stored.path
+        other = sqlite3.connect(path, timeout=0)
+        with pytest.raises(sqlite3.OperationalError, match='locked'):
+            other.execute('BEGIN IMMEDIATE')
+        db.session.commit()
+
+        # Likewise a release waits for a writer that may be reusing the blob
+        other.execute('BEGIN IMMEDIATE')
+        with pytest.raises(Exception, match='locked'):
+            release_upload(stored.path)
+        db.session.rollback()
+        assert os.path.exists(stored.path)
+        other.rollback()
+
+        assert release_upload(stored.path)
+        assert not os.path.exists(stored.path)
+        other.close()
+        db.session.remove()
+        db.engine.dispose()
@@ -0,0 +1,103 @@
+import os
+import re
+from app import create_app, db
+from app.metrics import Metrics, RequestStats
+from app.services.reminders import check_and_send_reminders
+from tests.conftest import TestConfig
+
+
+def sample(text, name, **labels):
+    """Value of one series in exposition text, or None when it is absent"""
+    wanted = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    pattern = '^' + re.escape(name) + (r'\{' + re.escape(wanted) + r'\}' if labels else '') + r' (\S+)$'
+    match = re.search(pattern, text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+def scrape(client):
+    response = client.get('/metrics', buffered=True)
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    return response.get_data(as_text=True)
+
+
+def test_counts_requests_by_endpoint_and_status(client):
+    client.post('/api/assets', json={'name': 'Truck'}, buffered=True)
+    client.get('/api/assets', buffered=True)
+    client.get('/api/assets', buffered=True)
+    client.get('/api/assets/999', buffered=True)
+
+    text = scrape(client)
+    assert sample(text, 'upkeep_http_requests_total', method='GET', endpoint='assets.get_assets', status='200') == 2
+    assert sample(text, 'upkeep_http_requests_total', method='POST', endpoint='assets.create_asset', status='201') == 1
+    assert sample(text, 'upkeep_http_requests_total', method='GET', endpoint='assets.get_asset', status='404') == 1
+    assert sample(text, 'upkeep_http_request_duration_seconds_count', method='GET', endpoint='assets.get_assets') == 2
+    assert sample(text, 'upkeep_http_request_duration_seconds_bucket',
+                  method='GET', endpoint='assets.get_assets', le='+Inf') == 2
+
+
+def test_unknown_paths_share_one_label(client):
+    client.get('/no/such/path', buffered=True)
+    client.get('/another/missing/path', buffered=True)
+
+    text = scrape(client)
+    assert sample(text, 'upkeep_http_requests_total', method='GET', endpoint='unmatched', status='404') == 2
+
+
+def test_records_queries_and_db_time_per_request(client, count_queries):
+    client.post('/api/assets', json={'name': 'Truck'}, buffered=True)
+    with count_queries() as queries:
+        client.get('/api/assets', buffered=True)
+
+    text = scrape(client)
+    labels = {'method': 'GET', 'endpoint': 'assets.get_assets'}
+    assert sample(text, 'upkeep_http_request_db_queries_sum', **labels) == len(queries)
+    assert sample(text, 'upkeep_http_request_db_seconds_count', **labels) == 1
+    assert sample(text, 'upkeep_db_queries_total') >= len(queries)
+
+
+def test_measures_streamed_response_size(client):
+    client.post('/api/assets', json={'name': 'Truck'}, buffered=True)
+    response = client.get('/api/backup/export', buffered=True)
+
+    text = scrape(client)
+    labels = {'method': 'GET', 'endpoint': 'backup.export_data'}
+    assert sample(text, 'upkeep_http_response_size_bytes_sum', **labels) == len(response.data)
+
+
+def test_reminder_job_outcomes(app, client, smtp_settings):
+    client.post('/api/assets', json={'name': 'Truck'})
+    client.post('/api/maintenance-items', json={
+        'asset_id': 1, 'name': 'Oil Change', 'maintenance_type': 'time',
+        'frequency_value': 3, 'frequency_unit': 'months', 'reminders_enabled': True,
+    })
+
+    check_and_send_reminders(app)  # never performed, so overdue
+    check_and_send_reminders(app)  # reminded within the interval
+
+    text = scrape(client)
+    assert sample(text, 'upkeep_job_runs_total', job='reminders', outcome='queued') == 1
+    assert sample(text, 'upkeep_job_runs_total', job='reminders', outcome='nothing_due') == 1
+    assert sample(text, 'upkeep_job_duration_seconds_count', job='reminders') == 2
+    assert sample(text, 'upkeep_reminder_items_total') == 1
+
+
+def test_processes_share_values_through_directory(tmp_path):
+    metrics = Metrics(str(tmp_path))
+    metrics.record_request(RequestStats('GET'), 200, 10)
+    metrics.flush()
+    # Stand in for another worker's file, then keep counting in this one
+    (tmp_path / f'{os.getpid()}.json').rename(tmp_path / 'worker.json')
+    metrics.record_request(RequestStats('GET'), 200, 20)
+
+    text = metrics.render()
+    assert sample(text, 'upkeep_http_requests_total', method='GET', endpoint='unmatched', status='200') == 3
+    assert sample(text, 'upkeep_http_response_size_bytes_sum', method='GET', endpoint='unmatched') == 40
+
+
+def test_can_be_disabled():
+    app = create_app(type('NoMetrics', (TestConfig,), {'METRICS_ENABLED': False}))
+    with app.app_context():
+        db.create_all()
+        assert app.test_client().get('/metrics').status_code == 404
+        db.drop_all()
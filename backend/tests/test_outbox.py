@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+from app import db
+from app.models import OutboxMessage
+from app.services.email import queue_email
+from app.services.outbox import deliver_pending
+
+
+def test_test_email_is_queued(client, smtp_settings):
+    """Test that the test-email endpoint enqueues instead of sending inline"""
+    response = client.post('/api/settings/test-email')
+    assert response.status_code == 202
+    assert response.json['outbox']['status'] == 'pending'
+    assert smtp_settings.connections == 0
+
+    assert deliver_pending() == 1
+    assert smtp_settings.messages[0]['to'] == ['owner@example.com']
+
+    outbox = client.get('/api/settings/outbox').json
+    assert outbox[0]['status'] == 'sent'
+    assert outbox[0]['sent_at'] is not None
+
+
+def test_test_email_requires_smtp_config(client):
+    """Test that an unconfigured server is rejected up front"""
+    response = client.post('/api/settings/test-email')
+    assert response.status_code == 400
+    assert OutboxMessage.query.count() == 0
+
+
+def test_batch_reuses_one_connection(app, smtp_settings):
+    """Test that a batch of messages is delivered over one authenticated connection"""
+    for n in range(5):
+        queue_email('owner@example.com', f'Message {n}', '<p>Hi</p>')
+
+    assert deliver_pending() == 5
+    assert smtp_settings.connections == 1
+    assert smtp_settings.logins == 1
+    assert len(smtp_settings.messages) == 5
+
+
+def test_failed_message_retries_with_backoff(app, smtp_settings):
+    """Test that a rejected message is retried later and eventually marked failed"""
+    smtp_settings.reject.add('bad@example.com')
+    good = queue_email('owner@example.com', 'Good', '<p>Hi</p>')
+    bad = queue_email('bad@example.com', 'Bad', '<p>Hi</p>')
+
+    assert deliver_pending() == 1
+    assert good.status == 'sent'
+    assert bad.status == 'pending'
+    assert bad.attempts == 1
+    assert bad.next_attempt_at > datetime.utcnow() + timedelta(seconds=30)
+
+    # Not due yet
+    assert deliver_pending() == 0
+    assert bad.attempts == 1
+
+    for _ in range(app.config['OUTBOX_MAX_ATTEMPTS'] - 1):
+        bad.next_attempt_at = datetime.utcnow()
+        db.session.commit()
+        deliver_pending()
+
+    assert bad.status == 'failed'
+    assert bad.attempts == app.config['OUTBOX_MAX_ATTEMPTS']
+    assert 'Mailbox unavailable' in bad.last_error
+
+
+def test_unreachable_server_defers_batch(app, smtp_settings):
+    """Test that a connection failure defers every message without losing them"""
+    message = queue_email('owner@example.com', 'Hello', '<p>Hi</p>')
+    smtp_settings.stop()
+
+    assert deliver_pending() == 0
+    assert message.status == 'pending'
+    assert message.attempts == 1
+    assert message.last_error
@@ -0,0 +1,185 @@
+"""EXPLAIN QUERY PLAN checks for the hot queries.
+
+Each case runs a request (or service call) against a small fleet with
+fresh planner statistics, captures every SELECT it issued and fails if
+SQLite would read a whole table or sort results in a temporary b-tree.
+"""
+import re
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import event, insert, text
+from app import db
+from app.models import Asset, MaintenanceItem, MaintenanceLog, GeneralMaintenance, Attachment
+
+
+@pytest.fixture
+def fleet(app):
+    """10 assets x 10 items x 5 logs plus general maintenance, each record with an attachment"""
+    start = date(2023, 1, 1)
+    assets, items, logs, general, attachments = [], [], [], [], []
+    for a in range(1, 11):
+        assets.append({'id': a, 'name': f'Asset {a}', 'usage_metric': 'miles', 'current_usage': 5000})
+        for g in range(5):
+            general_id = (a - 1) * 5 + g + 1
+            general.append({'id': general_id, 'asset_id': a, 'description': 'Wash',
+                            'date_performed': start + timedelta(days=g * 30)})
+            digest = f'{general_id:064x}'
+            attachments.append({'filename': 'wash.jpg', 'file_path': f'/tmp/uploads/{digest}.jpg',
+                                'content_hash': digest, 'general_maintenance_id': general_id})
+        for i in range(10):
+            item_id = (a - 1) * 10 + i + 1
+            usage = i % 2 == 0
+            items.append({'id': item_id, 'asset_id': a, 'name': f'Item {i}',
+                          'maintenance_type': 'usage' if usage else 'time',
+                          'frequency_value': 1000 if usage else 6,
+                          'frequency_unit': 'miles' if usage else 'months',
+                          'next_due_usage': 4000 + i * 100 if usage else None,
+                          'next_due_date': None if usage else start + timedelta(days=i * 40)})
+            for n in range(5):
+                log_id = (item_id - 1) * 5 + n + 1
+                logs.append({'id': log_id, 'maintenance_item_id': item_id,
+                             'date_performed': start + timedelta(days=n * 60), 'usage_reading': n * 1000})
+                digest = f'{log_id + 1000:064x}'
+                attachments.append({'filename': 'r.txt', 'file_path': f'/tmp/uploads/{digest}.txt',
+                                    'content_hash': digest, 'maintenance_log_id': log_id})
+
+    for model, rows in ((Asset, assets), (MaintenanceItem, items), (MaintenanceLog, logs),
+                        (GeneralMaintenance, general), (Attachment, attachments)):
+        db.session.execute(insert(model), rows)
+    db.session.commit()
+    db.session.execute(text('ANALYZE'))
+    return {'asset': 3, 'item': 25, 'log': 121, 'attachment': 25}
+
+
+@pytest.fixture
+def explain(app):
+    """Run a callable and return ``[(sql, [plan details])]`` for every SELECT it issued"""
+    def run(action):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if not executemany and statement.lstrip().upper().startswith('SELECT'):
+                statements.append((statement, parameters))
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            action()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        connection = db.session.connection()
+        return [(statement, [row[3] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement,
+                                                                          parameters)])
+                for statement, parameters in statements]
+    return run
+
+
+# Tables that only ever hold a handful of rows, where a scan is the best plan
+SMALL_TABLES = {'collection_versions', 'settings'}
+
+
+def assert_indexed(plans, allow_scan=(), allow_sort=False):
+    tables = set(db.metadata.tables) - SMALL_TABLES
+    for statement, details in plans:
+        for detail in details:
+            scan = re.fullmatch(r'SCAN (\w+)', detail)
+            assert not (scan and scan.group(1) in tables and scan.group(1) not in allow_scan), \
+                f'Full table scan ({detail}) in:\n{statement}'
+            assert allow_sort or 'USE TEMP B-TREE FOR ORDER BY' not in detail, f'Unindexed sort in:\n{statement}'
+
+
+@pytest.mark.parametrize('url, allow_scan', [
+    ('/api/assets/{asset}', ()),
+    ('/api/maintenance-items/{item}', ()),
+    ('/api/maintenance-items?asset_id={asset}', ()),
+    ('/api/maintenance-items?due_before=2023-03-01', ()),
+    # Assets drive the join; each one seeks its items by (asset_id, next_due_usage)
+    ('/api/maintenance-items?due_within=500', ('assets',)),
+    # Whole-table listings load attachments for every row; scanning beats a huge IN list
+    ('/api/maintenance-logs', ('attachments',)),
+    ('/api/maintenance-logs?limit=20', ()),
+    ('/api/maintenance-logs?maintenance_item_id={item}', ()),
+    ('/api/maintenance-logs?maintenance_item_id={item}&limit=2', ()),
+    ('/api/maintenance-logs/{log}', ()),
+    ('/api/general-maintenance', ('attachments',)),
+    ('/api/general-maintenance?asset_id={asset}&limit=2', ()),
+])
+def test_read_endpoints_use_indexes(client, fleet, explain, url, allow_scan):
+    """Test that filtered and ordered reads seek and walk indexes"""
+    url = url.format(**fleet)
+    plans = explain(lambda: client.get(url))
+    assert plans
+    assert_indexed(plans, allow_scan)
+
+
+def test_keyset_next_page_uses_index(client, fleet, explain):
+    """Test that following a cursor seeks into the (item, date, id) index"""
+    first = client.get(f'/api/maintenance-logs?maintenance_item_id={fleet["item"]}&limit=2').json
+    url = f'/api/maintenance-logs?maintenance_item_id={fleet["item"]}&limit=2&cursor={first["next_cursor"]}'
+    assert_indexed(explain(lambda: client.get(url)))
+
+
+def test_log_writes_refresh_one_item_by_index(client, fleet, explain):
+    """Test that next-due recomputation after a log write only ranks that item's logs"""
+    plans = explain(lambda: client.put(f'/api/maintenance-logs/{fleet["log"]}', json={'notes': 'Checked'}))
+    assert any('row_number()' in statement for statement, _ in plans)
+    assert_indexed(plans)
+
+
+def test_attachment_release_uses_indexes(client, fleet, explain):
+    """Test that upload reference counting seeks by digest and receipt name"""
+    plans = explain(lambda: client.delete(f'/api/maintenance-logs/attachments/{fleet["attachment"]}'))
+    assert_indexed(plans)
+
+
+def test_status_evaluation(app, fleet, explain):
+    """Test that single-item status seeks, and reminder scans never scan logs"""
+    from app.services.status import evaluate_items
+    assert_indexed(explain(lambda: evaluate_items(MaintenanceItem.query.filter_by(id=fleet['item']))))
+    assert_indexed(explain(lambda: evaluate_items(MaintenanceItem.query.filter_by(reminders_enabled=True))),
+                   allow_scan=('maintenance_items',))
+
+
+def test_reminder_candidates_seek_next_due_indexes(app, fleet, explain):
+    """Test that the reminder check finds candidates through the next-due indexes"""
+    from app.services.reminders import reminder_candidates
+    db.session.query(MaintenanceItem).update({'reminders_enabled': True})
+    db.session.commit()
+    db.session.execute(text('ANALYZE'))
+
+    plans = explain(lambda: reminder_candidates(0.3, today=date(2023, 3, 1)).all())
+    candidates = [details for statement, details in plans if 'UNION' in statement]
+    assert candidates
+    details = ' '.join(candidates[0])
+    assert 'ix_maintenance_items_next_due_date (next_due_date<?)' in details
+    assert 'ix_maintenance_items_asset_next_usage (asset_id=? AND next_due_usage<?)' in details
+
+
+def test_outbox_due_messages(app, explain):
+    """Test that the delivery poll seeks pending messages by status and due time"""
+    from app.services.outbox import deliver_pending
+    assert_indexed(explain(deliver_pending))
+
+
+def test_cost_rollup_refresh_uses_indexes(client, fleet, explain):
+    """Test that a log write re-totals only its asset's month and item's year by index"""
+    plans = explain(lambda: client.put(f'/api/maintenance-logs/{fleet["log"]}',
+                                       json={'cost': 25, 'date_performed': '2023-06-01'}))
+    assert any('sum(' in statement for statement, _ in plans)
+    assert_indexed(plans)
+
+
+@pytest.mark.parametrize('url, allow_sort', [
+    ('/api/costs?group_by=month&year=2023', False),
+    # Largest totals first: only the grouped rows are sorted
+    ('/api/costs?group_by=item&year=2023', True),
+    ('/api/costs?group_by=asset&asset_id={asset}', True),
+    ('/api/costs/year-over-year?year=2023', False),
+])
+def test_cost_reports_use_indexes(client, fleet, explain, url, allow_sort):
+    """Test that filtered cost reports seek the rollup tables"""
+    from app.services.costs import rebuild_cost_rollups
+    rebuild_cost_rollups()
+    db.session.commit()
+    db.session.execute(text('ANALYZE'))
+    assert_indexed(explain(lambda: client.get(url.format(**fleet))), allow_sort=allow_sort)
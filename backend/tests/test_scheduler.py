@@ -0,0 +1,64 @@
+import subprocess
+import sys
+import textwrap
+import time
+from apscheduler.schedulers.background import BackgroundScheduler
+from app.scheduler import LeaderLock, run_election
+
+
+LEADER_JOBS = {'reminder_check_startup', 'reminder_check_daily', 'outbox_delivery'}
+
+
+def job_ids(scheduler):
+    return {job.id for job in scheduler.get_jobs()}
+
+
+def test_only_one_process_is_leader(app, tmp_path):
+    """Test that only the lock holder gets the reminder and delivery jobs"""
+    path = str(tmp_path / 'scheduler.lock')
+    leader, follower = BackgroundScheduler(), BackgroundScheduler()
+    leader_lock, follower_lock = LeaderLock(path), LeaderLock(path)
+
+    assert run_election(app, leader, leader_lock)
+    assert not run_election(app, follower, follower_lock)
+    assert job_ids(leader) == LEADER_JOBS
+    assert job_ids(follower) == set()
+
+    # Re-elections while leading keep the same jobs
+    assert run_election(app, leader, leader_lock)
+    assert len(leader.get_jobs()) == 3
+
+    leader_lock.release()
+    assert run_election(app, follower, follower_lock)
+    assert job_ids(follower) == LEADER_JOBS
+    follower_lock.release()
+
+
+def test_leadership_fails_over_when_leader_dies(app, tmp_path):
+    """Test that the lock is freed when the leading process is killed"""
+    path = str(tmp_path / 'scheduler.lock')
+    holder = subprocess.Popen([sys.executable, '-c', textwrap.dedent(f'''
+        import sys, time
+        from app.scheduler import LeaderLock
+        lock = LeaderLock({path!r})
+        assert lock.acquire()
+        print('locked', flush=True)
+        time.sleep(60)
+    ''')], stdout=subprocess.PIPE, text=True)
+    try:
+        assert holder.stdout.readline().strip() == 'locked'
+        scheduler, lock = BackgroundScheduler(), LeaderLock(path)
+        assert not run_election(app, scheduler, lock)
+
+        holder.kill()
+        holder.wait()
+        deadline = time.time() + 5
+        while not run_election(app, scheduler, lock) and time.time() < deadline:
+            time.sleep(0.05)
+        assert lock.held
+        assert job_ids(scheduler) == LEADER_JOBS
+        lock.release()
+    finally:
+        if holder.poll() is None:
+            holder.kill()
+        holder.stdout.close()
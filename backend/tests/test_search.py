@@ -0,0 +1,123 @@
+from datetime import date
+import pytest
+from sqlalchemy import insert, text
+from app import db
+from app.models import Attachment, MaintenanceLog
+from app.services.search import build_match, rebuild_search_index
+
+
+@pytest.fixture
+def records(client):
+    truck = client.post('/api/assets', json={'name': 'Blue Truck', 'description': 'Ford pickup'}).json
+    house = client.post('/api/assets', json={'name': 'House', 'description': 'Alternator museum'}).json
+    oil = client.post('/api/maintenance-items', json={
+        'asset_id': truck['id'], 'name': 'Oil Change', 'maintenance_type': 'time',
+        'frequency_value': 6, 'frequency_unit': 'months', 'notes': 'Synthetic 5W-30'}).json
+    log = client.post('/api/maintenance-logs', json={
+        'maintenance_item_id': oil['id'], 'date_performed': '2024-03-01',
+        'notes': 'Replaced the alternator belt while there'}).json
+    general = client.post('/api/general-maintenance', json={
+        'asset_id': house['id'], 'description': 'Roof repair', 'date_performed': '2024-04-01',
+        'notes': 'Patched flashing around the chimney'}).json
+    return {'truck': truck, 'house': house, 'oil': oil, 'log': log, 'general': general}
+
+
+def found(client, query, **params):
+    response = client.get('/api/search', query_string={'q': query, **params})
+    assert response.status_code == 200
+    return [(item['kind'], item['id']) for item in response.json['items']]
+
+
+def index_entries():
+    return sorted(db.session.execute(text('SELECT rowid, title, body, asset_id FROM search_index')).all())
+
+
+def test_build_match_quotes_words_and_prefixes_the_last():
+    assert build_match('oil chan') == '"oil" "chan"*'
+    assert build_match('belt" OR NEAR(x') == '"belt" "OR" "NEAR" "x"*'
+    assert build_match(' -*" ') is None
+
+
+def test_search_covers_every_kind(client, records):
+    assert found(client, 'pickup') == [('asset', records['truck']['id'])]
+    assert found(client, 'synthetic') == [('maintenance_item', records['oil']['id'])]
+    assert found(client, 'chimney') == [('general_maintenance', records['general']['id'])]
+
+    result = client.get('/api/search?q=belt').json['items'][0]
+    assert result['kind'] == 'maintenance_log'
+    assert result['id'] == records['log']['id']
+    assert result['title'] == 'Oil Change'
+    assert result['maintenance_item_id'] == records['oil']['id']
+    assert result['asset_name'] == 'Blue Truck'
+    assert result['snippet'] == 'Replaced the alternator <mark>belt</mark> while there'
+
+
+def test_prefix_ranking_and_filters(client, records):
+    # Names and descriptions rank above notes
+    assert found(client, 'altern') == [('asset', records['house']['id']), ('maintenance_log', records['log']['id'])]
+    assert found(client, 'altern', asset_id=records['truck']['id']) == [('maintenance_log', records['log']['id'])]
+    assert found(client, 'altern', kind='maintenance_log,attachment') == [('maintenance_log', records['log']['id'])]
+    assert found(client, 'alternator truck') == []
+
+    assert client.get('/api/search?q=').status_code == 400
+    assert client.get('/api/search?q=x&kind=receipt').status_code == 400
+    assert client.get('/api/search?q=x&cursor=bogus').status_code == 400
+
+
+def test_index_follows_updates_and_deletes(client, records):
+    client.put(f"/api/maintenance-logs/{records['log']['id']}", json={'notes': 'Rotated tyres'})
+    assert found(client, 'belt') == []
+    assert found(client, 'tyres') == [('maintenance_log', records['log']['id'])]
+
+    client.delete(f"/api/assets/{records['truck']['id']}")
+    assert found(client, 'tyres') == []
+    assert found(client, 'pickup') == []
+    assert found(client, 'chimney') == [('general_maintenance', records['general']['id'])]
+
+
+def test_snippets_escape_record_text(client):
+    client.post('/api/assets', json={'name': 'Shed', 'description': '<script>alert(1)</script> rake'})
+    snippet = client.get('/api/search?q=rake').json['items'][0]['snippet']
+    assert snippet == '&lt;script&gt;alert(1)&lt;/script&gt; <mark>rake</mark>'
+
+
+def test_pagination(client):
+    for n in range(5):
+        client.post('/api/assets', json={'name': f'Mower {n}'})
+
+    pages, cursor = [], None
+    while True:
+        params = {'q': 'mower', 'limit': 2, **({'cursor': cursor} if cursor else {})}
+        body = client.get('/api/search', query_string=params).json
+        pages.append(len(body['items']))
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+    assert pages == [2, 2, 1]
+
+
+def test_bulk_inserts_are_indexed_and_rebuild_matches(client, records):
+    # The backup importer's executemany inserts bypass the session
+    db.session.execute(insert(MaintenanceLog), [{
+        'maintenance_item_id': records['oil']['id'], 'date_performed': date(2024, 5, 1),
+        'notes': 'Bulk loaded gasket',
+    }])
+    log_id = records['log']['id'] + 1
+    db.session.execute(insert(Attachment), [{
+        'filename': 'gasket-receipt.pdf', 'file_path': 'x.pdf', 'maintenance_log_id': log_id,
+    }])
+    db.session.commit()
+    assert sorted(found(client, 'gasket')) == [('attachment', 1), ('maintenance_log', log_id)]
+    assert {item['asset_id'] for item in client.get('/api/search?q=gasket').json['items']} == {records['truck']['id']}
+
+    incremental = index_entries()
+    rebuild_search_index()
+    db.session.commit()
+    assert index_entries() == incremental
+
+
+def test_conditional_get(client, records):
+    first = client.get('/api/search?q=belt')
+    assert client.get('/api/search?q=belt', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+    client.post('/api/assets', json={'name': 'Belt Sander'})
+    assert client.get('/api/search?q=belt', headers={'If-None-Match': first.headers['ETag']}).status_code == 200
@@ -0,0 +1,111 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+import pytest
+from flask.json.provider import DefaultJSONProvider
+from app.serialization import Serializer, iso
+
+
+@pytest.fixture
+def records(client):
+    truck = client.post('/api/assets', json={'name': 'Truck', 'category': 'Vehicle'}).json
+    oil = client.post('/api/maintenance-items', json={
+        'asset_id': truck['id'], 'name': 'Oil Change', 'maintenance_type': 'time',
+        'frequency_value': 6, 'frequency_unit': 'months'}).json
+    logs = [client.post('/api/maintenance-logs', json={
+        'maintenance_item_id': oil['id'], 'date_performed': f'2024-0{n}-01', 'cost': 10 * n}).json
+        for n in range(1, 4)]
+    general = client.post('/api/general-maintenance', json={
+        'asset_id': truck['id'], 'description': 'Wash', 'date_performed': '2024-02-01', 'cost': 12.5}).json
+    return {'truck': truck, 'oil': oil, 'logs': logs, 'general': general}
+
+
+def test_serializer_projects_and_converts():
+    class Row:
+        id = 7
+        name = 'Truck'
+        created_at = datetime(2024, 1, 2, 3, 4, 5)
+
+    serializer = Serializer({'id': 'id', 'name': 'name', 'created_at': ('created_at', iso),
+                             'label': lambda row: f'#{row.id}'})
+    assert serializer.dump(Row()) == {'id': 7, 'name': 'Truck', 'created_at': '2024-01-02T03:04:05', 'label': '#7'}
+    assert serializer.dump_many([Row()], frozenset({'id', 'label'})) == [{'id': 7, 'label': '#7'}]
+    assert serializer.columns(frozenset({'id', 'label', 'created_at'})) == {'id', 'created_at'}
+
+
+def test_full_responses_are_unchanged(client, records):
+    asset = client.get(f"/api/assets/{records['truck']['id']}").json
+    assert set(asset) == {'id', 'name', 'description', 'category', 'location', 'usage_metric',
+                          'current_usage', 'created_at', 'updated_at'}
+    log = client.get(f"/api/maintenance-logs/{records['logs'][0]['id']}").json
+    assert log['cost'] == 10.0
+    assert log['date_performed'] == '2024-01-01'
+    assert log['attachments'] == []
+    assert client.get('/api/general-maintenance').json[0]['cost'] == 12.5
+
+
+def test_fields_on_lists_and_details(client, records):
+    assert client.get('/api/assets?fields=id,name').json == [{'id': records['truck']['id'], 'name': 'Truck'}]
+    assert client.get(f"/api/assets/{records['truck']['id']}?fields=category").json == {'category': 'Vehicle'}
+    item = client.get(f"/api/maintenance-items/{records['oil']['id']}").json
+    assert client.get('/api/maintenance-items?fields=name,next_due_date').json == [
+        {'name': 'Oil Change', 'next_due_date': item['next_due_date']}]
+    assert client.get(f"/api/general-maintenance/{records['general']['id']}?fields=description,cost").json == \
+        {'description': 'Wash', 'cost': 12.5}
+
+    page = client.get('/api/maintenance-logs?fields=id,cost&limit=2').json
+    assert page['items'] == [{'id': records['logs'][2]['id'], 'cost': 30.0}, {'id': records['logs'][1]['id'], 'cost': 20.0}]
+    rest = client.get(f"/api/maintenance-logs?fields=id,cost&limit=2&cursor={page['next_cursor']}").json
+    assert rest == {'items': [{'id': records['logs'][0]['id'], 'cost': 10.0}], 'next_cursor': None}
+
+
+def test_projection_skips_unneeded_loading(app, client, records, count_queries):
+    with count_queries() as queries:
+        client.get('/api/maintenance-logs?fields=id,date_performed')
+    assert not any('FROM attachments' in statement for statement in queries)
+    assert not any('maintenance_logs.notes' in statement for statement in queries)
+
+    with count_queries() as queries:
+        client.get('/api/maintenance-logs?fields=id,attachments')
+    assert any('FROM attachments' in statement for statement in queries)
+
+
+def test_unknown_fields_are_rejected(client, records):
+    response = client.get('/api/assets?fields=id,secret,password')
+    assert response.status_code == 400
+    assert response.json['error'] == 'Unknown fields: password, secret'
+    assert client.get(f"/api/maintenance-logs/{records['logs'][0]['id']}?fields=,").status_code == 400
+
+
+def test_fields_get_their_own_etag(client, records):
+    full = client.get('/api/assets')
+    projected = client.get('/api/assets?fields=id', headers={'If-None-Match': full.headers['ETag']})
+    assert projected.status_code == 200
+
+
+def test_fast_provider_matches_default_output(app):
+    pytest.importorskip('orjson')
+    from app.serialization import FastJSONProvider
+    fast = FastJSONProvider(app)
+
+    value = {'b': [1, 2.5, None, True], 'a': 'naïve', 'day': date(2024, 3, 1),
+             'at': datetime(2024, 3, 1, 12, 0), 'cost': Decimal('12.50')}
+    default = DefaultJSONProvider(app)
+    assert json.loads(fast.dumps(value)) == json.loads(default.dumps(value))
+    assert fast.dumps(value).startswith('{"a":"naïve","at":"Fri, 01 Mar 2024 12:00:00 GMT"')
+    assert fast.loads(b'{"x": [1, 2]}') == {'x': [1, 2]}
+
+    with app.test_request_context():
+        response = fast.response({'ok': True})
+    assert response.mimetype == 'application/json'
+    assert response.get_data() == b'{"ok":true}\n'
+
+
+def test_default_provider_can_be_chosen():
+    from app import create_app
+    from tests.conftest import TestConfig
+
+    class DefaultJSONConfig(TestConfig):
+        JSON_PROVIDER = 'default'
+
+    assert type(create_app(DefaultJSONConfig).json) is DefaultJSONProvider
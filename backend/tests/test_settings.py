@@ -0,0 +1,72 @@
+import json
+from flask import g
+from app import db
+from app.models import Settings
+
+
+def test_update_and_get_settings(client):
+    """Test updating several settings at once and reading them back"""
+    response = client.put('/api/settings',
+                          data=json.dumps({'notification_email': 'me@example.com',
+                                           'smtp_port': 465,
+                                           'smtp_password': 'secret',
+                                           'unknown_key': 'ignored'}),
+                          content_type='application/json')
+    assert response.status_code == 200
+
+    data = client.get('/api/settings').json
+    assert data['notification_email'] == 'me@example.com'
+    assert data['smtp_port'] == '465'
+    assert data['smtp_password'] == '••••••••'
+    assert 'unknown_key' not in data
+    assert '_version' not in data
+
+
+def test_masked_password_is_not_saved(client):
+    """Test that the masked placeholder does not overwrite the stored password"""
+    client.put('/api/settings', data=json.dumps({'smtp_password': 'secret'}),
+               content_type='application/json')
+    client.put('/api/settings', data=json.dumps({'smtp_password': '••••••••'}),
+               content_type='application/json')
+    assert Settings.get('smtp_password') == 'secret'
+
+
+def test_settings_update_is_one_write(client):
+    """Test that a multi-key update is written as a single versioned change"""
+    client.put('/api/settings',
+               data=json.dumps({'smtp_host': 'mail', 'smtp_username': 'me', 'smtp_use_tls': 'true'}),
+               content_type='application/json')
+    assert db.session.query(Settings.value).filter_by(key=Settings.VERSION_KEY).scalar() == '1'
+
+    client.put('/api/settings',
+               data=json.dumps({'smtp_host': 'mail2', 'smtp_port': '25'}),
+               content_type='application/json')
+    assert db.session.query(Settings.value).filter_by(key=Settings.VERSION_KEY).scalar() == '2'
+
+
+def test_settings_cached_per_request(client, count_queries):
+    """Test that reading settings costs one version check once the cache is warm"""
+    client.put('/api/settings', data=json.dumps({'smtp_host': 'mail'}),
+               content_type='application/json')
+    client.get('/api/settings')
+    # The test app context outlives each request; start fresh like a new request would
+    g.pop('settings_checked', None)
+
+    with count_queries() as queries:
+        client.get('/api/settings')
+        client.get('/api/settings')
+    assert len(queries) == 1
+
+
+def test_settings_reload_after_external_write(app):
+    """Test that a write from another process is picked up via the version row"""
+    Settings.update({'smtp_host': 'first'})
+    assert Settings.get('smtp_host') == 'first'
+
+    # Simulate another worker writing directly to the table
+    db.session.query(Settings).filter_by(key='smtp_host').update({'value': 'second'})
+    db.session.query(Settings).filter_by(key=Settings.VERSION_KEY).update({'value': '99'})
+    db.session.commit()
+
+    with app.app_context():
+        assert Settings.get('smtp_host') == 'second'
@@ -0,0 +1,84 @@
+import pytest
+from datetime import date, timedelta
+from app import db
+from app.models import Asset, MaintenanceItem, MaintenanceLog
+from app.services.reminders import reminder_candidates
+from app.services.status import evaluate_items, refresh_next_due
+
+
+@pytest.fixture
+def fleet(app):
+    """Create assets with a mix of usage and time based items"""
+    car = Asset(name='Car', usage_metric='miles', current_usage=25000)
+    house = Asset(name='House')
+    db.session.add_all([car, house])
+    db.session.flush()
+
+    oil = MaintenanceItem(asset_id=car.id, name='Oil Change', maintenance_type='usage',
+                          frequency_value=5000, frequency_unit='miles')
+    filter_ = MaintenanceItem(asset_id=house.id, name='HVAC Filter', maintenance_type='time',
+                              frequency_value=1, frequency_unit='months')
+    gutters = MaintenanceItem(asset_id=house.id, name='Gutters', maintenance_type='time',
+                              frequency_value=1, frequency_unit='years', reminders_enabled=True)
+    db.session.add_all([oil, filter_, gutters])
+    db.session.flush()
+
+    db.session.add_all([
+        MaintenanceLog(maintenance_item_id=oil.id, date_performed=date(2024, 1, 1), usage_reading=18000),
+        MaintenanceLog(maintenance_item_id=oil.id, date_performed=date(2024, 6, 1), usage_reading=21000),
+        MaintenanceLog(maintenance_item_id=filter_.id, date_performed=date.today() - timedelta(days=25)),
+    ])
+    db.session.commit()
+    return {'oil': oil, 'filter': filter_, 'gutters': gutters}
+
+
+def test_evaluate_items_statuses(fleet):
+    """Test statuses computed for usage, time and never-performed items"""
+    results = {r['item'].name: r for r in evaluate_items()}
+
+    assert results['Oil Change']['status'] == 'due-soon'
+    assert results['Oil Change']['remaining'] == 1000
+    assert results['Oil Change']['remaining_text'] == '1000 miles remaining'
+    assert results['Oil Change']['last_performed'] == date(2024, 6, 1)
+
+    assert results['HVAC Filter']['status'] == 'due-soon'
+    assert results['HVAC Filter']['remaining_text'] == '5 days remaining'
+
+    assert results['Gutters']['status'] == 'never'
+    assert results['Gutters']['percentage_remaining'] == 0
+
+
+def test_evaluate_items_filtered_query(fleet):
+    """Test evaluating a filtered set of items"""
+    results = evaluate_items(MaintenanceItem.query.filter_by(reminders_enabled=True))
+    assert [r['item'].name for r in results] == ['Gutters']
+    assert results[0]['asset'].name == 'House'
+
+
+def test_evaluate_items_single_query(fleet, count_queries):
+    """Test that evaluation issues one query regardless of item count"""
+    db.session.expire_all()
+
+    with count_queries() as queries:
+        results = evaluate_items()
+        [r['asset'].current_usage for r in results]
+
+    assert len(queries) == 1
+
+
+def test_reminder_candidates_skip_items_far_from_due(fleet):
+    """Test that reminders only evaluate items inside the reminder window"""
+    car = Asset.query.filter_by(name='Car').one()
+    tyres = MaintenanceItem(asset_id=car.id, name='Tyres', maintenance_type='usage', frequency_value=40000,
+                            frequency_unit='miles', reminders_enabled=True, next_due_usage=60000)
+    wipers = MaintenanceItem(asset_id=car.id, name='Wipers', maintenance_type='time', frequency_value=1,
+                             frequency_unit='years', reminders_enabled=True,
+                             next_due_date=date.today() + timedelta(days=300))
+    db.session.add_all([tyres, wipers])
+    for item in (fleet['oil'], fleet['filter']):
+        item.reminders_enabled = True
+    refresh_next_due(MaintenanceItem.query.filter(MaintenanceItem.id.in_([fleet['oil'].id, fleet['filter'].id])))
+    db.session.commit()
+
+    names = sorted(item.name for item in reminder_candidates(0.3))
+    assert names == ['Gutters', 'HVAC Filter', 'Oil Change']
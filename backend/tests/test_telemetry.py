@@ -0,0 +1,162 @@
+import pytest
+from app.models import Asset, MaintenanceItem, OutboxMessage, UsageReading
+from app.services.telemetry import get_telemetry
+
+
+@pytest.fixture
+def fleet(client):
+    truck = client.post('/api/assets', json={'name': 'Truck', 'usage_metric': 'miles', 'current_usage': 1000}).json
+    van = client.post('/api/assets', json={'name': 'Van', 'usage_metric': 'miles', 'current_usage': 2000}).json
+    shed = client.post('/api/assets', json={'name': 'Shed'}).json
+    return {'truck': truck, 'van': van, 'shed': shed}
+
+
+def usage(asset):
+    return Asset.query.get(asset['id']).current_usage
+
+
+def test_readings_are_buffered_until_flushed(app, client, fleet):
+    truck, van, shed = fleet['truck']['id'], fleet['van']['id'], fleet['shed']['id']
+    response = client.post('/api/telemetry', json={'readings': [
+        {'asset_id': truck, 'reading': 1200}, {'asset_id': truck, 'reading': 1500},
+        {'asset_id': truck, 'reading': 1400}, {'asset_id': van, 'reading': 1900},
+        {'asset_id': shed, 'reading': 50}, {'asset_id': 999, 'reading': 10},
+    ]})
+    assert response.status_code == 202
+    assert response.json == {'accepted': 6, 'pending_assets': 4}
+    assert usage(fleet['truck']) == 1000
+
+    # Highest reading wins; usage never goes down; assets without a metric are left alone
+    assert get_telemetry(app).flush() == [truck]
+    assert (usage(fleet['truck']), usage(fleet['van']), usage(fleet['shed'])) == (1500, 2000, 0)
+    assert [(r.asset_id, r.reading) for r in UsageReading.query.filter_by(source='asset', asset_id=truck)] \
+        == [(truck, 1500)]
+    assert get_telemetry(app).flush() == []
+
+
+def test_flush_invalidates_cached_asset_reads(app, client, fleet):
+    etag = client.get('/api/assets').headers['ETag']
+    client.post('/api/telemetry', json=[{'asset_id': fleet['truck']['id'], 'reading': 5000}])
+    get_telemetry(app).flush()
+    response = client.get('/api/assets', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert {asset['name']: asset['current_usage'] for asset in response.json}['Truck'] == 5000
+
+
+def test_reminders_only_for_items_crossing_a_threshold(app, client, fleet, smtp_settings):
+    truck = fleet['truck']['id']
+    items = {}
+    for name, frequency in (('Oil Change', 5000), ('Timing Belt', 100000)):
+        items[name] = client.post('/api/maintenance-items', json={
+            'asset_id': truck, 'name': name, 'maintenance_type': 'usage', 'frequency_value': frequency,
+            'frequency_unit': 'miles', 'reminders_enabled': True}).json
+        client.post('/api/maintenance-logs', json={
+            'maintenance_item_id': items[name]['id'], 'date_performed': '2024-01-01', 'usage_reading': 1000})
+
+    # Oil is due at 6000 and due soon from 4500; the belt is nowhere near
+    client.post('/api/telemetry', json=[{'asset_id': truck, 'reading': 4000}])
+    get_telemetry(app).flush()
+    assert OutboxMessage.query.count() == 0
+
+    client.post('/api/telemetry', json=[{'asset_id': truck, 'reading': 4600}])
+    get_telemetry(app).flush()
+    assert OutboxMessage.query.count() == 1
+    assert MaintenanceItem.query.get(items['Oil Change']['id']).last_reminder_sent is not None
+    assert MaintenanceItem.query.get(items['Timing Belt']['id']).last_reminder_sent is None
+
+
+def test_flushes_inline_without_an_interval(app, client, fleet):
+    get_telemetry(app).flush_seconds = 0
+    response = client.post('/api/telemetry', json=[{'asset_id': fleet['van']['id'], 'reading': '2500'}])
+    assert response.json == {'accepted': 1, 'pending_assets': 0}
+    assert usage(fleet['van']) == 2500
+
+
+@pytest.mark.parametrize('body, error', [
+    ({'readings': []}, 'readings must be a non-empty list'),
+    ([{'reading': 5}], 'asset_id is required'),
+    ([{'asset_id': 1, 'reading': 'lots'}], 'asset_id and reading must be integers'),
+    ([{'asset_id': 1, 'reading': -1}], 'reading must not be negative'),
+])
+def test_rejects_malformed_readings(app, client, body, error):
+    response = client.post('/api/telemetry', json=body)
+    assert response.status_code == 400
+    assert response.json['error'] == error
+    assert get_telemetry(app).pending == {}
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    """An app on a database file, so a second connection can compete for the write lock"""
+    from app import create_app, db
+    from tests.conftest import TestConfig
+
+    path = tmp_path / 'upkeep.db'
+    config = type('FileConfig', (TestConfig,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'SQLITE_PRAGMAS': {**TestConfig.SQLITE_PRAGMAS, 'busy_timeout': 0},
+    })
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        yield app, path
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_usage_is_read_under_the_write_lock(file_app):
+    """Test that no other writer can move usage between the read and the guarded UPDATE"""
+    import sqlite3
+    from sqlalchemy import event
+    from app import db
+    app, path = file_app
+    truck = app.test_client().post('/api/assets', json={'name': 'Truck', 'usage_metric': 'miles'}).json['id']
+
+    attempts = []
+
+    def competing_update(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith('SELECT assets.id, assets.current_usage'):
+            other = sqlite3.connect(path, timeout=0)
+            try:
+                other.execute('UPDATE assets SET current_usage = 900 WHERE id = ?', (truck,))
+                other.commit()
+                attempts.append('updated')
+            except sqlite3.OperationalError as e:
+                attempts.append(str(e))
+            finally:
+                other.close()
+
+    event.listen(db.engine, 'before_cursor_execute', competing_update)
+    try:
+        get_telemetry(app).add([(truck, 500)])
+        assert get_telemetry(app).flush() == [truck]
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', competing_update)
+    assert attempts and set(attempts) == {'database is locked'}
+
+
+def test_concurrent_reminder_checks_queue_once(file_app):
+    """Test that a reminder check waits for one in progress and then finds nothing new to send"""
+    import sqlite3
+    from app.models import Settings
+    from app.services.reminders import check_and_send_reminders
+    app, path = file_app
+    client = app.test_client()
+    Settings.update({'smtp_host': '127.0.0.1', 'smtp_port': '2525', 'smtp_username': 'upkeep@example.com',
+                     'smtp_password': 'secret', 'notification_email': 'owner@example.com'})
+    truck = client.post('/api/assets', json={'name': 'Truck'}).json['id']
+    client.post('/api/maintenance-items', json={'asset_id': truck, 'name': 'Wash', 'maintenance_type': 'time',
+                                               'frequency_value': 1, 'frequency_unit': 'weeks',
+                                               'reminders_enabled': True})
+
+    # Another worker mid-check holds the write lock
+    other = sqlite3.connect(path, timeout=0)
+    other.execute('BEGIN IMMEDIATE')
+    with pytest.raises(Exception, match='locked'):
+        check_and_send_reminders(app)
+    other.rollback()
+    other.close()
+
+    check_and_send_reminders(app)
+    check_and_send_reminders(app)
+    assert OutboxMessage.query.count() == 1
@@ -0,0 +1,67 @@
+import io
+import json
+import os
+import pytest
+
+
+@pytest.fixture
+def uploaded(client):
+    """An attachment stored under its content address"""
+    asset = client.post('/api/assets', data=json.dumps({'name': 'Mower'}), content_type='application/json').json
+    record = client.post('/api/general-maintenance',
+                         data={'asset_id': str(asset['id']), 'description': 'Blade',
+                               'date_performed': '2024-03-01',
+                               'attachments': (io.BytesIO(b'0123456789 receipt'), 'receipt.txt')},
+                         content_type='multipart/form-data').json
+    attachment = record['attachments'][0]
+    return attachment, f"/uploads/{os.path.basename(attachment['file_path'])}"
+
+
+def test_blob_served_immutable_with_strong_etag(client, uploaded):
+    """Test long-lived caching and revalidation of content-addressed uploads"""
+    attachment, url = uploaded
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.data == b'0123456789 receipt'
+    assert response.headers['ETag'] == f'"{attachment["content_hash"]}"'
+    assert response.cache_control.immutable
+    assert response.cache_control.public
+    assert response.cache_control.max_age == 365 * 24 * 60 * 60
+
+    response = client.get(url, headers={'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304
+
+
+def test_range_request(client, uploaded):
+    """Test partial content for Range requests"""
+    _, url = uploaded
+    response = client.get(url, headers={'Range': 'bytes=2-5'})
+    assert response.status_code == 206
+    assert response.data == b'2345'
+    assert response.headers['Content-Range'] == 'bytes 2-5/18'
+
+
+def test_nginx_handoff(client, app, uploaded):
+    """Test that X-Accel-Redirect mode leaves the body to the proxy"""
+    attachment, url = uploaded
+    app.config['UPLOAD_ACCEL'] = 'nginx'
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.data == b''
+    assert response.headers['X-Accel-Redirect'] == '/protected-uploads/' + os.path.basename(attachment['file_path'])
+    # nginx re-sends these with the body (see the /protected-uploads/ location)
+    assert response.headers['ETag'] == f'"{attachment["content_hash"]}"'
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == 365 * 24 * 60 * 60
+
+    response = client.get(url, headers={'If-None-Match': f'"{attachment["content_hash"]}"'})
+    assert response.status_code == 304
+    assert 'X-Accel-Redirect' not in response.headers
+    assert response.cache_control.immutable
+
+
+def test_missing_and_escaping_paths(client, uploaded):
+    """Test that only files inside the upload folder are served"""
+    assert client.get('/uploads/missing.txt').status_code == 404
+    assert client.get('/uploads/..%2Fconfig.py').status_code == 404
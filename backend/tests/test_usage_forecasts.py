@@ -0,0 +1,121 @@
+import pytest
+from datetime import date, timedelta
+from sqlalchemy import insert
+from app import db
+from app.models import UsageReading, UsageForecast
+from app.services.usage import fit_usage_rates
+
+TODAY = date.today()
+
+
+def days_ago(n):
+    return (TODAY - timedelta(days=n)).isoformat()
+
+
+@pytest.fixture
+def truck(client):
+    asset = client.post('/api/assets', json={'name': 'Truck', 'usage_metric': 'miles', 'current_usage': 1000}).json
+    item = client.post('/api/maintenance-items', json={
+        'asset_id': asset['id'], 'name': 'Oil Change', 'maintenance_type': 'usage',
+        'frequency_value': 500, 'frequency_unit': 'miles'}).json
+    return {'asset': asset, 'item': item}
+
+
+def log_reading(client, item, when, reading):
+    return client.post('/api/maintenance-logs', json={
+        'maintenance_item_id': item['id'], 'date_performed': when, 'usage_reading': reading}).json
+
+
+def readings(asset_id):
+    return sorted((r.recorded_on, r.reading, r.source) for r in UsageReading.query.filter_by(asset_id=asset_id))
+
+
+def test_readings_follow_assets_and_logs(client, truck):
+    asset_id = truck['asset']['id']
+    assert readings(asset_id) == [(TODAY, 1000, 'asset')]
+
+    log = log_reading(client, truck['item'], days_ago(10), 900)
+    client.put(f'/api/assets/{asset_id}', json={'current_usage': 1100})
+    assert readings(asset_id) == [(TODAY - timedelta(days=10), 900, 'maintenance_log'),
+                                  (TODAY, 1100, 'asset')]
+
+    client.put(f"/api/maintenance-logs/{log['id']}", json={'usage_reading': 950})
+    assert (TODAY - timedelta(days=10), 950, 'maintenance_log') in readings(asset_id)
+
+    client.delete(f"/api/maintenance-logs/{log['id']}")
+    assert readings(asset_id) == [(TODAY, 1100, 'asset')]
+
+
+def test_projects_due_date_from_usage_rate(client, truck):
+    for n, reading in ((30, 700), (20, 800), (10, 900)):
+        log_reading(client, truck['item'], days_ago(n), reading)
+
+    forecast = client.get('/api/forecasts').json
+    assert forecast['assets'] == [{'asset_id': truck['asset']['id'], 'rate_per_day': 10.0, 'readings': 4,
+                                   'last_reading': 1000, 'last_reading_on': TODAY.isoformat()}]
+    # Next due at 900 + 500 miles; 400 miles to go at 10 a day
+    assert forecast['items'] == [{'maintenance_item_id': truck['item']['id'], 'asset_id': truck['asset']['id'],
+                                  'name': 'Oil Change', 'next_due_usage': 1400,
+                                  'projected_due_date': (TODAY + timedelta(days=40)).isoformat()}]
+
+    dashboard = client.get('/api/dashboard').json
+    assert dashboard[0]['top_urgent_items'][0]['projected_due_date'] == (TODAY + timedelta(days=40)).isoformat()
+
+
+def test_forecasts_refitted_when_readings_change(client, truck, count_queries):
+    log_reading(client, truck['item'], days_ago(10), 900)
+    forecast = UsageForecast.query.one()
+    computed_at = forecast.computed_at
+    assert (forecast.rate_per_day, forecast.last_reading) == (10.0, 1000)
+
+    with count_queries() as queries:
+        client.get('/api/forecasts')
+        client.get('/api/dashboard')
+    assert not any('usage_readings' in statement for statement in queries)
+    assert not any(statement.lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE')) for statement in queries)
+    assert UsageForecast.query.one().computed_at == computed_at
+
+    client.put(f"/api/assets/{truck['asset']['id']}", json={'current_usage': 1200})
+    assert UsageForecast.query.one().last_reading == 1200
+    assert client.get('/api/forecasts').json['assets'][0]['last_reading'] == 1200
+
+
+def test_forecasts_follow_usage_tracking(client):
+    asset = client.post('/api/assets', json={'name': 'Genset', 'usage_metric': 'hours'}).json
+    assert UsageForecast.query.one().asset_id == asset['id']
+
+    client.put(f"/api/assets/{asset['id']}", json={'usage_metric': None})
+    assert UsageForecast.query.count() == 0
+
+
+def test_too_little_history_has_no_projection(client, truck):
+    forecast = client.get('/api/forecasts').json
+    assert forecast['assets'][0]['rate_per_day'] is None
+    assert forecast['items'][0]['projected_due_date'] is None
+
+
+def test_fits_every_asset_in_one_pass(app, client):
+    ids = [client.post('/api/assets', json={'name': f'Genset {n}', 'usage_metric': 'hours'}).json['id']
+           for n in range(3)]
+    rows = []
+    for asset_id, rate in zip(ids, (2, 5, 0)):
+        rows += [{'asset_id': asset_id, 'reading': 100 + rate * day, 'source': 'asset',
+                  'recorded_on': TODAY - timedelta(days=60 - day)} for day in range(0, 61, 15)]
+    # Readings older than the window do not count
+    rows.append({'asset_id': ids[0], 'reading': 0, 'source': 'asset', 'recorded_on': TODAY - timedelta(days=900)})
+    db.session.execute(insert(UsageReading), rows)
+
+    fits = fit_usage_rates(ids)
+    assert fits[ids[0]][0] == pytest.approx(2)
+    assert fits[ids[0]][1:] == (5, 220, TODAY)
+    assert fits[ids[1]][0] == pytest.approx(5)
+    assert fits[ids[2]][0] is None
+
+
+def test_deleting_asset_removes_history(client, truck):
+    log_reading(client, truck['item'], days_ago(10), 900)
+    assert UsageForecast.query.count() == 1
+
+    assert client.delete(f"/api/assets/{truck['asset']['id']}").status_code == 204
+    assert UsageReading.query.count() == 0
+    assert UsageForecast.query.count() == 0
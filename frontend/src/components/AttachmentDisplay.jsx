@@ -43,6 +43,11 @@ function AttachmentDisplay({ attachments, onDelete, showDelete = false }) {
     return `/uploads/${filename}`
   }
 
+  const getThumbnailUrl = (attachment) => {
+    // Small server-side rendition; falls back to the original for older API responses
+    return attachment.renditions?.thumb || getFileUrl(attachment)
+  }
+
   return (
     <div className="attachment-display">
       <div className="attachment-label">Attachments ({attachments.length}):</div>
@@ -57,7 +62,8 @@ function AttachmentDisplay({ attachments, onDelete, showDelete = false }) {
                 className="attachment-link attachment-image"
               >
                 <img
-                  src={getFileUrl(attachment)}
+                  src={getThumbnailUrl(attachment)}
+                  loading="lazy"
                   alt={attachment.filename}
                   className="attachment-thumbnail"
                 />
@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react'
 import { useNavigate } from 'react-router-dom'
 import Button from '../components/Button'
 import ProgressBar from '../components/ProgressBar'
-import { assetAPI, maintenanceItemAPI, maintenanceLogAPI } from '../services/api'
+import { dashboardAPI } from '../services/api'
 import { parseLocalDate } from '../utils/date'
 import './Dashboard.css'
 
@@ -19,51 +19,25 @@ function Dashboard() {
   const loadAssets = async () => {
     try {
       setLoading(true)
-      const assetsResponse = await assetAPI.getAll()
-      const assetsData = assetsResponse.data
-
-      // Load maintenance items and logs for each asset to calculate health
-      const assetsWithHealth = await Promise.all(
-        assetsData.map(async (asset) => {
-          try {
-            const itemsResponse = await maintenanceItemAPI.getAll(asset.id)
-            const items = itemsResponse.data
-
-            // Load logs for each maintenance item
-            const itemsWithLogs = await Promise.all(
-              items.map(async (item) => {
-                try {
-                  const logsResponse = await maintenanceLogAPI.getAll(item.id)
-                  return {
-                    ...item,
-                    logs: logsResponse.data
-                  }
-                } catch (err) {
-                  return { ...item, logs: [] }
-                }
-              })
-            )
-
-            // Calculate health score and get top urgent items
-            const health = calculateAssetHealth(asset, itemsWithLogs)
-            const topUrgentItems = getTopUrgentItems(asset, itemsWithLogs, 3)
-
-            return {
-              ...asset,
-              maintenanceItems: itemsWithLogs,
-              health,
-              topUrgentItems
-            }
-          } catch (err) {
-            return {
-              ...asset,
-              maintenanceItems: [],
-              health: { score: 100, status: 'good', itemsDue: 0 },
-              topUrgentItems: []
-            }
+      const response = await dashboardAPI.get()
+
+      // Health and urgency are computed server-side in a single request
+      const assetsWithHealth = response.data.map((asset) => ({
+        ...asset,
+        health: {
+          score: asset.health.score,
+          status: asset.health.status,
+          itemsDue: asset.health.items_due,
+          itemsOverdue: asset.health.items_overdue
+        },
+        topUrgentItems: asset.top_urgent_items.map((item) => ({
+          ...item,
+          statusInfo: {
+            status: item.status,
+            percentageRemaining: item.percentage_remaining
           }
-        })
-      )
+        }))
+      }))
 
       setAssets(assetsWithHealth)
     } catch (err) {
@@ -74,116 +48,6 @@ function Dashboard() {
     }
   }
 
-  const calculateAssetHealth = (asset, items) => {
-    if (items.length === 0) {
-      return { score: 100, status: 'good', itemsDue: 0 }
-    }
-
-    let totalPercentage = 0
-    let itemsDue = 0
-    let itemsOverdue = 0
-
-    items.forEach(item => {
-      const status = getItemStatus(asset, item)
-      totalPercentage += status.percentageRemaining
-
-      if (status.status === 'overdue') {
-        itemsOverdue++
-        itemsDue++
-      } else if (status.status === 'due-soon') {
-        itemsDue++
-      }
-    })
-
-    const avgPercentage = totalPercentage / items.length
-    let overallStatus = 'good'
-
-    if (itemsOverdue > 0) {
-      overallStatus = 'overdue'
-    } else if (itemsDue > 0) {
-      overallStatus = 'due-soon'
-    } else if (avgPercentage < 50) {
-      overallStatus = 'due-soon'
-    }
-
-    return {
-      score: Math.round(avgPercentage),
-      status: overallStatus,
-      itemsDue,
-      itemsOverdue
-    }
-  }
-
-  const getTopUrgentItems = (asset, items, count = 3) => {
-    const itemsWithStatus = items.map(item => ({
-      ...item,
-      statusInfo: getItemStatus(asset, item)
-    }))
-
-    const sorted = itemsWithStatus.sort((a, b) => {
-      if (a.statusInfo.status === 'never' && b.statusInfo.status !== 'never') return 1
-      if (b.statusInfo.status === 'never' && a.statusInfo.status !== 'never') return -1
-      return a.statusInfo.percentageRemaining - b.statusInfo.percentageRemaining
-    })
-
-    return sorted.slice(0, count)
-  }
-
-  const getItemStatus = (asset, item) => {
-    if (!item.logs || item.logs.length === 0) {
-      return {
-        status: 'never',
-        percentageRemaining: 0
-      }
-    }
-
-    const sortedLogs = [...item.logs].sort((a, b) =>
-      parseLocalDate(b.date_performed) - parseLocalDate(a.date_performed)
-    )
-    const lastLog = sortedLogs[0]
-
-    if (item.maintenance_type === 'usage' && asset.usage_metric) {
-      const lastUsage = lastLog.usage_reading || 0
-      const nextUsage = lastUsage + item.frequency_value
-      const usageRemaining = nextUsage - asset.current_usage
-      const percentageRemaining = Math.max(0, (usageRemaining / item.frequency_value) * 100)
-
-      let status = 'good'
-      if (usageRemaining <= 0) {
-        status = 'overdue'
-      } else if (usageRemaining <= item.frequency_value * 0.3) {
-        status = 'due-soon'
-      }
-
-      return { status, percentageRemaining }
-    } else {
-      const lastDate = parseLocalDate(lastLog.date_performed)
-      const today = new Date()
-      const daysSinceLast = Math.floor((today - lastDate) / (1000 * 60 * 60 * 24))
-
-      let frequencyInDays = item.frequency_value
-      if (item.frequency_unit === 'weeks') {
-        frequencyInDays = item.frequency_value * 7
-      } else if (item.frequency_unit === 'months') {
-        frequencyInDays = item.frequency_value * 30
-      } else if (item.frequency_unit === 'years') {
-        frequencyInDays = item.frequency_value * 365
-      }
-
-      const daysRemaining = frequencyInDays - daysSinceLast
-      const percentageRemaining = Math.max(0, (daysRemaining / frequencyInDays) * 100)
-
-      let status = 'good'
-      if (daysRemaining <= 0) {
-        status = 'overdue'
-      } else if (daysRemaining <= frequencyInDays * 0.3) {
-        status = 'due-soon'
-      }
-
-      return { status, percentageRemaining }
-    }
-  }
-
   return (
     <div className="dashboard-page">
       <div className="page-header">
@@ -248,11 +112,9 @@ function Dashboard() {
                     <span className="detail-label">{asset.usage_metric}:</span> {asset.current_usage.toLocaleString()}
                   </p>
                 )}
-                {asset.maintenanceItems && (
-                  <p className="detail-item">
-                    <span className="detail-label">Items Tracked:</span> {asset.maintenanceItems.length}
-                  </p>
-                )}
+                <p className="detail-item">
+                  <span className="detail-label">Items Tracked:</span> {asset.items_tracked}
+                </p>
               </div>
 
               {asset.topUrgentItems && asset.topUrgentItems.length > 0 && (
@@ -275,6 +137,11 @@ function Dashboard() {
                           status={item.statusInfo.status}
                           showLabel={false}
                         />
+                        {item.projected_due_date && (
+                          <span className="urgent-item-forecast">
+                            Est. due {parseLocalDate(item.projected_due_date).toLocaleDateString()} at current usage rate
+                          </span>
+                        )}
                       </div>
                     ))}
                   </div>
@@ -6,6 +6,8 @@ import Select from '../components/Select'
 import { backupAPI, settingsAPI } from '../services/api'
 import './Settings.css'
 
+const BACKUP_EXTENSIONS = ['.json', '.ndjson', '.gz', '.tar', '.tgz']
+
 function Settings() {
   const navigate = useNavigate()
   const fileInputRef = useRef(null)
@@ -67,7 +69,7 @@ function Settings() {
       setMessage(null)
       setError(null)
       await settingsAPI.testEmail()
-      setMessage('Test email sent! Check your inbox.')
+      setMessage('Test email queued! Check your inbox shortly.')
     } catch (err) {
       setError('Failed to send test email: ' + (err.response?.data?.error || err.message))
     } finally {
@@ -75,13 +77,13 @@ function Settings() {
     }
   }
 
-  const handleExport = async () => {
+  const handleExport = async (format = 'json') => {
     try {
       setExporting(true)
       setMessage(null)
       setError(null)
 
-      const response = await backupAPI.export()
+      const response = await backupAPI.export(format)
 
       const url = window.URL.createObjectURL(new Blob([response.data]))
       const link = document.createElement('a')
@@ -119,8 +121,8 @@ function Settings() {
     const file = e.target.files[0]
     if (!file) return
 
-    if (!file.name.endsWith('.json')) {
-      setError('Please select a JSON file')
+    if (!BACKUP_EXTENSIONS.some((ext) => file.name.endsWith(ext))) {
+      setError('Please select a JSON backup or backup archive')
       return
     }
 
@@ -145,7 +147,7 @@ function Settings() {
         `${response.data.counts.maintenance_items} items, ` +
         `${response.data.counts.maintenance_logs} logs, ` +
         `${response.data.counts.general_maintenance} general maintenance records. ` +
-        response.data.note
+        (response.data.note || `Restored ${response.data.files_restored} attachment file(s).`)
       )
 
       e.target.value = ''
@@ -284,14 +286,22 @@ function Settings() {
         <div className="backup-actions">
           <div className="backup-card">
             <h4>Export Data</h4>
-            <p>Download all your assets, maintenance items, and logs as a JSON file.</p>
+            <p>Download all your assets, maintenance items, and logs as a JSON file, or as an archive that also includes attachment files.</p>
             <Button
-              onClick={handleExport}
+              onClick={() => handleExport('json')}
               disabled={exporting}
               fullWidth
             >
               {exporting ? 'Exporting...' : 'Export Backup'}
             </Button>
+            <Button
+              onClick={() => handleExport('archive')}
+              disabled={exporting}
+              variant="outline"
+              fullWidth
+            >
+              {exporting ? 'Exporting...' : 'Export Archive (with files)'}
+            </Button>
           </div>
 
           <div className="backup-card">
@@ -325,7 +335,7 @@ function Settings() {
               type="file"
               ref={fileInputRef}
               onChange={handleFileSelect}
-              accept=".json"
+              accept={BACKUP_EXTENSIONS.join(',')}
               style={{ display: 'none' }}
             />
 
@@ -60,6 +60,10 @@ export const generalMaintenanceAPI = {
   deleteAttachment: (id) => api.delete(`/general-maintenance/attachments/${id}`)
 }
 
+export const dashboardAPI = {
+  get: (limit) => api.get('/dashboard', { params: { limit } })
+}
+
 export const settingsAPI = {
   get: () => api.get('/settings'),
   update: (data) => api.put('/settings', data),
@@ -67,8 +71,9 @@ export const settingsAPI = {
 }
 
 export const backupAPI = {
-  export: () => {
+  export: (format = 'json') => {
     return axios.get(`${API_BASE_URL}/backup/export`, {
+      params: { format },
       responseType: 'blob'
     })
   },